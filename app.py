@@ -1,57 +1,199 @@
-from flask import Flask, request, jsonify, session
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, session, stream_with_context
 from flask_cors import CORS
+import functools
+import hashlib
+import hmac
+import logging
 import os
+import json
 from dotenv import load_dotenv
 from llm_service import LLMService
+from llm_registry import LlmClientRegistry
+from llm_routing import configure_executor, configure_rate_limits, parse_rate_limits, rate_limit_stats
+from llm_metrics import metrics as llm_metrics, JsonlSink
+from challenge_pool import ChallengePool
+from challenge_dedup import ChallengeHistory
+from llm_jobs import LlmJobQueue, JobQueueFull, JobStoreUnavailable, MemoryJobBackend, SqlJobBackend
+from response_cache import ResponseCache, MemoryCacheBackend, SqlCacheBackend
+from code_runner import CodeRunner, format_for_prompt, format_markdown
+from request_timing import Profiler, init_request_timing, span
+from logging_config import configure_logging
 
 # Import database components
-from database.database import get_db_session, init_db_schema, init_db_connection
+from database.database import get_db_session, init_db_connection, get_pool_stats
 from database.config import DatabaseConfig
 from database.models import User, LlmApiKey, LlmProvider
+from database.challenge_store import ChallengeStore
+from database.api_key_cache import ApiKeyCache
+from database.passwords import configure_password_hasher, get_password_hasher, PasswordHasherBusy
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='static')
-app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
-CORS(app)  # Enable CORS for all routes
-
-# Create custom configuration
-custom_config = DatabaseConfig(
-    db_name=os.environ.get('DB_NAME', 'interview_helper'),
-    db_type='postgresql',
-    db_host=os.environ.get('DB_HOST', 'localhost'),
-    db_user=os.environ.get('DB_USER', 'user'),
-    db_password=os.environ.get('DB_PASSWORD', 'password'),
-    db_port=os.environ.get('DB_PORT', 5432),
-)
-
-# Configure database with custom settings
-init_db_connection(custom_config)
+# Routes, registered on the app by create_app
+api = Blueprint('api', __name__)
 
-# Initialize the database
-init_db_schema()
+def create_app(db_config=None):
+    """
+    Create and configure the Flask app.
+    
+    Does no I/O: the database engine is created on first use and provider SDKs are
+    imported when a client for them is first built. The schema is not created here;
+    run the migrations out-of-band with `alembic upgrade head`.
+    
+    Args:
+        db_config: DatabaseConfig to use instead of the DB_* environment variables
+    """
+    # Log as JSON lines (or text) written by a background thread, with secrets redacted
+    configure_logging()
+    
+    app = Flask(__name__, static_folder='static')
+    app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
+    CORS(app)  # Enable CORS for all routes
+    
+    # Configure the database connection; nothing connects until the first query
+    db_config = db_config or DatabaseConfig.from_env()
+    app.config['DATABASE_CONFIG'] = db_config
+    init_db_connection(db_config)
+    
+    # Password hashing runs on its own small thread pool with a fixed concurrency budget
+    configure_password_hasher(
+        method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+        max_concurrent=int(os.environ.get('PASSWORD_HASH_MAX_CONCURRENT', 8)),
+        wait_timeout=float(os.environ.get('PASSWORD_HASH_WAIT_SECONDS', 1.0)),
+    )
+    
+    # Per-provider requests/min and tokens/min budgets, e.g. "GEMINI:15:1000000,OPENAI:500:"
+    configure_rate_limits(parse_rate_limits(os.environ.get('LLM_RATE_LIMITS')))
+    
+    # Threads for model calls with a deadline or hedge; calls beyond this are rejected, not queued
+    configure_executor(int(os.environ.get('LLM_ROUTER_THREADS', 64)))
+    
+    # Optionally also append every LLM call, retry and parse result to a JSONL file for offline analysis
+    if os.environ.get('LLM_METRICS_LOG'):
+        llm_metrics.set_sink(JsonlSink(os.environ['LLM_METRICS_LOG']))
+    
+    # Time each request's phases for the Server-Timing header and the logs, and optionally
+    # profile a sample of requests (or ones sending X-Profile: <PROFILE_TOKEN>) into PROFILE_DIR
+    profiler = None
+    if os.environ.get('PROFILE_DIR'):
+        profiler = Profiler(
+            os.environ['PROFILE_DIR'],
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01)),
+            token=os.environ.get('PROFILE_TOKEN'),
+        )
+    init_request_timing(app, server_timing=os.environ.get('SERVER_TIMING', 'true').lower() == 'true', profiler=profiler)
+    
+    app.teardown_appcontext(shutdown_session)
+    app.register_blueprint(api)
+    return app
 
-# Teardown database session after each request
-@app.teardown_appcontext
 def shutdown_session(exception=None):
+    """Teardown database session after each request"""
     db = get_db_session()
     if db is not None:
         db.remove()
 
-# Initialize the LLM service
-llm_service = LLMService()
+# Cache of hint and feedback responses, in memory by default or in the database
+response_cache_backend = SqlCacheBackend if os.environ.get('RESPONSE_CACHE_BACKEND') == 'sql' else MemoryCacheBackend
+response_cache = ResponseCache(response_cache_backend(
+    max_size=int(os.environ.get('RESPONSE_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('RESPONSE_CACHE_TTL', 86400)),
+))
+
+# Deadlines, retries and hedging applied to every model call
+llm_routing_options = {
+    'deadline': float(os.environ.get('LLM_DEADLINE_SECONDS', 60)) or None,
+    'max_retries': int(os.environ.get('LLM_MAX_RETRIES', 2)),
+    'hedge_percentile': float(os.environ.get('LLM_HEDGE_PERCENTILE', 95)),
+}
+
+# Fallback LLM service for requests that do not select a provider and model
+llm_service = LLMService(response_cache=response_cache, routing_options=llm_routing_options)
+# A fixed identity, like the registry gives its clients, so the default service owns challenge pool buckets
+llm_service.client_key = ("default", llm_service.provider, llm_service.model_name)
+
+# Warm LLM clients per (provider, model, API key), shared across requests and threads
+llm_registry = LlmClientRegistry(
+    max_size=int(os.environ.get('LLM_CLIENT_CACHE_SIZE', 128)),
+    ttl=int(os.environ.get('LLM_CLIENT_TTL', 3600)),
+    response_cache=response_cache,
+    routing_options=llm_routing_options,
+)
+
+# Generated challenges, persisted in the database behind an in-memory LRU cache
+challenge_store = ChallengeStore(max_cache_size=int(os.environ.get('CHALLENGE_CACHE_SIZE', 1024)))
+
+# Each user's API keys, so LLM requests can pick a key without a database query
+api_key_cache = ApiKeyCache(
+    max_users=int(os.environ.get('API_KEY_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('API_KEY_CACHE_TTL', 300)),
+)
+
+# Pool of pre-generated challenges, refilled in the background and saved to the store as they are generated
+challenge_pool = ChallengePool(
+    target_depth=int(os.environ.get('CHALLENGE_POOL_DEPTH', 3)),
+    num_workers=int(os.environ.get('CHALLENGE_POOL_WORKERS', 2)),
+    store=challenge_store,
+)
+
+# Fingerprints of the challenges each user has been served, to skip near-duplicates
+challenge_history = ChallengeHistory(
+    threshold=float(os.environ.get('CHALLENGE_DEDUP_THRESHOLD', 0.5)),
+    max_per_user=int(os.environ.get('CHALLENGE_HISTORY_SIZE', 500)),
+    history_ttl=float(os.environ.get('CHALLENGE_HISTORY_TTL', 300)),
+)
+
+# Runs the challenge examples against logged-in users' submissions in a sandbox before the LLM review; off by default
+code_runner = CodeRunner(
+    max_workers=int(os.environ.get('CODE_RUNNER_WORKERS', 0)),
+    timeout=float(os.environ.get('CODE_RUNNER_TIMEOUT_SECONDS', 5)),
+    cpu_seconds=int(os.environ.get('CODE_RUNNER_CPU_SECONDS', 2)),
+    memory_mb=int(os.environ.get('CODE_RUNNER_MEMORY_MB', 256)),
+    sandbox=os.environ.get('CODE_RUNNER_SANDBOX') or None,
+    uid_base=int(os.environ.get('CODE_RUNNER_UID_BASE', 64000)),
+)
+
+# Bounded worker pool for LLM calls submitted through the /api/jobs endpoints; job status and
+# results live in the database by default, so a poll answered by any worker process finds the job
+llm_job_ttl = int(os.environ.get('LLM_JOB_RESULT_TTL', 600))
+llm_job_backend = MemoryJobBackend if os.environ.get('LLM_JOB_BACKEND') == 'memory' else SqlJobBackend
+llm_jobs = LlmJobQueue(
+    num_workers=int(os.environ.get('LLM_JOB_WORKERS', 4)),
+    max_queue_size=int(os.environ.get('LLM_JOB_QUEUE_SIZE', 100)),
+    result_ttl=llm_job_ttl,
+    backend=llm_job_backend(ttl=llm_job_ttl),
+)
 
-# In-memory history for generated challenges
-challenge_history = {}
+# Operators who may read the /stats routes and /metrics: logged-in users with these usernames,
+# or clients sending STATS_TOKEN as a bearer token (e.g. a Prometheus scraper); nobody by default
+STATS_ADMIN_USERS = {name.strip() for name in os.environ.get('STATS_ADMIN_USERS', '').split(',') if name.strip()}
+STATS_TOKEN = os.environ.get('STATS_TOKEN')
 
-@app.route('/')
+def stats_access_required(view):
+    """Restrict a route to the operators allowed by STATS_ADMIN_USERS or STATS_TOKEN"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if STATS_TOKEN and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {STATS_TOKEN}"):
+            return view(*args, **kwargs)
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({"error": "Not logged in"}), 401
+        user = get_db_session().get(User, user_id)
+        if user is None or user.username not in STATS_ADMIN_USERS:
+            return jsonify({"error": "Not allowed"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@api.route('/')
 def index():
-    return app.send_static_file('index.html')
+    return current_app.send_static_file('index.html')
 
 # User Authentication Routes
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
     """Register a new user"""
     data = request.json
@@ -73,11 +215,13 @@ def register():
         db.add(user)
         db.commit()
         return jsonify({"message": "User registered successfully", "user": user.to_dict()}), 201
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         get_db_session().rollback()
         return jsonify({"error": f"Registration failed: {str(e)}"}), 500
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     """Login a user"""
     data = request.json
@@ -90,21 +234,29 @@ def login():
     # Find the user
     user = User.query.filter_by(username=username).first()
     
-    if not user or not user.check_password(password):
-        return jsonify({"error": "Invalid username or password"}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"error": "Invalid username or password"}), 401
+        
+        # Upgrade hashes made with older parameters while the plain password is at hand
+        if user.password_needs_rehash():
+            user.set_password(password)
+            get_db_session().commit()
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
     
     # Set session variable
     session['user_id'] = user.id
     
     return jsonify({"message": "Login successful", "user": user.to_dict()})
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
 def logout():
     """Logout current user"""
     session.pop('user_id', None)
     return jsonify({"message": "Logged out successfully"})
 
-@app.route('/api/user', methods=['GET'])
+@api.route('/api/user', methods=['GET'])
 def get_current_user():
     """Get current logged in user"""
     user_id = session.get('user_id')
@@ -120,8 +272,88 @@ def get_current_user():
     
     return jsonify(user.to_dict())
 
+class LlmSelectionError(Exception):
+    """Raised when the requested provider/model cannot be used for the current user"""
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+def resolve_llm_service(provider, model):
+    """
+    Get the LLM service for the provider and model selected in the request.
+    
+    Looks up the current user's API key for the provider in the API key cache and
+    returns a warm client from the registry. The user's other API keys become fallbacks for failover and
+    hedging. Falls back to the default service if nothing is selected or no API key
+    is stored.
+    
+    Raises:
+        LlmSelectionError: If the user is not logged in or the provider is invalid
+    """
+    if not provider:
+        return llm_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        raise LlmSelectionError("Not logged in", 401)
+    
+    try:
+        # Convert provider to enum
+        provider_enum = LlmProvider[provider.upper()]
+    except KeyError:
+        raise LlmSelectionError(f"Invalid provider: {provider}", 400)
+    
+    return select_llm_service(provider_enum, model, api_key_cache.get(user_id))
+
+def select_llm_service(provider_enum, model, api_key_entries):
+    """
+    Pick the LLM service for a provider and model from a user's API keys.
+    
+    Shared by the Flask routes and the async routes in asgi.py, which load the
+    keys with different sessions.
+    
+    Args:
+        provider_enum: The selected LlmProvider
+        model: The selected model name
+        api_key_entries: All of the user's API keys (ApiKeyEntry snapshots), oldest first
+    """
+    api_key_entry = next((entry for entry in api_key_entries if entry.llm_provider == provider_enum), None)
+    
+    if not model or not api_key_entry:
+        return llm_service
+    
+    # Another key for the same provider can serve the same model; other providers use their default model
+    fallbacks = [
+        (
+            entry.llm_provider.name,
+            model if entry.llm_provider == provider_enum else entry.llm_provider.get_models()[0]["value"],
+            entry.api_key,
+        )
+        for entry in api_key_entries if entry is not api_key_entry
+    ]
+    
+    # Route by the provider stored with the key, so the matching adapter is used
+    return llm_registry.get(api_key_entry.llm_provider.name, model, api_key_entry.api_key, fallbacks)
+
+def next_challenge(service, user_id, difficulty, additional_context, language):
+    """
+    Get a new challenge from the pool, skipping ones the user has already seen.
+    
+    Anonymous users have no history, so any challenge is accepted.
+    """
+    if not user_id:
+        return challenge_pool.get(service, difficulty, additional_context, language)
+    
+    challenge = challenge_pool.get(
+        service, difficulty, additional_context, language,
+        accept=lambda candidate: not challenge_history.is_duplicate(user_id, candidate)
+    )
+    if challenge:
+        challenge_history.record(user_id, challenge)
+    return challenge
+
 # Existing routes
-@app.route('/api/challenge', methods=['GET'])
+@api.route('/api/challenge', methods=['GET'])
 def get_challenge():
     """Get a random challenge or specific challenge by ID"""
     challenge_id = request.args.get('id')
@@ -133,48 +365,98 @@ def get_challenge():
     model = request.args.get('model')  # Added model parameter
     
     if challenge_id:
-        # If a specific ID is requested, look it up in the challenge_history
+        # If a specific ID is requested, look it up in the challenge store
         # This would be needed if you want to revisit a specific challenge
-        challenge = challenge_history.get(challenge_id)
+        challenge = challenge_store.get(challenge_id)
         
         if not challenge:
             return jsonify({"error": "Challenge not found"}), 404
     else:
-        # Fetch API key for the selected provider
-        api_key = None
-        if provider:
-            user_id = session.get('user_id')
-            if not user_id:
-                return jsonify({"error": "Not logged in"}), 401
-            
-            try:
-                # Convert provider to enum
-                provider_enum = LlmProvider[provider.upper()]
-                db = get_db_session()
-                api_key_entry = db.query(LlmApiKey).filter_by(user_id=user_id, llm_provider=provider_enum).first()
-                if api_key_entry:
-                    api_key = api_key_entry.api_key
-            except KeyError:
-                return jsonify({"error": f"Invalid provider: {provider}"}), 400
-        
-        # Initialize the LLM service with the selected provider, model, and API key
-        if provider and model and api_key:
-            llm_service.initialize_model(model_name=model, api_key=api_key)
+        # Get a warm client for the selected provider, model, and the user's API key
+        try:
+            service = resolve_llm_service(provider, model)
+        except LlmSelectionError as e:
+            return jsonify({"error": str(e)}), e.status_code
         
-        # Generate a new random challenge using LLM
-        challenge = llm_service.generate_challenge(difficulty, additional_context, language)
+        # Serve a pre-generated challenge the user has not seen, or generate one if the
+        # pool has none. Either way the pool has saved it to the challenge store, so any
+        # worker can serve hints and feedback for it.
+        challenge = next_challenge(service, session.get('user_id'), difficulty, additional_context, language)
         
         if not challenge:
             return jsonify({"error": "Failed to generate challenge. Please check API key configuration."}), 500
-        
-        # Store in history for possible revisiting and to prevent repetition
-        challenge_history[challenge["id"]] = challenge
     
     # Don't include hints in the initial response
     response_challenge = {k: v for k, v in challenge.items() if k != 'hints'}
     return jsonify(response_challenge)
 
-@app.route('/api/hint', methods=['POST'])
+@api.route('/api/db/pool-stats', methods=['GET'])
+@stats_access_required
+def get_db_pool_stats():
+    """Get live connection pool statistics for this worker"""
+    return jsonify(get_pool_stats())
+
+@api.route('/api/challenge-history/stats', methods=['GET'])
+@stats_access_required
+def get_challenge_history_stats():
+    """Get the number of users with a loaded challenge history and the duplicate rate"""
+    return jsonify(challenge_history.stats())
+
+@api.route('/api/llm-clients/stats', methods=['GET'])
+@stats_access_required
+def get_llm_client_stats():
+    """Get the size and hit/miss counts of the LLM client registry"""
+    return jsonify(llm_registry.stats())
+
+@api.route('/api/llm-metrics/stats', methods=['GET'])
+@stats_access_required
+def get_llm_metrics_stats():
+    """Get LLM call latency percentiles, token counts, retries and the parse failure rate"""
+    return jsonify(llm_metrics.snapshot())
+
+@api.route('/metrics', methods=['GET'])
+@stats_access_required
+def get_metrics():
+    """Expose the LLM call metrics in the Prometheus text format"""
+    return Response(llm_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/llm-rate-limits/stats', methods=['GET'])
+@stats_access_required
+def get_llm_rate_limit_stats():
+    """Get the configured rate limits and time spent waiting for them per provider"""
+    return jsonify(rate_limit_stats())
+
+@api.route('/api/response-cache/stats', methods=['GET'])
+@stats_access_required
+def get_response_cache_stats():
+    """Get the hint and feedback response cache hit ratio per endpoint"""
+    return jsonify(response_cache.stats())
+
+@api.route('/api/api-key-cache/stats', methods=['GET'])
+@stats_access_required
+def get_api_key_cache_stats():
+    """Get the size and hit/miss counts of the API key cache"""
+    return jsonify(api_key_cache.stats())
+
+@api.route('/api/password-hasher/stats', methods=['GET'])
+@stats_access_required
+def get_password_hasher_stats():
+    """Get the password hashing configuration and the number of rejected operations"""
+    return jsonify(get_password_hasher().stats())
+
+@api.route('/api/code-runner/stats', methods=['GET'])
+@stats_access_required
+def get_code_runner_stats():
+    """Get the number of local test runs by outcome and their average duration"""
+    return jsonify(code_runner.stats())
+
+@api.route('/api/challenge-pool/stats', methods=['GET'])
+@stats_access_required
+def get_challenge_pool_stats():
+    """Get the depth and hit/miss counts of the challenge pool"""
+    return jsonify(challenge_pool.stats())
+
+@api.route('/api/hint', methods=['POST'])
 def get_hint():
     """Get a hint for a specific challenge"""
     data = request.json
@@ -185,14 +467,19 @@ def get_hint():
     if not challenge_id:
         return jsonify({"error": "Challenge ID is required"}), 400
     
-    # Get challenge from history
-    challenge = challenge_history.get(challenge_id)
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
     
     if not challenge:
         return jsonify({"error": "Challenge not found"}), 404
     
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
     # Get hint from LLM service
-    hint = llm_service.get_hint(challenge, current_code, hint_index)
+    hint = service.get_hint(challenge, current_code, hint_index, language=data.get('language'))
     
     # Check if this is the last predefined hint
     hints = challenge.get("hints", [])
@@ -203,7 +490,7 @@ def get_hint():
         "isLastHint": is_last_predefined_hint
     })
 
-@app.route('/api/submit', methods=['POST'])
+@api.route('/api/submit', methods=['POST'])
 def submit_solution():
     """Handle solution submission and provide feedback using LLM"""
     data = request.json
@@ -214,28 +501,288 @@ def submit_solution():
     if not challenge_id or not code:
         return jsonify({"error": "Challenge ID and code are required"}), 400
     
-    # Get challenge from history
-    challenge = challenge_history.get(challenge_id)
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
     
     if not challenge:
         return jsonify({"error": "Challenge not found"}), 404
     
-    # Get feedback from LLM service
     try:
-        feedback = llm_service.get_solution_feedback(challenge, code, language)
-        return jsonify({"feedback": feedback})
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    # Run the examples first, then get feedback from LLM service with the results as context
+    try:
+        return jsonify(review_submission(service, challenge, code, language, session.get('user_id')))
     except Exception as e:
         return jsonify({"error": f"Error generating feedback: {str(e)}"}), 500
 
-@app.route('/api/settings', methods=['POST'])
+def run_tests(challenge, code, language, user_id):
+    """
+    Run the challenge examples against a submission in the sandbox.
+    
+    Only submissions of logged-in users are run, since the code executes on the server.
+    
+    Returns:
+        The test results, or None if the code was not run
+    """
+    if not user_id:
+        return None
+    with span("tests"):
+        return code_runner.run(challenge, code, language)
+
+def review_submission(service, challenge, code, language, user_id):
+    """
+    Run the challenge examples against a submission and get the LLM review.
+    
+    Code that does not compile gets the compile error as its feedback without an
+    LLM call; otherwise the model is given the test results as context.
+    
+    Returns:
+        A dict with the feedback and the test results (None if the code was not run)
+    """
+    test_results = run_tests(challenge, code, language, user_id)
+    if test_results and test_results["status"] == "compile_error":
+        return {"feedback": format_markdown(test_results), "testResults": test_results}
+    feedback = service.get_solution_feedback(challenge, code, language, test_results=format_for_prompt(test_results))
+    return {"feedback": feedback, "testResults": test_results}
+
+def sse_event(data, event=None):
+    """Format a Server-Sent Event carrying a JSON payload"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+class StreamStatus(str):
+    """A progress message for an SSE stream, shown by the client until the next text chunk"""
+
+def sse_response(chunks, done_data=None):
+    """
+    Stream text chunks to the client as SSE, followed by a final 'done' event.
+    
+    StreamStatus chunks are sent as 'status' events. done_data is read once the
+    chunks are exhausted, so the generator may still fill it in.
+    """
+    def generate():
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, StreamStatus):
+                    yield sse_event({"text": chunk}, event="status")
+                else:
+                    yield sse_event({"text": chunk})
+            yield sse_event(done_data or {}, event="done")
+        except Exception as e:
+            yield sse_event({"error": str(e)}, event="error")
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Disable proxy buffering so chunks reach the client as they are generated
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/api/hint/stream', methods=['POST'])
+def stream_hint():
+    """Stream a hint for a specific challenge as Server-Sent Events"""
+    data = request.json
+    challenge_id = data.get('challengeId')
+    hint_index = data.get('hintIndex', 0)
+    current_code = data.get('code')
+    
+    if not challenge_id:
+        return jsonify({"error": "Challenge ID is required"}), 400
+    
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
+    
+    if not challenge:
+        return jsonify({"error": "Challenge not found"}), 404
+    
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    hints = challenge.get("hints", [])
+    is_last_predefined_hint = hint_index >= len(hints) - 1
+    
+    return sse_response(
+        service.stream_hint(challenge, current_code, hint_index, language=data.get('language')),
+        done_data={"isLastHint": is_last_predefined_hint}
+    )
+
+@api.route('/api/submit/stream', methods=['POST'])
+def stream_solution_feedback():
+    """Stream feedback for a submitted solution as Server-Sent Events"""
+    data = request.json
+    challenge_id = data.get('challengeId')
+    code = data.get('code')
+    language = data.get('language', 'javascript')
+    
+    if not challenge_id or not code:
+        return jsonify({"error": "Challenge ID and code are required"}), 400
+    
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
+    
+    if not challenge:
+        return jsonify({"error": "Challenge not found"}), 404
+    
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    user_id = session.get('user_id')
+    done_data = {"testResults": None}
+    
+    def review():
+        # The examples run inside the stream, so the response starts right away. The test results are
+        # streamed first, as a Markdown table; the model is only asked once they are in, since they are
+        # part of its prompt
+        if user_id and code_runner.supports(language):
+            yield StreamStatus("Running the examples...")
+        test_results = done_data["testResults"] = run_tests(challenge, code, language, user_id)
+        if test_results:
+            yield format_markdown(test_results)
+            if test_results["status"] == "compile_error":
+                return
+        yield from service.stream_solution_feedback(
+            challenge, code, language, test_results=format_for_prompt(test_results)
+        )
+    
+    return sse_response(review(), done_data=done_data)
+
+# Asynchronous job routes: enqueue the LLM call and return a job ID right away
+MAX_JOB_POLL_WAIT = 10
+
+def enqueue_job(job_type, fn, *args):
+    """Submit a job and return the 202 response carrying its ID"""
+    try:
+        job = llm_jobs.submit(job_type, fn, *args)
+    except (JobQueueFull, JobStoreUnavailable) as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(job.to_dict()), 202, {'Location': f"/api/jobs/{job.id}"}
+
+def run_challenge_job(service, user_id, difficulty, additional_context, language):
+    """Get a challenge from the pool (or generate and store one); runs on a job worker"""
+    try:
+        challenge = next_challenge(service, user_id, difficulty, additional_context, language)
+        if not challenge:
+            raise RuntimeError("Failed to generate challenge. Please check API key configuration.")
+        return {k: v for k, v in challenge.items() if k != 'hints'}
+    finally:
+        # Job workers are not request threads, so release their scoped session here
+        get_db_session().remove()
+
+def run_hint_job(service, challenge, current_code, hint_index, language=None):
+    """Generate a hint; runs on a job worker"""
+    hints = challenge.get("hints", [])
+    return {
+        "hint": service.get_hint(challenge, current_code, hint_index, language=language),
+        "isLastHint": hint_index >= len(hints) - 1
+    }
+
+def run_feedback_job(service, challenge, code, language, user_id):
+    """Run the examples and generate solution feedback; runs on a job worker"""
+    return review_submission(service, challenge, code, language, user_id)
+
+@api.route('/api/jobs/challenge', methods=['POST'])
+def enqueue_challenge_job():
+    """Enqueue generation of a new challenge"""
+    data = request.json or {}
+    
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    return enqueue_job(
+        'challenge', run_challenge_job, service, session.get('user_id'),
+        data.get('difficulty'), data.get('context'), data.get('language', 'javascript')
+    )
+
+@api.route('/api/jobs/hint', methods=['POST'])
+def enqueue_hint_job():
+    """Enqueue generation of a hint for a specific challenge"""
+    data = request.json
+    challenge_id = data.get('challengeId')
+    hint_index = data.get('hintIndex', 0)
+    current_code = data.get('code')
+    
+    if not challenge_id:
+        return jsonify({"error": "Challenge ID is required"}), 400
+    
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
+    
+    if not challenge:
+        return jsonify({"error": "Challenge not found"}), 404
+    
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    return enqueue_job('hint', run_hint_job, service, challenge, current_code, hint_index, data.get('language'))
+
+@api.route('/api/jobs/submit', methods=['POST'])
+def enqueue_feedback_job():
+    """Enqueue generation of feedback for a submitted solution"""
+    data = request.json
+    challenge_id = data.get('challengeId')
+    code = data.get('code')
+    language = data.get('language', 'javascript')
+    
+    if not challenge_id or not code:
+        return jsonify({"error": "Challenge ID and code are required"}), 400
+    
+    # Get challenge from the store
+    challenge = challenge_store.get(challenge_id)
+    
+    if not challenge:
+        return jsonify({"error": "Challenge not found"}), 404
+    
+    try:
+        service = resolve_llm_service(data.get('provider'), data.get('model'))
+    except LlmSelectionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    return enqueue_job('submit', run_feedback_job, service, challenge, code, language, session.get('user_id'))
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a job's status and result.
+    Pass ?wait=<seconds> to long-poll until the job finishes or the wait expires;
+    a job run by another worker process is waited on for a few seconds at most.
+    """
+    wait = request.args.get('wait', type=float)
+    try:
+        job = llm_jobs.get(job_id, wait=min(wait, MAX_JOB_POLL_WAIT) if wait else None)
+    except JobStoreUnavailable as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+    
+    if not job:
+        return jsonify({"error": "Job not found or expired"}), 404
+    
+    return jsonify(job)
+
+@api.route('/api/jobs/stats', methods=['GET'])
+@stats_access_required
+def get_job_stats():
+    """Get queue depth, wait time and run time per job type"""
+    return jsonify(llm_jobs.stats())
+
+@api.route('/api/settings', methods=['POST'])
 def update_api_settings():
     """Handle API settings submission (LLM and API key)"""
     data = request.json
     llm = data.get('llm')
     api_key = data.get('apiKey')
 
-    # For now, just print the received data
-    print(f"Received API settings: LLM - {llm}, API Key - {api_key}")
+    # Never log the key itself
+    logger.info("Received API settings: LLM - %s, API key provided: %s", llm, bool(api_key))
 
     # In the future, you would update the LLM service with the new settings here
     # llm_service.update_settings(llm, api_key)
@@ -243,7 +790,7 @@ def update_api_settings():
     return jsonify({"message": "API settings updated successfully"}), 200
 
 # API Key Management Routes
-@app.route('/api/api-keys', methods=['GET'])
+@api.route('/api/api-keys', methods=['GET'])
 def get_api_keys():
     """Get all API keys for the current user"""
     user_id = session.get('user_id')
@@ -252,8 +799,7 @@ def get_api_keys():
         return jsonify({"error": "Not logged in"}), 401
     
     try:
-        db = get_db_session()
-        api_keys = LlmApiKey.query.filter_by(user_id=user_id).all()
+        api_keys = api_key_cache.get(user_id)
         
         return jsonify({
             "apiKeys": [key.to_dict() for key in api_keys]
@@ -261,7 +807,7 @@ def get_api_keys():
     except Exception as e:
         return jsonify({"error": f"Error retrieving API keys: {str(e)}"}), 500
 
-@app.route('/api/api-keys', methods=['POST'])
+@api.route('/api/api-keys', methods=['POST'])
 def add_api_key():
     """Add a new API key for the current user"""
     user_id = session.get('user_id')
@@ -292,8 +838,9 @@ def add_api_key():
         db = get_db_session()
         db.add(new_api_key)
         db.commit()
+        api_key_cache.invalidate(user_id)
         
-        print(f"Added new API key: Provider={llm_provider}, Model={model}")
+        logger.info("Added new API key: Provider=%s, Model=%s", llm_provider, model)
         
         return jsonify({
             "message": "API key added successfully",
@@ -305,7 +852,7 @@ def add_api_key():
         db.rollback()
         return jsonify({"error": f"Error adding API key: {str(e)}"}), 500
 
-@app.route('/api/api-keys/<int:key_id>', methods=['PUT'])
+@api.route('/api/api-keys/<int:key_id>', methods=['PUT'])
 def update_api_key(key_id):
     """Update an existing API key"""
     user_id = session.get('user_id')
@@ -344,8 +891,9 @@ def update_api_key(key_id):
         
         # Save changes
         db.commit()
+        api_key_cache.invalidate(user_id)
         
-        print(f"Updated API key {key_id}: Provider={llm_provider}, Model={model}")
+        logger.info("Updated API key %s: Provider=%s, Model=%s", key_id, llm_provider, model)
         
         return jsonify({
             "message": "API key updated successfully",
@@ -357,7 +905,7 @@ def update_api_key(key_id):
         db.rollback()
         return jsonify({"error": f"Error updating API key: {str(e)}"}), 500
 
-@app.route('/api/api-keys/<int:key_id>', methods=['DELETE'])
+@api.route('/api/api-keys/<int:key_id>', methods=['DELETE'])
 def delete_api_key(key_id):
     """Delete an API key"""
     user_id = session.get('user_id')
@@ -375,8 +923,9 @@ def delete_api_key(key_id):
         # Delete the API key
         db.delete(api_key_entry)
         db.commit()
+        api_key_cache.invalidate(user_id)
         
-        print(f"Deleted API key {key_id}")
+        logger.info("Deleted API key %s", key_id)
         
         return jsonify({
             "message": "API key deleted successfully"
@@ -385,7 +934,59 @@ def delete_api_key(key_id):
         db.rollback()
         return jsonify({"error": f"Error deleting API key: {str(e)}"}), 500
 
-@app.route('/api/llm-models/<provider>', methods=['GET'])
+# Changes only when the providers' model lists do, i.e. with a new release
+MODEL_CATALOG_VERSION = hashlib.sha256(json.dumps(
+    {provider.name: provider.get_models() for provider in LlmProvider}, sort_keys=True
+).encode()).hexdigest()[:16]
+
+@api.route('/api/model-catalog', methods=['GET'])
+def get_model_catalog():
+    """
+    Get the (provider, model) pairs the current user has an API key for.
+
+    Replaces one /api/api-keys request plus one /api/llm-models request per key. With
+    ?all=true every provider is listed, flagged with whether the user has a key for it,
+    for the settings page. The response carries an ETag, so repeat loads are answered
+    with 304 Not Modified until the user's keys change.
+    """
+    user_id = session.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "Not logged in"}), 401
+
+    include_all = request.args.get('all', 'false').lower() == 'true'
+    try:
+        key_providers = {key.llm_provider for key in api_key_cache.get(user_id)}
+    except Exception as e:
+        return jsonify({"error": f"Error retrieving model catalog: {str(e)}"}), 500
+
+    # The body only depends on these, so a revalidation is answered without building it
+    version = f"{MODEL_CATALOG_VERSION}:{include_all}:{','.join(sorted(p.name for p in key_providers))}"
+    etag = hashlib.sha256(version.encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            "providers": [
+                {
+                    "provider": provider.name,
+                    "label": provider.value,
+                    "hasKey": provider in key_providers,
+                    "models": provider.get_models()
+                }
+                for provider in LlmProvider
+                if include_all or provider in key_providers
+            ]
+        })
+
+    # The catalog depends on the session cookie, so shared caches must not store it,
+    # and browsers must revalidate it because keys can be added at any time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    response.set_etag(etag)
+    return response
+
+@api.route('/api/llm-models/<provider>', methods=['GET'])
 def get_llm_models(provider):
     """Get available models for a specific LLM provider"""
     try:
@@ -400,14 +1001,11 @@ def get_llm_models(provider):
         return jsonify({"error": f"Error retrieving models: {str(e)}"}), 500
 
 # Add a route to get the settings.html page
-@app.route('/settings')
+@api.route('/settings')
 def settings_page():
-    return app.send_static_file('settings.html')
+    return current_app.send_static_file('settings.html')
 
 if __name__ == '__main__':
-    # Initialize challenge history dict
-    challenge_history = {}
-    
-    # No need to pre-generate challenges anymore
-    # The app will generate fresh challenges on demand
-    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)))
+    # Challenges are pre-generated lazily: the pool refills a bucket
+    # in the background after the first request for it
+    create_app().run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)))
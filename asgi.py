@@ -0,0 +1,195 @@
+"""
+ASGI entry point.
+Serves /api/challenge, /api/hint and /api/submit with async handlers that await
+model calls on the event loop, so slow LLM responses do not tie up a worker
+thread each. Every other route is served by the Flask app in app.py.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import json
+import os
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.middleware import Middleware
+from starlette.routing import Mount, Route
+
+import app as flask_module
+from database.async_database import init_async_db_connection, dispose_async_engine
+from database.models import LlmProvider
+from request_timing import TimingMiddleware
+
+flask_app = flask_module.create_app()
+challenge_pool = flask_module.challenge_pool
+challenge_store = flask_module.challenge_store
+api_key_cache = flask_module.api_key_cache
+challenge_history = flask_module.challenge_history
+
+def get_session_user_id(request):
+    """Read the user ID from the Flask session cookie, or None if not logged in"""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return None
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        data = serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return None
+    return data.get('user_id')
+
+async def resolve_llm_service(request, provider, model):
+    """
+    Async version of app.resolve_llm_service.
+
+    Raises:
+        LlmSelectionError: If the user is not logged in or the provider is invalid
+    """
+    if not provider:
+        return flask_module.llm_service
+
+    user_id = get_session_user_id(request)
+    if not user_id:
+        raise flask_module.LlmSelectionError("Not logged in", 401)
+
+    try:
+        provider_enum = LlmProvider[provider.upper()]
+    except KeyError:
+        raise flask_module.LlmSelectionError(f"Invalid provider: {provider}", 400)
+
+    return flask_module.select_llm_service(provider_enum, model, await api_key_cache.aget(user_id))
+
+async def read_json(request):
+    """Parse the JSON request body, treating a missing or invalid body as empty"""
+    try:
+        return await request.json() or {}
+    except json.JSONDecodeError:
+        return {}
+
+async def get_challenge(request):
+    """Get a random challenge or specific challenge by ID"""
+    challenge_id = request.query_params.get('id')
+    difficulty = request.query_params.get('difficulty')
+    additional_context = request.query_params.get('context')
+    language = request.query_params.get('language', 'javascript')
+    provider = request.query_params.get('provider')
+    model = request.query_params.get('model')
+
+    if challenge_id:
+        challenge = await challenge_store.aget(challenge_id)
+
+        if not challenge:
+            return JSONResponse({"error": "Challenge not found"}, status_code=404)
+    else:
+        try:
+            service = await resolve_llm_service(request, provider, model)
+        except flask_module.LlmSelectionError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status_code)
+
+        user_id = get_session_user_id(request)
+        accept = None
+        if user_id:
+            # Load the user's history off the event loop, so the check below never queries the database
+            await asyncio.to_thread(challenge_history.load, user_id)
+            accept = lambda candidate: not challenge_history.is_duplicate(user_id, candidate)
+
+        # Serve a pre-generated challenge the user has not seen, or await a new one if the
+        # pool has none; either way it has been saved to the store
+        challenge = await challenge_pool.aget(service, difficulty, additional_context, language, accept)
+
+        if not challenge:
+            return JSONResponse({"error": "Failed to generate challenge. Please check API key configuration."}, status_code=500)
+
+        if user_id:
+            challenge_history.record(user_id, challenge)
+
+    # Don't include hints in the initial response
+    response_challenge = {k: v for k, v in challenge.items() if k != 'hints'}
+    return JSONResponse(response_challenge)
+
+async def get_hint(request):
+    """Get a hint for a specific challenge"""
+    data = await read_json(request)
+    challenge_id = data.get('challengeId')
+    hint_index = data.get('hintIndex', 0)
+    current_code = data.get('code')
+
+    if not challenge_id:
+        return JSONResponse({"error": "Challenge ID is required"}, status_code=400)
+
+    challenge = await challenge_store.aget(challenge_id)
+
+    if not challenge:
+        return JSONResponse({"error": "Challenge not found"}, status_code=404)
+
+    try:
+        service = await resolve_llm_service(request, data.get('provider'), data.get('model'))
+    except flask_module.LlmSelectionError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+
+    hint = await service.aget_hint(challenge, current_code, hint_index, language=data.get('language'))
+
+    hints = challenge.get("hints", [])
+    is_last_predefined_hint = hint_index >= len(hints) - 1
+
+    return JSONResponse({
+        "hint": hint,
+        "isLastHint": is_last_predefined_hint
+    })
+
+async def submit_solution(request):
+    """Handle solution submission and provide feedback using LLM"""
+    data = await read_json(request)
+    challenge_id = data.get('challengeId')
+    code = data.get('code')
+    language = data.get('language', 'javascript')
+
+    if not challenge_id or not code:
+        return JSONResponse({"error": "Challenge ID and code are required"}, status_code=400)
+
+    challenge = await challenge_store.aget(challenge_id)
+
+    if not challenge:
+        return JSONResponse({"error": "Challenge not found"}, status_code=404)
+
+    try:
+        service = await resolve_llm_service(request, data.get('provider'), data.get('model'))
+    except flask_module.LlmSelectionError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+
+    # The examples run in a sandboxed child process; wait for it on a worker thread
+    test_results = await asyncio.to_thread(
+        flask_module.run_tests, challenge, code, language, get_session_user_id(request)
+    )
+    if test_results and test_results["status"] == "compile_error":
+        return JSONResponse({"feedback": flask_module.format_markdown(test_results), "testResults": test_results})
+
+    try:
+        feedback = await service.aget_solution_feedback(
+            challenge, code, language, test_results=flask_module.format_for_prompt(test_results)
+        )
+        return JSONResponse({"feedback": feedback, "testResults": test_results})
+    except Exception as e:
+        return JSONResponse({"error": f"Error generating feedback: {str(e)}"}, status_code=500)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Open the async database engine on startup and close it on shutdown"""
+    init_async_db_connection(flask_app.config['DATABASE_CONFIG'])
+    yield
+    await dispose_async_engine()
+
+app = Starlette(
+    routes=[
+        Route('/api/challenge', get_challenge, methods=['GET']),
+        Route('/api/hint', get_hint, methods=['POST']),
+        Route('/api/submit', submit_solution, methods=['POST']),
+        # Everything else, including the streaming and job endpoints, runs in the Flask app
+        Mount('/', app=WsgiToAsgi(flask_app)),
+    ],
+    # Times the async handlers; Flask times the requests passed through to it
+    middleware=[Middleware(TimingMiddleware, server_timing=os.environ.get('SERVER_TIMING', 'true').lower() == 'true')],
+    lifespan=lifespan,
+)
@@ -0,0 +1,116 @@
+"""
+Cold start measurement.
+Times importing app.py and calling create_app() in fresh interpreters, and exits
+with status 1 if the median exceeds a budget or if startup touched the database,
+so slow imports or startup I/O are caught before every worker pays for them.
+
+Usage:
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --budget-ms 800 --runs 10
+    python benchmarks/cold_start.py --imports 15   # also list the slowest imports
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup time allowed for import + create_app, in milliseconds
+DEFAULT_BUDGET_MS = 1000
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (done - imported) * 1000}))
+"""
+
+
+def child_env(db_path):
+    """Environment for a child process, with a SQLite database in an empty directory."""
+    env = dict(os.environ)
+    env.update({'DB_TYPE': 'sqlite', 'DB_PATH': db_path, 'SECRET_KEY': 'cold-start'})
+    env.pop('LLM_METRICS_LOG', None)
+    return env
+
+
+def measure(db_path):
+    """Run one fresh interpreter and return its import and create_app times."""
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=REPO_ROOT, env=child_env(db_path),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(db_path, count):
+    """Return the modules with the largest cumulative import time, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=REPO_ROOT,
+                            env=child_env(db_path), capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative) / 1000, module.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app cold start time against a budget.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Allowed median import + create_app time (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument('--imports', type=int, default=0, metavar='N', help="Also list the N slowest imports")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='interview-helper-cold-start-') as db_path:
+        runs = [measure(db_path) for _ in range(args.runs)]
+        imports = slowest_imports(db_path, args.imports) if args.imports else []
+        # Startup must not connect to the database: SQLite would have created its file
+        touched_db = bool(os.listdir(db_path))
+
+    totals = sorted(run["import_ms"] + run["create_app_ms"] for run in runs)
+    result = {
+        "runs": runs,
+        "median_ms": statistics.median(totals),
+        "min_ms": totals[0],
+        "max_ms": totals[-1],
+        "median_import_ms": statistics.median(run["import_ms"] for run in runs),
+        "median_create_app_ms": statistics.median(run["create_app_ms"] for run in runs),
+        "budget_ms": args.budget_ms,
+        "touched_db": touched_db,
+    }
+
+    print(f"import app:    {result['median_import_ms']:8.1f} ms (median of {args.runs})")
+    print(f"create_app():  {result['median_create_app_ms']:8.1f} ms")
+    print(f"total:         {result['median_ms']:8.1f} ms (min {result['min_ms']:.1f}, max {result['max_ms']:.1f}, "
+          f"budget {args.budget_ms:.0f})")
+    if imports:
+        print("\nSlowest imports (cumulative ms):")
+        for ms, module in imports:
+            print(f"{ms:10.1f}  {module}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result["median_ms"] > args.budget_ms:
+        failures.append(f"median cold start {result['median_ms']:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if touched_db:
+        failures.append("startup touched the database")
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
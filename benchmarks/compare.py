@@ -0,0 +1,102 @@
+"""
+Compare two load test results.
+Prints the change in latency percentiles, throughput and error rate per endpoint
+between a baseline and a candidate run, and exits with status 1 if any endpoint
+regressed by more than the allowed tolerance, so it can gate a CI job.
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+import argparse
+import json
+import sys
+
+# Config keys that must match for the latency numbers to be comparable
+COMPARABLE_CONFIG = ("server", "concurrency", "mix", "language", "fake_latency_ms", "fake_jitter_ms")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def relative_change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before
+
+
+def find_regressions(baseline, candidate, latency_tolerance, throughput_tolerance, error_tolerance):
+    """Return (endpoint, description) pairs for every regression beyond the tolerances."""
+    regressions = []
+    for endpoint, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(endpoint)
+        if after is None:
+            regressions.append((endpoint, "missing from candidate run"))
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = relative_change(before[key], after[key])
+            if change is not None and change > latency_tolerance:
+                regressions.append((endpoint, f"{key} {before[key]:.1f} -> {after[key]:.1f} (+{change:.0%})"))
+        change = relative_change(before["throughput_rps"], after["throughput_rps"])
+        if change is not None and change < -throughput_tolerance:
+            regressions.append((endpoint, f"throughput {before['throughput_rps']:.1f} -> "
+                                          f"{after['throughput_rps']:.1f} req/s ({change:.0%})"))
+        if after["error_rate"] - before["error_rate"] > error_tolerance:
+            regressions.append((endpoint, f"error rate {before['error_rate']:.1%} -> {after['error_rate']:.1%}"))
+    return regressions
+
+
+def print_comparison(baseline, candidate):
+    header = f"{'endpoint':<12}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}"
+    print(header)
+    print('-' * len(header))
+    for endpoint in sorted(set(baseline["endpoints"]) | set(candidate["endpoints"])):
+        before = baseline["endpoints"].get(endpoint, {})
+        after = candidate["endpoints"].get(endpoint, {})
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            change = relative_change(before.get(key), after.get(key))
+            print(f"{endpoint:<12}{key:<16}{_value(before.get(key))}{_value(after.get(key))}"
+                  f"{f'{change:+.1%}' if change is not None else '-':>10}")
+            endpoint = ""
+
+
+def _value(value):
+    return f"{value:>12.3f}" if value is not None else f"{'-':>12}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two load test results.")
+    parser.add_argument('baseline', help="Results file of the reference run")
+    parser.add_argument('candidate', help="Results file of the run to check")
+    parser.add_argument('--latency-tolerance', type=float, default=0.10,
+                        help="Allowed relative increase of p50/p95/p99 latency (default: 0.10)")
+    parser.add_argument('--throughput-tolerance', type=float, default=0.10,
+                        help="Allowed relative drop in throughput (default: 0.10)")
+    parser.add_argument('--error-tolerance', type=float, default=0.01,
+                        help="Allowed absolute increase of the error rate (default: 0.01)")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    print(f"baseline:  {baseline.get('commit')} {baseline.get('timestamp')} {baseline.get('label') or ''}")
+    print(f"candidate: {candidate.get('commit')} {candidate.get('timestamp')} {candidate.get('label') or ''}\n")
+
+    mismatched = [key for key in COMPARABLE_CONFIG
+                  if baseline["config"].get(key) != candidate["config"].get(key)]
+    if mismatched:
+        print(f"Warning: the runs differ in {', '.join(mismatched)}; latencies may not be comparable\n")
+
+    print_comparison(baseline, candidate)
+
+    regressions = find_regressions(baseline, candidate, args.latency_tolerance,
+                                   args.throughput_tolerance, args.error_tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for endpoint, description in regressions:
+            print(f"  {endpoint}: {description}")
+        sys.exit(1)
+    print("\nNo regressions beyond the tolerances.")
+
+
+if __name__ == '__main__':
+    main()
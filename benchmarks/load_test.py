@@ -0,0 +1,422 @@
+"""
+End-to-end load test.
+Boots the app against a throwaway SQLite database and the fake LLM backend (with
+configurable latency and jitter), drives a weighted mix of register, login,
+challenge, hint and submit traffic from concurrent virtual users, and reports
+p50/p95/p99 latency, throughput and error rate per endpoint. Each user stores an
+API key when signing up and selects its provider and model on every request, as
+the web UI does, so the client registry, API key cache and challenge pool are on
+the measured path. Results are saved as
+JSON so runs on different commits can be compared with compare.py.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 16 --duration 30 --latency-ms 800 --jitter-ms 400
+    python benchmarks/load_test.py --server asgi --mix challenge=1,submit=1
+    python benchmarks/load_test.py --url http://localhost:5000   # an already running server
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Bumped when the result format changes incompatibly
+RESULT_VERSION = 1
+
+DEFAULT_MIX = "challenge=4,hint=3,submit=2,login=1"
+ACTIONS = ("challenge", "hint", "submit", "login")
+
+SAMPLE_CODE = {
+    "python": "def solve(a, b):\n    return a + b\n",
+    "javascript": "function solve(a, b) {\n  return a + b;\n}\n",
+}
+
+
+def parse_mix(spec):
+    """Parse "action=weight,..." into a dict of weights for the known actions."""
+    mix = {}
+    for item in spec.split(','):
+        action, _, weight = item.strip().partition('=')
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action '{action}'; expected one of {', '.join(ACTIONS)}")
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list, or None if it is empty."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Collects request latencies and outcomes per endpoint."""
+
+    def __init__(self, record_after):
+        # Requests started before this (warm-up) are not recorded, except each user's sign-up
+        self.record_after = record_after
+        self._samples = {}  # endpoint -> list of (seconds, ok)
+        self._statuses = {}  # endpoint -> {status: count}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, started, seconds, status, always=False):
+        if started < self.record_after and not always:
+            return
+        ok = status is not None and 200 <= status < 300
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append((seconds, ok))
+            statuses = self._statuses.setdefault(endpoint, {})
+            key = str(status) if status is not None else "connection_error"
+            statuses[key] = statuses.get(key, 0) + 1
+
+    def summary(self, elapsed):
+        """Summarize latency percentiles (ms), throughput and error rate per endpoint and overall."""
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            statuses = {endpoint: dict(values) for endpoint, values in self._statuses.items()}
+
+        endpoints = {
+            endpoint: dict(_summarize(values, elapsed), statuses=statuses[endpoint])
+            for endpoint, values in sorted(samples.items())
+        }
+        total = _summarize([sample for values in samples.values() for sample in values], elapsed)
+        return endpoints, total
+
+
+def _summarize(samples, elapsed):
+    ordered = sorted(seconds * 1000 for seconds, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) if ordered else None,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else None,
+    }
+
+
+class VirtualUser:
+    """One simulated user with its own session cookie."""
+
+    def __init__(self, base_url, name, recorder, rng, language, timeout, provider=None, model=None):
+        self.base_url = base_url
+        self.name = name
+        self.recorder = recorder
+        self.rng = rng
+        self.language = language
+        self.timeout = timeout
+        self.provider = provider
+        self.model = model
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.challenge_id = None
+        self.hint_index = 0
+
+    def request(self, endpoint, method, path, body=None, always=False):
+        """Make a request, record it, and return (status, parsed JSON or None)."""
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        started = time.monotonic()
+        status, payload = None, None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status = response.status
+                payload = response.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            payload = e.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        self.recorder.record(endpoint, started, time.monotonic() - started, status, always)
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def sign_up(self):
+        """
+        Register, log in and store an API key; recorded even during warm-up, since
+        it happens only once per user.
+        """
+        self.request("register", "POST", "/api/register",
+                     {"username": self.name, "email": f"{self.name}@bench.invalid", "password": f"pw-{self.name}"},
+                     always=True)
+        self.login(always=True)
+        if self.provider:
+            # Any key works against the fake backend, which serves every provider
+            self.request("api_key", "POST", "/api/api-keys",
+                         {"llm_provider": self.provider, "model": self.model, "api_key": f"bench-{self.name}"},
+                         always=True)
+
+    def selection(self):
+        """The provider and model fields the web UI sends with each request."""
+        return {"provider": self.provider, "model": self.model} if self.provider else {}
+
+    def login(self, always=False):
+        self.request("login", "POST", "/api/login", {"username": self.name, "password": f"pw-{self.name}"}, always)
+
+    def challenge(self):
+        difficulty = self.rng.choice(("easy", "medium", "hard"))
+        query = urllib.parse.urlencode({"difficulty": difficulty, "language": self.language, **self.selection()})
+        status, payload = self.request("challenge", "GET", f"/api/challenge?{query}")
+        if status == 200 and payload and payload.get("id"):
+            self.challenge_id = payload["id"]
+            self.hint_index = 0
+
+    def hint(self):
+        if not self.challenge_id:
+            return self.challenge()
+        self.request("hint", "POST", "/api/hint", {
+            "challengeId": self.challenge_id,
+            "hintIndex": self.hint_index,
+            "code": SAMPLE_CODE.get(self.language, ""),
+            "language": self.language,
+            **self.selection(),
+        })
+        self.hint_index += 1
+
+    def submit(self):
+        if not self.challenge_id:
+            return self.challenge()
+        self.request("submit", "POST", "/api/submit", {
+            "challengeId": self.challenge_id,
+            "code": SAMPLE_CODE.get(self.language, "") + f"# attempt {self.rng.random()}\n",
+            "language": self.language,
+            **self.selection(),
+        })
+        # Move on to a new challenge after a submission, like a real user
+        self.challenge_id = None
+
+    def run(self, stop_at, mix):
+        self.sign_up()
+        actions, weights = zip(*mix.items())
+        while time.monotonic() < stop_at:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, workdir):
+    """Boot the app against SQLite and the fake LLM backend; return the process and its URL."""
+    port = args.port or free_port()
+    env = dict(os.environ)
+    env.update({
+        'DB_TYPE': 'sqlite',
+        'DB_PATH': workdir,
+        'DB_NAME': 'bench',
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY_MS': str(args.latency_ms),
+        'FAKE_LLM_JITTER_MS': str(args.jitter_ms),
+        'FAKE_LLM_SEED': str(args.seed),
+        'SECRET_KEY': 'benchmark',
+        'STATS_TOKEN': args.stats_token,
+        'PORT': str(port),
+        'PYTHONUNBUFFERED': '1',
+    })
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    # Create the schema out-of-band, as in a deployment; the app does not create tables
+    migrate = subprocess.run([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=REPO_ROOT, env=env,
+                             capture_output=True, text=True)
+    if migrate.returncode != 0:
+        raise RuntimeError(f"Database migration failed:\n{migrate.stderr}")
+
+    if args.server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, 'app.py']
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + args.boot_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup; see {log.name}")
+        try:
+            with urllib.request.urlopen(stats_request(url + '/api/db/pool-stats', args.stats_token), timeout=1):
+                return process, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not start within {args.boot_timeout}s; see {log.name}")
+
+
+def stats_request(url, token):
+    """Build a request for a stats route, which needs the server's STATS_TOKEN."""
+    return urllib.request.Request(url, headers={'Authorization': f"Bearer {token}"} if token else {})
+
+
+def fetch_json(url, token=None):
+    """GET a JSON document, or None if it is unavailable."""
+    try:
+        with urllib.request.urlopen(stats_request(url, token), timeout=5) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def git_revision():
+    """Return the current commit and whether the tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix='interview-helper-bench-')
+    process = None
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            process, url = start_server(args, workdir)
+
+        started = time.monotonic()
+        recorder = Recorder(record_after=started + args.warmup)
+        stop_at = started + args.warmup + args.duration
+        run_id = f"{int(time.time())}{random.Random(args.seed).randrange(1000):03d}"
+        users = [
+            VirtualUser(url, f"bench{run_id}u{i}", recorder, random.Random(args.seed + i), args.language, args.timeout,
+                        args.provider, args.model)
+            for i in range(args.concurrency)
+        ]
+        threads = [threading.Thread(target=user.run, args=(stop_at, mix), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Throughput is measured over the recorded window, including requests still finishing after it
+        elapsed = time.monotonic() - recorder.record_after
+
+        endpoints, total = recorder.summary(elapsed)
+        server_stats = {
+            "llm_metrics": fetch_json(url + '/api/llm-metrics/stats', args.stats_token),
+            "challenge_pool": fetch_json(url + '/api/challenge-pool/stats', args.stats_token),
+            "response_cache": fetch_json(url + '/api/response-cache/stats', args.stats_token),
+        }
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    commit, dirty = git_revision()
+    return {
+        "version": RESULT_VERSION,
+        "label": args.label,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "config": {
+            "server": "external" if args.url else args.server,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "mix": mix,
+            "language": args.language,
+            "provider": args.provider,
+            "model": args.model,
+            "fake_latency_ms": args.latency_ms,
+            "fake_jitter_ms": args.jitter_ms,
+            "seed": args.seed,
+            "env": args.env,
+        },
+        "elapsed_seconds": elapsed,
+        "endpoints": endpoints,
+        "total": total,
+        "server": server_stats,
+    }
+
+
+def print_report(result):
+    header = f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'err %':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in [*result["endpoints"].items(), ("total", result["total"])]:
+        print(f"{name:<12}{stats['requests']:>10}{stats['errors']:>8}{stats['error_rate'] * 100:>8.1f}"
+              f"{stats['throughput_rps']:>9.1f}{_ms(stats['p50_ms'])}{_ms(stats['p95_ms'])}{_ms(stats['p99_ms'])}")
+
+
+def _ms(value):
+    return f"{value:>10.1f}" if value is not None else f"{'-':>10}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the app with the fake LLM backend.")
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask',
+                        help="Serve app.py with Flask's threaded server or asgi.py with uvicorn")
+    parser.add_argument('--url', help="Benchmark an already running server instead of booting one")
+    parser.add_argument('--port', type=int, help="Port for the booted server (default: a free port)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Virtual users sending requests at once")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of recorded traffic")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds of unrecorded traffic first")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Action weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--language', default='python', help="Language of challenges and submissions")
+    parser.add_argument('--provider', default='GEMINI',
+                        help="Provider of the API key each user stores and selects; '' uses the default service")
+    parser.add_argument('--model', default='gemini-2.0-flash', help="Model each user selects")
+    parser.add_argument('--latency-ms', type=float, default=500, help="Fake LLM base latency")
+    parser.add_argument('--jitter-ms', type=float, default=250, help="Fake LLM random extra latency")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the traffic mix and the fake LLM")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--boot-timeout', type=float, default=60, help="Seconds to wait for the server to start")
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra environment variable for the booted server (repeatable)")
+    parser.add_argument('--stats-token', default=None,
+                        help="STATS_TOKEN of the server, for reading its stats (default: a random one for the "
+                             "booted server)")
+    parser.add_argument('--label', help="Free-form label stored with the results")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args(argv)
+    if args.stats_token is None and not args.url:
+        args.stats_token = secrets.token_hex(16)
+
+    result = run(args)
+    print_report(result)
+
+    output = args.output
+    if not output:
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{result['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Per-user challenge history for near-duplicate detection.
+Each challenge a user is served is fingerprinted with a MinHash signature of its
+title and description and stored in the database. Candidates are checked locally
+against the user's history with LSH banding, so only challenges that collide with
+something the user has already seen need a new generation, and prompts no longer
+carry a list of challenges to avoid.
+"""
+import datetime
+import logging
+import queue
+import random
+import re
+import threading
+import zlib
+from collections import deque
+from cachetools import TTLCache
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from database import database
+from database.models import ChallengeFingerprint
+
+logger = logging.getLogger(__name__)
+
+# 64 hash functions in 16 bands of 4 rows: pairs above roughly 0.5 Jaccard similarity
+# share a band with high probability
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+
+# Fixed seed: signatures are stored, so the hash functions must never change
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def shingles(text, size=3):
+    """Return the set of word n-grams in a text."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(shingle_set):
+    """Compute the MinHash signature of a set of shingles."""
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set] or [0]
+    return [min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+
+def similarity(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / NUM_PERMUTATIONS
+
+
+def normalize_title(title):
+    return ' '.join(_WORD.findall((title or '').lower()))
+
+
+def fingerprint(challenge):
+    """Return the normalized title and MinHash signature of a challenge."""
+    title = normalize_title(challenge.get('title'))
+    return title, minhash(shingles(f"{challenge.get('title', '')} {challenge.get('description', '')}"))
+
+
+def _band_keys(signature):
+    return [(band, tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class UserHistory:
+    """One user's recent fingerprints with an LSH index over their signatures."""
+
+    def __init__(self, max_entries):
+        self.titles = {}  # normalized title -> count
+        self.entries = deque()  # (title, signature), oldest first
+        self.bands = {}  # band key -> list of signatures in that bucket
+        self.max_entries = max_entries
+
+    def add(self, title, signature):
+        self.entries.append((title, signature))
+        self.titles[title] = self.titles.get(title, 0) + 1
+        for key in _band_keys(signature):
+            self.bands.setdefault(key, []).append(signature)
+        while len(self.entries) > self.max_entries:
+            self._remove_oldest()
+
+    def find_similar(self, title, signature, threshold):
+        """Whether a fingerprint matches a seen title or is at least threshold-similar to one."""
+        if title and title in self.titles:
+            return True
+        for key in _band_keys(signature):
+            for candidate in self.bands.get(key, ()):
+                if similarity(signature, candidate) >= threshold:
+                    return True
+        return False
+
+    def _remove_oldest(self):
+        title, signature = self.entries.popleft()
+        self.titles[title] -= 1
+        if not self.titles[title]:
+            del self.titles[title]
+        for key in _band_keys(signature):
+            bucket = self.bands.get(key)
+            if bucket:
+                bucket.remove(signature)
+                if not bucket:
+                    del self.bands[key]
+
+
+class ChallengeHistory:
+    """
+    Per-user challenge fingerprints, kept in memory and persisted in the background.
+
+    A user's history is loaded from the database on first use and reloaded once it
+    is older than history_ttl, so challenges served by other worker processes are
+    picked up; in between, checks and records never wait on the database.
+    """
+
+    def __init__(self, threshold=0.5, max_per_user=500, max_users=1024, history_ttl=300):
+        """
+        Initialize the challenge history.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which two challenges count as duplicates
+            max_per_user: Most recent challenges remembered per user
+            max_users: Users whose history is kept in memory
+            history_ttl: Seconds a loaded history is used before it is reloaded from the database
+        """
+        self.threshold = threshold
+        self.max_per_user = max_per_user
+        self._users = TTLCache(maxsize=max_users, ttl=history_ttl)
+        self._lock = threading.Lock()
+        self._writes = queue.Queue()
+        self._pending = {}  # user_id -> deque of (challenge_id, title, signature) queued but not yet written
+        self._writer = None
+        self.checks = 0
+        self.duplicates = 0
+
+    def load(self, user_id):
+        """Get a user's history, loading it from the database if it is not in memory yet."""
+        with self._lock:
+            history = self._users.get(user_id)
+        if history is not None:
+            return history
+
+        history = UserHistory(self.max_per_user)
+        # Records still waiting for the writer are not in the database yet. Those queued
+        # before the query may be written during it, and more may be queued meanwhile,
+        # so both are merged in, skipping any the query already returned.
+        with self._lock:
+            pending = list(self._pending.get(user_id, ()))
+        with Session(bind=database.get_engine()) as db:
+            rows = db.query(
+                ChallengeFingerprint.challenge_id, ChallengeFingerprint.title, ChallengeFingerprint.signature
+            ).filter_by(user_id=user_id).order_by(ChallengeFingerprint.created_at.desc()).limit(self.max_per_user).all()
+        seen = set()
+        for challenge_id, title, signature in reversed(rows):
+            seen.add(challenge_id)
+            history.add(title, signature)
+        with self._lock:
+            for challenge_id, title, signature in pending + list(self._pending.get(user_id, ())):
+                if challenge_id not in seen:
+                    seen.add(challenge_id)
+                    history.add(title, signature)
+            # Keep a history another thread loaded (and possibly added to) in the meantime
+            return self._users.setdefault(user_id, history)
+
+    def is_duplicate(self, user_id, challenge):
+        """Whether a challenge is a near-duplicate of one the user has already been served."""
+        history = self.load(user_id)
+        title, signature = fingerprint(challenge)
+        with self._lock:
+            duplicate = history.find_similar(title, signature, self.threshold)
+            self.checks += 1
+            self.duplicates += duplicate
+        return duplicate
+
+    def record(self, user_id, challenge):
+        """Remember that a user was served a challenge; the database write happens in the background."""
+        history = self.load(user_id)
+        title, signature = fingerprint(challenge)
+        with self._lock:
+            history.add(title, signature)
+            self._pending.setdefault(user_id, deque()).append((challenge['id'], title, signature))
+            self._start_writer()
+        self._writes.put((user_id, challenge['id'], title, signature))
+
+    def stats(self):
+        """Return the number of users in memory and the duplicate rate."""
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self._users.maxsize,
+                "history_ttl": self._users.ttl,
+                "threshold": self.threshold,
+                "checks": self.checks,
+                "duplicates": self.duplicates,
+                "duplicate_ratio": self.duplicates / self.checks if self.checks else 0.0,
+                "pending_writes": self._writes.qsize(),
+            }
+
+    def _start_writer(self):
+        """Start the background writer on first use. Caller holds the lock."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name="challenge-history", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        """Persist recorded fingerprints until the process exits."""
+        while True:
+            user_id, challenge_id, title, signature = self._writes.get()
+            try:
+                with Session(bind=database.get_engine()) as db:
+                    db.add(ChallengeFingerprint(
+                        user_id=user_id,
+                        challenge_id=challenge_id,
+                        title=title[:256],
+                        signature=signature,
+                        created_at=datetime.datetime.utcnow(),
+                    ))
+                    db.flush()
+                    self._prune(db, user_id)
+                    db.commit()
+            except Exception as e:
+                logger.error("Error saving challenge fingerprint: %s", e)
+            finally:
+                # Writes are in record order, so this is the user's oldest pending record
+                with self._lock:
+                    pending = self._pending[user_id]
+                    pending.popleft()
+                    if not pending:
+                        del self._pending[user_id]
+                self._writes.task_done()
+
+    def _prune(self, db, user_id):
+        """Delete a user's fingerprints beyond the most recent max_per_user, in the caller's transaction."""
+        # The newest row past the cap, found with the (user_id, created_at) index
+        cutoff = db.query(ChallengeFingerprint.created_at, ChallengeFingerprint.id).filter_by(
+            user_id=user_id
+        ).order_by(
+            ChallengeFingerprint.created_at.desc(), ChallengeFingerprint.id.desc()
+        ).offset(self.max_per_user).first()
+        if cutoff is None:
+            return
+        created_at, row_id = cutoff
+        db.query(ChallengeFingerprint).filter(
+            ChallengeFingerprint.user_id == user_id,
+            or_(
+                ChallengeFingerprint.created_at < created_at,
+                and_(ChallengeFingerprint.created_at == created_at, ChallengeFingerprint.id <= row_id),
+            ),
+        ).delete(synchronize_session=False)
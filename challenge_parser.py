@@ -0,0 +1,282 @@
+"""
+Structured-output parser for generated challenges.
+Finds the JSON in a model response (fenced blocks first, then bare), repairs the
+usual defects (trailing commas, truncated output), and validates each challenge
+against the schema the app relies on, so a response is only thrown away when
+nothing usable is left in it.
+"""
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# JSON schema for one challenge; also sent to providers that support a response schema
+CHALLENGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "function_name": {"type": "string"},
+        "examples": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "input": {"type": "string"},
+                    "output": {"type": "string"},
+                    "explanation": {"type": "string"},
+                },
+                "required": ["input", "output"],
+            },
+        },
+        "difficulty": {"type": "string"},
+        "hints": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "description", "examples", "difficulty", "hints"],
+}
+
+CHALLENGE_ARRAY_SCHEMA = {"type": "array", "items": CHALLENGE_SCHEMA}
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Markdown code blocks, with their language tag
+_FENCE = re.compile(r"```[ \t]*([\w-]*)[^\n]*\n(.*?)```", re.DOTALL)
+
+# Starting positions tried per source before giving up, bounding the work on long chatter
+MAX_JSON_CANDIDATES = 32
+
+
+class ChallengeParseError(ValueError):
+    """Raised when no valid challenge can be recovered from a response."""
+
+
+def extract_json(text, expected=None):
+    """
+    Extract and repair the first usable JSON object or array in a model response.
+
+    Fenced code blocks are tried first (```json ones before the rest), then the
+    whole text. In each, decoding starts at the first '{' or '['; when the value
+    found there does not decode or is not what the caller expects, the scan moves
+    on to the next '{' or '[', so bracketed chatter before the JSON is skipped.
+    Well-formed JSON is decoded directly; otherwise trailing commas are dropped and
+    a value cut off by the end of the text is closed at the last point where it was
+    complete, so a cut-off string is dropped rather than kept half-written.
+
+    Args:
+        expected: Predicate a decoded value must satisfy; by default an object or a
+            non-empty array of objects
+
+    Returns:
+        The decoded value, or None if no JSON could be recovered
+    """
+    expected = expected or _is_document
+    for source in _fenced_blocks(text) + [text]:
+        start = _find_json_start(source)
+        for _ in range(MAX_JSON_CANDIDATES):
+            if start == -1:
+                break
+            value = _extract_at(source, start)
+            if value is not None and expected(value):
+                return value
+            start = _find_json_start(source, start + 1)
+    return None
+
+
+def _extract_at(text, start):
+    """Decode, or repair and decode, the JSON value starting at text[start]."""
+    # Fast path for well-formed output: decode up to the last matching closing bracket
+    end = text.rfind(_CLOSERS[text[start]])
+    if end > start:
+        value = _loads(text[start:end + 1])
+        if value is not None:
+            return value
+
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    # (output length, open brackets) after each complete array element or object member
+    cut_points = []
+
+    for char in text[start:]:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if not stack or _CLOSERS[stack[-1]] != char:
+                break  # Unbalanced: stop at what was read so far
+            _drop_trailing_comma(out)
+            stack.pop()
+            out.append(char)
+            if not stack:
+                return _loads(''.join(out))
+            cut_points.append((len(out), tuple(stack)))
+            continue
+        elif char == ",":
+            cut_points.append((len(out), tuple(stack)))
+        out.append(char)
+
+    # Truncated: close the open brackets where the text stopped, unless it stopped inside
+    # a string, whose value would be cut off
+    if not in_string:
+        closed = _loads(_close(''.join(out), stack))
+        if closed is not None:
+            return closed
+
+    # Otherwise fall back to the latest point where every member was complete
+    for length, open_stack in reversed(cut_points):
+        value = _loads(_close(''.join(out[:length]), list(open_stack)))
+        if value is not None:
+            return value
+    return None
+
+
+def validate_challenge(data, difficulty=None):
+    """
+    Check a decoded challenge against the schema and normalize it.
+
+    Examples need an input and an output, and at least one hint is required;
+    non-string values are converted to strings. An unknown difficulty is replaced
+    by the requested one, and a function name that is not an identifier is dropped.
+
+    Returns:
+        The normalized challenge dict
+
+    Raises:
+        ChallengeParseError: If a required field is missing or unusable
+    """
+    if not isinstance(data, dict):
+        raise ChallengeParseError(f"Challenge is a {type(data).__name__}, not an object")
+
+    challenge = dict(data)
+    for field in ("title", "description"):
+        if not isinstance(challenge.get(field), str) or not challenge[field].strip():
+            raise ChallengeParseError(f"Challenge is missing '{field}'")
+        challenge[field] = challenge[field].strip()
+
+    examples = []
+    for example in challenge.get("examples") or []:
+        if isinstance(example, dict) and "input" in example and "output" in example:
+            examples.append({key: _as_text(value) for key, value in example.items()})
+    if not examples:
+        raise ChallengeParseError("Challenge has no usable examples")
+    challenge["examples"] = examples
+
+    hints = challenge.get("hints") or []
+    challenge["hints"] = [_as_text(hint) for hint in hints if hint] if isinstance(hints, list) else [_as_text(hints)]
+    if not challenge["hints"]:
+        raise ChallengeParseError("Challenge has no hints")
+
+    # The name of the function to implement is optional; the code runner falls back to finding it
+    function_name = challenge.pop("function_name", None)
+    if isinstance(function_name, str) and function_name.strip().isidentifier():
+        challenge["function_name"] = function_name.strip()
+
+    stated = str(challenge.get("difficulty", "")).strip().lower()
+    challenge["difficulty"] = stated if stated in DIFFICULTIES else (difficulty or "medium")
+    return challenge
+
+
+def parse_challenge(text, difficulty=None):
+    """
+    Parse a single challenge from a model response.
+
+    Raises:
+        ChallengeParseError: If no valid challenge can be recovered
+    """
+    data = extract_json(text)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if data is None:
+        raise ChallengeParseError("No JSON object found in the response")
+    return validate_challenge(data, difficulty)
+
+
+def parse_challenges(text, difficulties=None):
+    """
+    Parse an array of challenges from a model response, keeping every valid one.
+
+    Invalid entries are skipped and a truncated array keeps its complete entries.
+
+    Args:
+        difficulties: Requested difficulty per position, used for entries without a valid one
+
+    Returns:
+        A list of normalized challenge dicts (possibly empty)
+    """
+    data = extract_json(text)
+    if data is None:
+        return []
+    if isinstance(data, dict):
+        data = [data]
+
+    challenges = []
+    for i, entry in enumerate(data):
+        difficulty = difficulties[i] if difficulties and i < len(difficulties) else None
+        try:
+            challenges.append(validate_challenge(entry, difficulty))
+        except ChallengeParseError as e:
+            logger.warning("Skipping invalid challenge %d in batch response: %s", i + 1, e)
+    return challenges
+
+
+def _find_json_start(text, position=0):
+    """Position of the first '{' or '[' at or after position, or -1."""
+    positions = [pos for pos in (text.find("{", position), text.find("[", position)) if pos != -1]
+    return min(positions) if positions else -1
+
+
+def _fenced_blocks(text):
+    """Contents of the Markdown code blocks in the text, ```json ones first."""
+    blocks = _FENCE.findall(text)
+    return [body for tag, body in blocks if tag.lower() == "json"] + [body for tag, body in blocks if tag.lower() != "json"]
+
+
+def _is_document(value):
+    """Whether a decoded value can hold challenges: an object or a non-empty array of objects."""
+    if isinstance(value, list):
+        return bool(value) and all(isinstance(item, dict) for item in value)
+    return isinstance(value, dict)
+
+
+def _drop_trailing_comma(out):
+    """Remove a ',' (and the whitespace after it) from the end of the output."""
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i:]
+
+
+def _close(text, stack):
+    """Append the closing brackets for the still-open ones, after dropping a trailing comma or colon."""
+    text = text.rstrip()
+    while text.endswith((",", ":")):
+        text = text[:-1].rstrip()
+    return text + ''.join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def _as_text(value):
+    return value if isinstance(value, str) else json.dumps(value)
@@ -0,0 +1,271 @@
+"""
+Pre-generated challenge pool.
+Keeps a small stock of ready challenges per (LLM client, difficulty, language,
+context) bucket and refills it from background worker threads, so requests can be
+served without waiting on the LLM.
+"""
+import logging
+import queue
+import re
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_context(context):
+    """Normalize a free-text topic so equivalent requests share a bucket."""
+    if not context:
+        return ''
+    return re.sub(r'\s+', ' ', context.strip().lower())
+
+
+class ChallengePool:
+    """Per-bucket stock of generated challenges with background refill workers."""
+
+    # Synchronous generations tried for a request before a rejected challenge is served
+    GENERATION_ATTEMPTS = 2
+
+    def __init__(self, target_depth=3, num_workers=2, max_buckets=64, store=None):
+        """
+        Initialize the challenge pool.
+
+        Args:
+            target_depth: Number of ready challenges to keep in each bucket
+            num_workers: Number of background refill threads
+            max_buckets: Maximum number of buckets kept before the least recently used is dropped
+            store: Optional ChallengeStore; challenges are saved to it when generated,
+                so serving one from the pool needs no database write
+        """
+        self.target_depth = target_depth
+        self.num_workers = num_workers
+        self.max_buckets = max_buckets
+        self.store = store
+
+        self._buckets = OrderedDict()  # bucket key -> deque of challenges
+        self._bucket_stats = {}  # bucket key -> {"hits": int, "misses": int}
+        self._services = {}  # bucket key -> LLMService used to refill it
+        self._pending = set()  # bucket keys queued for or currently being refilled
+        self._lock = threading.Lock()
+        self._refill_queue = queue.Queue()
+        self._workers = []
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bucket_key(llm_service, difficulty=None, additional_context=None, language="javascript"):
+        """Build the bucket key for a challenge request."""
+        return (
+            llm_service.client_key,
+            difficulty or None,
+            language or "javascript",
+            normalize_context(additional_context),
+        )
+
+    def get(self, llm_service, difficulty=None, additional_context=None, language="javascript", accept=None):
+        """
+        Get a challenge for the request, served from the pool when possible.
+
+        Falls back to synchronous generation when the bucket is empty. Either way
+        the bucket is scheduled for a refill up to the target depth, and the
+        challenge has been saved to the store, if any.
+
+        Args:
+            accept: Optional predicate a challenge must pass, e.g. not being a
+                duplicate of one the user has seen; generation is retried once
+                before a rejected challenge is served anyway
+
+        Returns:
+            The challenge dict, or None if generation failed
+        """
+        challenge = self.get_ready(llm_service, difficulty, additional_context, language, accept)
+        if challenge is None:
+            for _ in range(self.GENERATION_ATTEMPTS):
+                challenge = llm_service.generate_challenge(difficulty, additional_context, language)
+                if challenge and self.store is not None:
+                    self.store.save(challenge, language=language)
+                if not challenge or accept is None or accept(challenge):
+                    break
+        return challenge
+
+    async def aget(self, llm_service, difficulty=None, additional_context=None, language="javascript", accept=None):
+        """
+        Async version of get() for the ASGI app.
+
+        Takes a ready challenge the same way and awaits generation when the bucket
+        has none, with the same accept check and retry.
+
+        Returns:
+            The challenge dict, or None if generation failed
+        """
+        challenge = self.get_ready(llm_service, difficulty, additional_context, language, accept)
+        if challenge is None:
+            for _ in range(self.GENERATION_ATTEMPTS):
+                challenge = await llm_service.agenerate_challenge(difficulty, additional_context, language)
+                if challenge and self.store is not None:
+                    await self.store.asave(challenge, language=language)
+                if not challenge or accept is None or accept(challenge):
+                    break
+        return challenge
+
+    def get_ready(self, llm_service, difficulty=None, additional_context=None, language="javascript", accept=None):
+        """
+        Take a ready challenge from the pool without generating one.
+
+        Never blocks on the LLM, so it is safe to call from an event loop. The
+        bucket is scheduled for a refill either way.
+
+        Args:
+            accept: Optional predicate a challenge must pass; rejected challenges
+                stay in the bucket for other users
+
+        Returns:
+            The challenge dict, or None if the bucket has no acceptable challenge
+        """
+        key = self.bucket_key(llm_service, difficulty, additional_context, language)
+        challenge = self._take(key, llm_service, accept)
+
+        # Only services with a stable identity (registry clients and the default service) own a bucket
+        if llm_service.client_key is not None and llm_service.is_ready:
+            self._schedule_refill(key)
+        return challenge
+
+    def warm(self, llm_service, difficulty=None, additional_context=None, language="javascript"):
+        """Schedule a refill for a bucket without taking a challenge from it."""
+        key = self.bucket_key(llm_service, difficulty, additional_context, language)
+        with self._lock:
+            self._bucket(key, llm_service)
+        self._schedule_refill(key)
+
+    def stats(self):
+        """
+        Return pool depth and hit/miss counts overall and per bucket.
+
+        Buckets only say whether they have a topic; the free text users typed is left out.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            buckets = []
+            for key, bucket in self._buckets.items():
+                _, difficulty, language, context = key
+                buckets.append({
+                    "model": self._services[key].model_name,
+                    "difficulty": difficulty,
+                    "language": language,
+                    "custom_context": bool(context),
+                    "depth": len(bucket),
+                    "refilling": key in self._pending,
+                    **self._bucket_stats[key],
+                })
+            return {
+                "target_depth": self.target_depth,
+                "workers": self.num_workers,
+                "depth": sum(len(bucket) for bucket in self._buckets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "buckets": buckets,
+            }
+
+    def _bucket(self, key, llm_service):
+        """Return the bucket for a key, creating it and evicting stale buckets. Caller holds the lock."""
+        # Always refill with the most recent instance; the registry may have rebuilt the client
+        self._services[key] = llm_service
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+            self._bucket_stats[key] = {"hits": 0, "misses": 0}
+            while len(self._buckets) > self.max_buckets:
+                stale_key, _ = self._buckets.popitem(last=False)
+                self._bucket_stats.pop(stale_key, None)
+                self._services.pop(stale_key, None)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _take(self, key, llm_service, accept=None):
+        """Pop the first acceptable challenge from a bucket and record the hit or miss."""
+        with self._lock:
+            bucket = self._bucket(key, llm_service)
+            candidates = list(bucket)
+        # The predicate may be slow (a first call can load the user's history), so run it unlocked
+        wanted = next((c for c in candidates if accept is None or accept(c)), None)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            challenge = None
+            if wanted is not None and bucket is not None:
+                try:
+                    bucket.remove(wanted)  # Another request may have taken it meanwhile
+                    challenge = wanted
+                except ValueError:
+                    pass
+            stats = self._bucket_stats.get(key)
+            if challenge is None:
+                self.misses += 1
+                if stats:
+                    stats["misses"] += 1
+            else:
+                self.hits += 1
+                if stats:
+                    stats["hits"] += 1
+            return challenge
+
+    def _schedule_refill(self, key):
+        """Queue a bucket for refilling unless it is full or already queued."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or len(bucket) >= self.target_depth or key in self._pending:
+                return
+            self._pending.add(key)
+            self._start_workers()
+        self._refill_queue.put(key)
+
+    def _start_workers(self):
+        """Start the refill threads on first use. Caller holds the lock."""
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"challenge-pool-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        """Refill queued buckets up to the target depth."""
+        while True:
+            key = self._refill_queue.get()
+            try:
+                self._refill(key)
+            except Exception as e:
+                logger.error("Error refilling challenge pool: %s", e, exc_info=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._refill_queue.task_done()
+
+    def _refill(self, key):
+        """Generate enough challenges to bring one bucket back to the target depth."""
+        _, difficulty, language, context = key
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            deficit = self.target_depth - len(bucket)
+            llm_service = self._services[key]
+        if deficit <= 0:
+            return
+
+        challenges = llm_service.generate_multiple_challenges(
+            count=deficit,
+            difficulties=[difficulty],
+            additional_context=context or None,
+            language=language,
+        )
+        if self.store is not None:
+            for challenge in challenges:
+                self.store.save(challenge, language=language)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.extend(challenges[:max(0, self.target_depth - len(bucket))])
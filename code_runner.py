@@ -0,0 +1,856 @@
+"""
+Local runner for submitted solutions.
+Runs a challenge's examples against a submission and reports pass/fail and the
+time each example took. Code that does not compile is reported without an LLM
+call, and the LLM review is given the results of the run as context.
+
+Every run happens in a sandbox: new PID, network, mount and IPC namespaces with
+only the system libraries and the interpreters mounted, read-only, and a small
+writable /tmp. Bubblewrap is used when it is installed, otherwise util-linux
+`unshare` when the app runs as root. Inside it, a supervisor process that never
+runs submitted code starts the submission in a worker process under its own user
+ID with CPU time, memory, file size and process count limits, hands it the
+example inputs one at a time and reports what it returned. The worker cannot
+reach the channel the results are reported on, and the whole sandbox is torn
+down with its PID namespace when a run ends or times out.
+"""
+import ast
+import json
+import logging
+import math
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Output read from a run before it is killed
+MAX_OUTPUT_BYTES = 1024 * 1024
+
+# Largest result a worker may return for one example; a run reports at most MAX_EXAMPLES of them
+MAX_RESULT_BYTES = 32 * 1024
+
+# Examples run per submission; challenges have two or three
+MAX_EXAMPLES = 20
+
+# Processes and threads the submission may have at once (Node.js starts about ten threads)
+MAX_PROCESSES = 64
+
+# V8 reserves about a gigabyte of address space up front, on top of the heap it is given
+NODE_ADDRESS_SPACE_MB = 1024
+
+# First user ID submissions run as; each worker slot has its own, so process limits are per run
+SANDBOX_UID_BASE = 64000
+
+SANDBOXES = ("bwrap", "unshare")
+
+LANGUAGES = {
+    "python": "python", "python3": "python", "py": "python",
+    "javascript": "javascript", "js": "javascript", "node": "javascript",
+}
+
+# Runs inside the sandbox and never executes submitted code. It builds the filesystem
+# jail when asked to (the unshare sandbox), starts the worker under the limits, sends
+# it the examples and writes what came back to its stdout, which the worker cannot reach.
+SUPERVISOR = """
+import ctypes, json, os, resource, subprocess, sys, time
+
+MAX_RESULT_BYTES = __MAX_RESULT_BYTES__
+PR_SET_DUMPABLE, PR_SET_NO_NEW_PRIVS = 4, 38
+MS_RDONLY, MS_NOSUID, MS_NODEV, MS_NOEXEC, MS_REMOUNT, MS_BIND, MS_REC, MS_PRIVATE = (
+    1, 2, 4, 8, 32, 4096, 16384, 1 << 18)
+
+config = json.loads(sys.argv[1])
+libc = ctypes.CDLL(None, use_errno=True)
+
+def emit(record):
+    data = (json.dumps(record) + "\\n").encode("utf-8")
+    while data:
+        data = data[os.write(1, data):]
+
+def mount(source, target, fstype=None, flags=0, data=None):
+    encode = lambda value: None if value is None else value.encode()
+    if libc.mount(encode(source), encode(target), encode(fstype), ctypes.c_ulong(flags), encode(data)) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), target)
+
+def enter_jail(jail):
+    root = jail["root"]
+    mount(None, "/", None, MS_REC | MS_PRIVATE)
+    mount("tmpfs", root, "tmpfs", MS_NOSUID | MS_NODEV, "size=1m,mode=755")
+    for path in jail["binds"]:
+        target = root + path
+        if os.path.isdir(path):
+            os.makedirs(target, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            open(target, "a").close()
+        mount(path, target, None, MS_BIND | MS_REC)
+        flags = MS_REMOUNT | MS_BIND | MS_RDONLY | MS_NOSUID
+        mount(None, target, None, flags if path.startswith("/dev/") else flags | MS_NODEV)
+    for path in jail["hidden"]:
+        mount("tmpfs", root + path, "tmpfs", MS_RDONLY | MS_NOSUID | MS_NODEV, "size=4k,mode=755")
+    for link, target in jail["symlinks"]:
+        os.symlink(target, root + link)
+    os.mkdir(root + "/tmp")
+    mount("tmpfs", root + "/tmp", "tmpfs", MS_NOSUID | MS_NODEV, "size=%d,mode=1777" % jail["tmpBytes"])
+    os.mkdir(root + "/proc")
+    mount("proc", root + "/proc", "proc", MS_NOSUID | MS_NODEV | MS_NOEXEC, "hidepid=2")
+    mount(None, root, None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV)
+    os.chroot(root)
+
+if config.get("jail"):
+    enter_jail(config["jail"])
+os.chdir("/tmp")
+# Under bubblewrap the worker has this process's user ID; keep it out of our /proc entries
+libc.prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+
+def limit_worker():
+    libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0)
+    resource.setrlimit(resource.RLIMIT_CPU, (config["cpuSeconds"], config["cpuSeconds"] + 1))
+    if config["memoryBytes"]:
+        resource.setrlimit(resource.RLIMIT_AS, (config["memoryBytes"], config["memoryBytes"]))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (config["fileBytes"], config["fileBytes"]))
+    resource.setrlimit(resource.RLIMIT_NPROC, (config["processes"], config["processes"]))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+payload = json.loads(sys.stdin.buffer.read())
+user = {"user": config["uid"], "group": config["uid"], "extra_groups": []} if config.get("uid") else {}
+worker = subprocess.Popen(
+    config["worker"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    env={"PATH": "/usr/bin:/bin", "HOME": "/tmp", "LANG": "C.UTF-8"}, preexec_fn=limit_worker, **user,
+)
+
+def send(message):
+    try:
+        worker.stdin.write((json.dumps(message) + "\\n").encode("utf-8"))
+        worker.stdin.flush()
+        return True
+    except OSError:
+        return False
+
+def receive():
+    line = worker.stdout.readline(MAX_RESULT_BYTES + 1)
+    if not line:
+        return None
+    if not line.endswith(b"\\n"):
+        return {"error": "Result larger than %d KB" % (MAX_RESULT_BYTES // 1024), "tooLarge": True}
+    try:
+        message = json.loads(line)
+    except ValueError:
+        message = None
+    return message if isinstance(message, dict) else {"error": "The result could not be read"}
+
+def run():
+    examples = payload["examples"]
+    arg_count = next((len(args) for args in examples if args is not None), None)
+    if not send({"code": payload["code"], "entry": payload.get("entry"), "argCount": arg_count}):
+        return
+    loaded = receive()
+    if loaded is None:
+        return
+    for key in ("compileError", "loadError"):
+        if key in loaded:
+            emit({key: str(loaded[key])[:4000]})
+            return
+    if "entry" not in loaded:
+        emit({"loadError": "The submission did not start"})
+        return
+    emit({"entry": str(loaded["entry"])[:200]})
+    # Only the value or error is taken from the worker; the example index and timing are ours
+    for index, args in enumerate(examples):
+        if args is None:
+            continue
+        start = time.perf_counter()
+        if not send({"args": args}):
+            return
+        message = receive()
+        ms = (time.perf_counter() - start) * 1000
+        if message is None:
+            return
+        if "actual" in message:
+            emit({"index": index, "ms": ms, "actual": message["actual"]})
+        else:
+            emit({"index": index, "ms": ms, "error": str(message.get("error", "No result"))[:4000]})
+        if message.get("tooLarge"):
+            return
+
+run()
+try:
+    worker.stdin.close()
+except OSError:
+    pass
+try:
+    returncode = worker.wait(timeout=1)
+except subprocess.TimeoutExpired:
+    worker.kill()
+    returncode = worker.wait()
+else:
+    if returncode != 0:
+        emit({"exit": returncode})
+"""
+
+# Runs the submission. Requests arrive as JSON lines on private copies of stdin and
+# stdout; the submission's own output is discarded.
+PYTHON_WORKER = """
+import json, os, sys, traceback, types
+
+requests = os.fdopen(os.dup(0), "rb")
+results = os.dup(1)
+_devnull = os.open(os.devnull, os.O_RDWR)
+for fd in (0, 1, 2):
+    os.dup2(_devnull, fd)
+
+def describe(error):
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
+
+def jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        try:
+            return sorted(value)
+        except TypeError:
+            return list(value)
+    return repr(value)
+
+def send(record):
+    try:
+        data = json.dumps(record, default=jsonable)
+    except (TypeError, ValueError, RecursionError) as e:
+        data = json.dumps({"error": "The result could not be serialized: " + describe(e)})
+    data = (data + "\\n").encode("utf-8")
+    while data:
+        data = data[os.write(results, data):]
+
+def referenced_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= referenced_names(const)
+    return names
+
+def accepts(fn, count):
+    code = fn.__code__
+    positional = code.co_argcount - (1 if isinstance(fn, types.MethodType) else 0)
+    required = positional - len(fn.__defaults__ or ())
+    return required <= count and (count <= positional or bool(code.co_flags & 0x04))
+
+def find_entry(namespace, name, arg_count):
+    solution = namespace.get("Solution")
+    methods = []
+    if isinstance(solution, type):
+        instance = solution()
+        methods = [getattr(instance, key) for key, value in vars(solution).items()
+                   if callable(value) and not key.startswith("_")]
+    if name:
+        if callable(namespace.get(name)):
+            return namespace[name]
+        for method in methods:
+            if method.__name__ == name:
+                return method
+    if methods:
+        return methods[0]
+    functions = [value for value in namespace.values()
+                 if isinstance(value, types.FunctionType) and value.__module__ == "__submission__"]
+    if arg_count is not None:
+        functions = [fn for fn in functions if accepts(fn, arg_count)] or functions
+    # Prefer a function no other function calls: helpers are called by the solution
+    called = set()
+    for fn in functions:
+        called |= referenced_names(fn.__code__) - {fn.__name__}
+    entries = [fn for fn in functions if fn.__name__ not in called] or functions
+    return entries[0] if entries else None
+
+request = json.loads(requests.readline())
+try:
+    compiled = compile(request["code"], "<submission>", "exec")
+except (SyntaxError, ValueError) as e:
+    send({"compileError": describe(e)})
+    sys.exit(0)
+
+namespace = {"__name__": "__submission__", "__builtins__": __builtins__}
+try:
+    exec(compiled, namespace)
+    entry = find_entry(namespace, request.get("entry"), request.get("argCount"))
+except BaseException as e:
+    send({"loadError": describe(e)})
+    sys.exit(0)
+if entry is None:
+    send({"loadError": "No function to call was found in the submission"})
+    sys.exit(0)
+send({"entry": entry.__name__})
+
+for line in requests:
+    try:
+        send({"actual": entry(*json.loads(line)["args"])})
+    except BaseException as e:
+        send({"error": describe(e)})
+"""
+
+JAVASCRIPT_WORKER = """
+const fs = require('fs');
+const vm = require('vm');
+
+const replacer = (key, value) => {
+    if (value instanceof Set) return [...value];
+    if (value instanceof Map) return Object.fromEntries(value);
+    if (typeof value === 'bigint') return Number(value);
+    if (typeof value === 'function') return String(value);
+    return value === undefined ? null : value;
+};
+const describe = error => (error && error.stack) ? String(error.stack).split('\\n    at ')[0] : String(error);
+
+function send(record) {
+    let data;
+    try {
+        data = JSON.stringify(record, replacer);
+    } catch (error) {
+        data = JSON.stringify({ error: 'The result could not be serialized: ' + describe(error) });
+    }
+    const buffer = Buffer.from(data + '\\n');
+    for (let offset = 0; offset < buffer.length;) offset += fs.writeSync(1, buffer, offset);
+}
+
+let pending = Buffer.alloc(0);
+const chunk = Buffer.alloc(65536);
+function readLine() {
+    for (;;) {
+        const newline = pending.indexOf(10);
+        if (newline >= 0) {
+            const line = pending.subarray(0, newline).toString('utf8');
+            pending = pending.subarray(newline + 1);
+            return line;
+        }
+        const count = fs.readSync(0, chunk, 0, chunk.length, null);
+        if (count === 0) return null;
+        pending = Buffer.concat([pending, chunk.subarray(0, count)]);
+    }
+}
+
+const request = JSON.parse(readLine());
+// ES module syntax is not available in a function body; the exported names are declared anyway
+const code = request.code.replace(/^([ \\t]*)export\\s+(default\\s+)?/gm, '$1');
+const declaration = /^[ \\t]*(?:async\\s+)?(?:function\\s*\\*?\\s*([A-Za-z_$][\\w$]*)|(?:const|let|var)\\s+([A-Za-z_$][\\w$]*)\\s*=|class\\s+([A-Za-z_$][\\w$]*))/gm;
+const names = [...new Set([...code.matchAll(declaration)].map(match => match[1] || match[2] || match[3]))];
+const collect = names.map(name => `${JSON.stringify(name)}: typeof ${name} === 'undefined' ? undefined : ${name}`);
+const source = `(function (module, exports, require) {\\n${code}\\n;return {${collect.join(', ')}};\\n})`;
+
+let factory;
+try {
+    factory = new vm.Script(source, { filename: 'submission.js', lineOffset: -1 }).runInThisContext();
+} catch (error) {
+    send({ compileError: describe(error) });
+    process.exit(0);
+}
+
+// The submission's own output is discarded
+for (const method of ['log', 'info', 'warn', 'error', 'debug', 'trace', 'dir', 'table']) {
+    console[method] = () => {};
+}
+process.stdout.write = process.stderr.write = () => true;
+
+const isClass = value => typeof value === 'function' && /^class\\b/.test(Function.prototype.toString.call(value));
+
+function findEntry(declared, name, argCount) {
+    let methods = [];
+    if (isClass(declared.Solution)) {
+        const instance = new declared.Solution();
+        const prototype = Object.getPrototypeOf(instance);
+        methods = Object.getOwnPropertyNames(prototype)
+            .filter(key => key !== 'constructor' && !key.startsWith('_') && typeof prototype[key] === 'function')
+            .map(key => Object.assign(prototype[key].bind(instance), { entryName: key }));
+    }
+    if (name) {
+        if (typeof declared[name] === 'function' && !isClass(declared[name])) return Object.assign(declared[name], { entryName: name });
+        const method = methods.find(candidate => candidate.entryName === name);
+        if (method) return method;
+    }
+    if (methods.length) return methods[0];
+    let functions = Object.entries(declared)
+        .filter(([, value]) => typeof value === 'function' && !isClass(value))
+        .map(([key, value]) => Object.assign(value, { entryName: key }));
+    if (argCount !== null) {
+        const matching = functions.filter(fn => fn.length <= argCount);
+        if (matching.length) functions = matching;
+    }
+    // Prefer a function no other function calls: helpers are called by the solution
+    const called = fn => functions.some(other => other !== fn &&
+        new RegExp(`\\\\b${fn.entryName.replace(/\\$/g, '\\\\$')}\\\\s*\\\\(`).test(String(other)));
+    const entries = functions.filter(fn => !called(fn));
+    return (entries.length ? entries : functions)[0] || null;
+}
+
+let entry;
+try {
+    const submissionModule = { exports: {} };
+    const declared = factory(submissionModule, submissionModule.exports, require);
+    if (typeof submissionModule.exports === 'function') {
+        declared[submissionModule.exports.name || 'default'] = submissionModule.exports;
+    } else if (submissionModule.exports && typeof submissionModule.exports === 'object') {
+        Object.assign(declared, submissionModule.exports);
+    }
+    entry = findEntry(declared, request.entry, request.argCount);
+} catch (error) {
+    send({ loadError: describe(error) });
+    process.exit(0);
+}
+if (!entry) {
+    send({ loadError: 'No function to call was found in the submission' });
+    process.exit(0);
+}
+send({ entry: entry.entryName });
+
+for (let line = readLine(); line !== null; line = readLine()) {
+    try {
+        send({ actual: entry(...JSON.parse(line).args) });
+    } catch (error) {
+        send({ error: describe(error) });
+    }
+}
+process.exit(0);
+"""
+
+
+def find_sandbox(name=None):
+    """
+    Pick the sandbox submissions run in.
+
+    Args:
+        name: 'bwrap' or 'unshare' to require one; by default bubblewrap is preferred
+            and unshare is used when the app runs as root
+
+    Returns:
+        (name, executable), or (None, None) if no usable sandbox is available
+    """
+    for candidate in ([name] if name else SANDBOXES):
+        executable = shutil.which(candidate)
+        # unshare only isolates the submission when it can mount and change user IDs
+        if executable and (candidate != "unshare" or os.geteuid() == 0):
+            return candidate, executable
+    return None, None
+
+
+def sandbox_paths(executables, hidden=()):
+    """
+    Work out the host paths mounted read-only in the sandbox.
+
+    Args:
+        executables: Interpreters that must run in the sandbox; their installations are mounted
+        hidden: Directories covered with an empty mount if they fall inside a mounted path
+
+    Returns:
+        (binds, symlinks, hidden): paths to mount, (link, target) pairs for top-level
+        symlinks such as /lib -> usr/lib, and the directories to cover
+    """
+    candidates = ['/usr', '/bin', '/sbin', '/lib', '/lib32', '/lib64', '/etc/ld.so.cache']
+    candidates += [os.path.dirname(os.path.dirname(os.path.realpath(executable))) for executable in executables]
+    binds, symlinks = [], []
+    for path in candidates:
+        if not os.path.lexists(path) or any(path == bind or path.startswith(bind + '/') for bind in binds):
+            continue
+        if os.path.islink(path) and os.path.dirname(path) == '/':
+            symlinks.append((path, os.readlink(path)))
+        else:
+            binds.append(path)
+    inside = lambda path: any(path == bind or path.startswith(bind + '/') for bind in binds)
+    return binds, symlinks, [path for path in dict.fromkeys(hidden) if os.path.isdir(path) and inside(path)]
+
+
+def parse_arguments(text):
+    """
+    Parse an example input into the positional arguments of a call.
+
+    Accepts what challenges use for inputs: a literal (`[1, 2, 3]`), several
+    comma-separated literals, or `name = value` pairs separated by commas or
+    newlines. JSON and JavaScript spellings of true, false and null are accepted.
+
+    Returns:
+        A list of argument values, or None if the input is not in a form that can be run
+    """
+    for source in (text, text.replace(';', ',').replace('\n', ',')):
+        try:
+            call = ast.parse(f"f({source.strip().rstrip(',')})", mode='eval').body
+            return [_literal(arg) for arg in call.args] + [_literal(keyword.value) for keyword in call.keywords]
+        except (SyntaxError, ValueError, RecursionError):
+            continue
+    return None
+
+
+def parse_expected(text):
+    """Parse an example output as a literal, falling back to the text itself."""
+    try:
+        return _json_value(_literal(ast.parse(text.strip(), mode='eval').body))
+    except (SyntaxError, ValueError, RecursionError):
+        return text.strip()
+
+
+def _literal(node):
+    """Evaluate a literal expression node, like ast.literal_eval with JSON and JavaScript constants."""
+    if isinstance(node, ast.Constant) and not isinstance(node.value, (bytes, type(Ellipsis))):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return [_literal(element) for element in node.elts]
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        return {_literal(key): _literal(value) for key, value in zip(node.keys, node.values)}
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _literal(node.operand)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.Name):
+        constants = {"true": True, "false": False, "null": None, "undefined": None,
+                     "True": True, "False": False, "None": None}
+        if node.id in constants:
+            return constants[node.id]
+    raise ValueError(f"Not a literal: {ast.dump(node)}")
+
+
+def _json_value(value):
+    """Convert a value to what it looks like after a JSON round trip (tuples become lists, keys strings)."""
+    return json.loads(json.dumps(value))
+
+
+def values_match(expected, actual):
+    """Compare an expected and an actual result, allowing for float rounding."""
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return expected is actual
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, rel_tol=1e-6, abs_tol=1e-9)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(expected) == len(actual) and all(map(values_match, expected, actual))
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(values_match(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, str) and not isinstance(actual, str):
+        # An output that could not be parsed is compared as text
+        return expected == json.dumps(actual)
+    return expected == actual
+
+
+class CodeRunner:
+    """Runs challenge examples against submissions in a sandbox, a bounded number at a time."""
+
+    def __init__(self, max_workers=0, timeout=5.0, cpu_seconds=2, memory_mb=256, queue_timeout=2.0,
+                 node_path=None, sandbox=None, uid_base=SANDBOX_UID_BASE):
+        """
+        Initialize the runner.
+
+        Args:
+            max_workers: Submissions run at the same time; 0 disables the runner
+            timeout: Wall-clock seconds a run may take, including sandbox and interpreter startup
+            cpu_seconds: CPU seconds a run may use
+            memory_mb: Memory a run may use, in megabytes
+            queue_timeout: Seconds to wait for a free worker before skipping the run
+            node_path: Node.js executable for JavaScript; found on the PATH by default
+            sandbox: 'bwrap' or 'unshare'; by default whichever is available
+            uid_base: User ID of the first worker slot; slot n runs submissions as uid_base + n
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.queue_timeout = queue_timeout
+        self.node_path = node_path or shutil.which('node')
+        self.python_path = os.path.realpath(sys.executable)
+        self.sandbox, self._sandbox_executable = find_sandbox(sandbox) if max_workers > 0 else (None, None)
+        if max_workers > 0 and self.sandbox is None:
+            logger.warning("No sandbox for running submissions was found (install bubblewrap, or run as "
+                           "root for unshare); submissions will not be run")
+        self._paths = sandbox_paths(
+            [self.python_path] + ([os.path.realpath(self.node_path)] if self.node_path else []),
+            hidden=[os.path.dirname(os.path.abspath(__file__)), os.getcwd()],
+        )
+        # Each worker slot has its own user ID, so a run's process limit is not shared with other runs
+        self._uids = queue.Queue()
+        for slot in range(max_workers if self.sandbox else 0):
+            self._uids.put(uid_base + slot)
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "passed": 0, "failed": 0, "compile_errors": 0, "errors": 0,
+                       "timeouts": 0, "busy": 0, "total_ms": 0.0}
+
+    def supports(self, language):
+        """Whether submissions in a language can be run here."""
+        language = LANGUAGES.get((language or '').lower())
+        if self.sandbox is None or self.max_workers <= 0 or language is None:
+            return False
+        return language != "javascript" or self.node_path is not None
+
+    def run(self, challenge, code, language):
+        """
+        Run a challenge's examples against a submission.
+
+        Returns:
+            A dict with the run status ('passed', 'failed', 'unchecked', 'compile_error'
+            or 'error'), the passed and total example counts and per-example results
+            with timings in milliseconds, or None if the language is not supported or
+            every worker stayed busy
+        """
+        if not self.supports(language):
+            return None
+        language = LANGUAGES[language.lower()]
+        try:
+            uid = self._uids.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            self._count("busy")
+            return None
+        try:
+            return self._run(challenge, code, language, uid)
+        finally:
+            self._uids.put(uid)
+
+    def _run(self, challenge, code, language, uid):
+        examples = (challenge.get("examples") or [])[:MAX_EXAMPLES]
+        arguments = [parse_arguments(str(example.get("input", ""))) for example in examples]
+        payload = json.dumps({"code": code, "examples": arguments, "entry": challenge.get("function_name")})
+
+        start = time.perf_counter()
+        records, failure = self._execute(language, payload.encode('utf-8'), uid)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        result = {"language": language, "ms": round(elapsed_ms, 1)}
+        if "compileError" in records:
+            result.update(status="compile_error", error=records["compileError"], passed=0, total=len(examples))
+            self._record(result)
+            return result
+
+        error = None
+        if "entry" not in records:
+            error = records.get("loadError") or failure or "The run ended without a result"
+        results, stopped = [], False
+        for index, example in enumerate(examples):
+            entry = {"input": example.get("input"), "expected": example.get("output"), "passed": None}
+            record = records.get(index)
+            if arguments[index] is None:
+                entry["error"] = "Input could not be parsed into arguments"
+            elif record is None:
+                if error or stopped or not failure:
+                    entry["error"] = "Not run"
+                else:
+                    # The run ended while this example was running
+                    entry.update(passed=False, error=failure)
+                    stopped = True
+            elif "error" in record:
+                entry.update(passed=False, ms=round(record["ms"], 3), error=record["error"])
+            else:
+                expected = parse_expected(str(example.get("output", "")))
+                entry.update(passed=values_match(expected, record["actual"]), ms=round(record["ms"], 3),
+                             actual=record["actual"])
+            results.append(entry)
+
+        checked = [entry for entry in results if entry["passed"] is not None]
+        passed = sum(1 for entry in checked if entry["passed"])
+        if error:
+            status = "error"
+            result["error"] = error
+        elif not checked:
+            status = "unchecked"
+        else:
+            status = "passed" if passed == len(checked) else "failed"
+        result.update(status=status, passed=passed, total=len(examples), entry=records.get("entry"), examples=results)
+        if failure == self._timeout_message():
+            self._count("timeouts")
+        self._record(result)
+        return result
+
+    def _command(self, language, workdir, uid):
+        """Build the command line that starts the supervisor in the sandbox."""
+        memory = self.memory_mb * 1024 * 1024
+        if language == "python":
+            worker = [self.python_path, '-I', '-S', '-B', '-c', PYTHON_WORKER]
+        else:
+            memory += NODE_ADDRESS_SPACE_MB * 1024 * 1024
+            worker = [os.path.realpath(self.node_path), f'--max-old-space-size={self.memory_mb}',
+                      '-e', JAVASCRIPT_WORKER]
+        config = {"worker": worker, "cpuSeconds": self.cpu_seconds, "memoryBytes": memory,
+                  "fileBytes": MAX_OUTPUT_BYTES, "processes": MAX_PROCESSES}
+
+        binds, symlinks, hidden = self._paths
+        if self.sandbox == "bwrap":
+            # Bubblewrap builds the jail and runs the supervisor as the slot's user ID in a user namespace
+            sandbox = [self._sandbox_executable, '--unshare-all', '--die-with-parent', '--new-session',
+                       '--cap-drop', 'ALL', '--uid', str(uid), '--gid', str(uid), '--hostname', 'sandbox']
+            for path in binds:
+                sandbox += ['--ro-bind', path, path]
+            for path in hidden:
+                sandbox += ['--tmpfs', path]
+            for link, target in symlinks:
+                sandbox += ['--symlink', target, link]
+            sandbox += ['--dev', '/dev', '--proc', '/proc', '--tmpfs', '/tmp', '--remount-ro', '/',
+                        '--chdir', '/tmp', '--clearenv', '--setenv', 'LANG', 'C.UTF-8', '--']
+        else:
+            # The supervisor builds the jail itself as root in the new namespaces and starts the
+            # worker as the slot's user ID; it is PID 1 there, so its exit ends every process left
+            sandbox = [self._sandbox_executable, '--pid', '--fork', '--kill-child', '--mount', '--net',
+                       '--ipc', '--uts', '--cgroup', '--']
+            config["uid"] = uid
+            config["jail"] = {"root": workdir, "binds": binds + ['/dev/null', '/dev/zero', '/dev/urandom'],
+                              "symlinks": symlinks, "hidden": hidden, "tmpBytes": 4 * MAX_OUTPUT_BYTES}
+        supervisor = SUPERVISOR.replace('__MAX_RESULT_BYTES__', str(MAX_RESULT_BYTES))
+        return sandbox + [self.python_path, '-I', '-S', '-B', '-c', supervisor, json.dumps(config)]
+
+    def _execute(self, language, payload, uid):
+        """
+        Run the supervisor in the sandbox and collect its result records.
+
+        Returns:
+            (records, failure): records by example index plus 'compileError', 'loadError'
+            and 'entry' when reported; failure describes how the run ended early, or None
+        """
+        with tempfile.TemporaryDirectory(prefix='code-runner-') as workdir:
+            process = subprocess.Popen(
+                self._command(language, workdir, uid), cwd=workdir, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                env={'PATH': os.defpath, 'LANG': 'C.UTF-8'}, start_new_session=True,
+            )
+            output = []
+            reader = threading.Thread(target=lambda: output.append(process.stdout.read(MAX_OUTPUT_BYTES + 1)),
+                                      name="code-runner-output", daemon=True)
+            reader.start()
+            try:
+                process.stdin.write(payload)
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+            # The reader finishes when the sandbox exits (or closes stdout) or writes too much
+            reader.join(self.timeout)
+            timed_out = reader.is_alive()
+            if timed_out or process.poll() is None:
+                self._kill(process)
+            returncode = process.wait()
+            reader.join()
+            process.stdout.close()
+
+        data = output[0] if output else b''
+        records = {}
+        for line in data[:MAX_OUTPUT_BYTES].decode('utf-8', errors='replace').splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if "index" in record:
+                records[record["index"]] = record
+            else:
+                records.update(record)
+
+        failure = None
+        if timed_out:
+            failure = self._timeout_message()
+        elif len(data) > MAX_OUTPUT_BYTES:
+            failure = "Output limit exceeded"
+        elif "exit" in records:
+            failure = self._describe_exit(records["exit"])
+        elif returncode != 0:
+            failure = f"The sandbox exited with status {returncode}"
+        return records, failure
+
+    def _timeout_message(self):
+        return f"Timed out after {self.timeout:g} seconds"
+
+    def _describe_exit(self, returncode):
+        """Describe how a worker that did not finish normally ended."""
+        if returncode in (-24, -9):  # SIGXCPU at the soft CPU limit, SIGKILL at the hard one
+            return f"CPU time limit of {self.cpu_seconds} seconds exceeded"
+        if returncode in (-6, 134):  # V8 aborts when the heap limit is reached
+            return f"Memory limit of {self.memory_mb} MB exceeded"
+        return f"Exited with status {returncode}"
+
+    @staticmethod
+    def _kill(process):
+        """Kill the sandbox; its PID namespace, and everything the submission started, goes with it."""
+        try:
+            os.killpg(process.pid, 9)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _record(self, result):
+        """Update the counters with a finished run."""
+        key = {"compile_error": "compile_errors", "error": "errors"}.get(result["status"], result["status"])
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["total_ms"] += result["ms"]
+            if key in self._stats:
+                self._stats[key] += 1
+
+    def stats(self):
+        """Return run counters and the average run time, including sandbox and interpreter startup."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_ms"] = stats.pop("total_ms") / stats["runs"] if stats["runs"] else 0.0
+        stats["max_workers"] = self.max_workers
+        stats["sandbox"] = self.sandbox
+        stats["javascript"] = self.node_path is not None
+        return stats
+
+
+def format_for_prompt(result):
+    """Summarize a run for the feedback prompt."""
+    if result is None:
+        return ""
+    if result["status"] == "compile_error":
+        return f"The solution does not compile:\n{result['error']}\n"
+    lines = [f"The challenge examples were run against the solution locally "
+             f"({result['passed']} of {result['total']} passed). The submitted function was called with each "
+             f"example input as its arguments, so a failure can also mean the solution expects its input differently."]
+    if result.get("error"):
+        lines.append(f"Run error: {result['error']}")
+    for number, example in enumerate(result.get("examples", []), 1):
+        if example["passed"] is None:
+            outcome = f"not checked ({example.get('error')})"
+        elif example["passed"]:
+            outcome = f"passed in {example['ms']:.3f} ms"
+        elif "error" in example:
+            outcome = f"raised {_shorten(example['error'])}"
+        else:
+            outcome = f"failed, returned {_shorten(json.dumps(example.get('actual')))}"
+        lines.append(f"- Example {number} (input: {_shorten(example['input'])}, expected: "
+                     f"{_shorten(example['expected'])}): {outcome}")
+    return "\n".join(lines) + "\n"
+
+
+def format_markdown(result):
+    """Render a run as Markdown for the feedback panel, or '' if nothing was run."""
+    if result is None:
+        return ""
+    if result["status"] == "compile_error":
+        return (
+            "## Your solution does not compile\n\n"
+            f"```\n{result['error']}\n```\n\n"
+            "Fix the error and submit again; the review runs once the code compiles.\n"
+        )
+    lines = [f"### Example tests: {result['passed']} of {result['total']} passed\n"]
+    if result.get("error"):
+        lines.append(f"**{_cell(result['error'])}**\n")
+    if result.get("examples"):
+        lines += ["| # | Input | Expected | Result | Time |", "|---|---|---|---|---|"]
+        for number, example in enumerate(result["examples"], 1):
+            if example["passed"] is None:
+                outcome = f"not checked: {example.get('error')}"
+            elif example["passed"]:
+                outcome = "passed"
+            elif "error" in example:
+                outcome = f"error: {example['error']}"
+            else:
+                outcome = f"failed, got {json.dumps(example.get('actual'))}"
+            timing = f"{example['ms']:.3f} ms" if "ms" in example else ""
+            lines.append(f"| {number} | {_cell(example['input'])} | {_cell(example['expected'])} | "
+                         f"{_cell(outcome)} | {timing} |")
+    return "\n".join(lines) + "\n\n"
+
+
+def _shorten(text, limit=200):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _cell(text, limit=80):
+    """Format text for a Markdown table cell."""
+    return _shorten(text, limit).replace("\n", " ").replace("|", "\\|")
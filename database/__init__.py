@@ -4,10 +4,12 @@ This package contains SQLAlchemy models and database setup.
 """
 
 from .config import DatabaseConfig
-from .database import db_session, init_db_schema, init_db_connection, Base
-from .models import User
+from .database import db_session, init_db_schema, init_db_connection, get_engine, get_pool_stats, Base
+from .models import User, Challenge
+from .challenge_store import ChallengeStore
+from .api_key_cache import ApiKeyCache
 
 __all__ = [
-    'db_session', 'init_db_schema', 'init_db_connection', 'Base', 'User',
-    'DatabaseConfig'
+    'db_session', 'init_db_schema', 'init_db_connection', 'get_engine', 'get_pool_stats', 'Base', 'User',
+    'Challenge', 'ChallengeStore', 'ApiKeyCache', 'DatabaseConfig'
 ]
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+API key cache module.
+Keeps each user's API keys in memory so LLM requests can pick a key without a
+database round trip. The API key routes invalidate a user's entry on every change,
+but only in the process that made it: a key changed or deleted through another
+worker process stays in use here until the entry's TTL expires. Lower
+API_KEY_CACHE_TTL to shorten that window.
+"""
+import threading
+from typing import NamedTuple
+from cachetools import TTLCache
+from .database import get_db_session
+from .models import LlmApiKey, LlmProvider
+from . import async_queries
+from .async_database import get_async_session
+
+
+class ApiKeyEntry(NamedTuple):
+    """Immutable snapshot of an LlmApiKey row, safe to share between requests."""
+    id: int
+    user_id: int
+    llm_provider: LlmProvider
+    api_key: str
+    created_at: object
+
+    def to_dict(self):
+        """Convert to the same dictionary as LlmApiKey.to_dict, with a masked key."""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'llm_provider': self.llm_provider.value,
+            'api_key': '••••••' + self.api_key[-4:] if self.api_key else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @classmethod
+    def from_model(cls, entry):
+        return cls(entry.id, entry.user_id, entry.llm_provider, entry.api_key, entry.created_at)
+
+
+class ApiKeyCache:
+    """Per-user cache of API key snapshots with explicit invalidation."""
+
+    def __init__(self, max_users=4096, ttl=300):
+        """
+        Initialize the API key cache.
+
+        Args:
+            max_users: Maximum number of users whose keys are kept in memory
+            ttl: Seconds before a user's keys are reloaded; bounds how long a change
+                made through another worker process can go unnoticed
+        """
+        self._cache = TTLCache(maxsize=max_users, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """
+        Get all API keys for a user, oldest first, loading them on a cache miss.
+
+        Returns:
+            A tuple of ApiKeyEntry
+        """
+        entries, generation = self._lookup(user_id)
+        if entries is not None:
+            return entries
+
+        db = get_db_session()
+        rows = db.query(LlmApiKey).filter_by(user_id=user_id).order_by(LlmApiKey.id).all()
+        return self._store(user_id, rows, generation)
+
+    async def aget(self, user_id):
+        """Async version of get, for use with init_async_db_connection."""
+        entries, generation = self._lookup(user_id)
+        if entries is not None:
+            return entries
+
+        async with get_async_session() as db:
+            rows = await async_queries.get_api_keys(db, user_id)
+        return self._store(user_id, rows, generation)
+
+    def invalidate(self, user_id):
+        """Drop a user's cached keys; call after adding, changing or deleting one."""
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(user_id, None)
+
+    def stats(self):
+        """Return the number of cached users and hit/miss counts."""
+        with self._lock:
+            self._cache.expire()
+            return {
+                "users": len(self._cache),
+                "max_users": self._cache.maxsize,
+                "ttl": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _lookup(self, user_id):
+        with self._lock:
+            entries = self._cache.get(user_id)
+            if entries is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entries, self._generation
+
+    def _store(self, user_id, rows, generation):
+        entries = tuple(ApiKeyEntry.from_model(row) for row in rows)
+        with self._lock:
+            # Skip caching if keys changed while they were loading; the rows may predate the change
+            if generation == self._generation:
+                self._cache[user_id] = entries
+        return entries
@@ -0,0 +1,60 @@
+"""
+Optional asynchronous database layer built on SQLAlchemy asyncio.
+Works alongside the synchronous scoped_session in database.py and needs an async
+driver installed: aiosqlite (SQLite), asyncpg (PostgreSQL) or aiomysql (MySQL).
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+async_engine = None
+async_session_factory = None
+
+def init_async_db_connection(config):
+    """
+    Initialize the async database engine and session factory.
+    
+    Args:
+        config: A DatabaseConfig instance
+    
+    Returns:
+        The AsyncEngine created with the provided configuration
+    """
+    global async_engine, async_session_factory
+    
+    options = config.async_engine_options()
+    if config.pgbouncer:
+        options['poolclass'] = NullPool
+    
+    config.ensure_db_path()
+    async_engine = create_async_engine(config.async_database_uri, **options)
+    
+    if config.pgbouncer and config.statement_timeout_ms and config.db_type == 'postgresql':
+        # Same per-transaction timeout as the sync engine; events attach to the sync engine
+        timeout_ms = config.statement_timeout_ms
+        
+        @event.listens_for(async_engine.sync_engine, "begin")
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+    
+    # Objects stay usable after commit, since lazy refreshes cannot run implicitly under asyncio
+    async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    return async_engine
+
+def get_async_session():
+    """
+    Create a new async session.
+    
+    Use it as an async context manager:
+    
+        async with get_async_session() as db:
+            user = await get_user(db, user_id)
+    """
+    if async_session_factory is None:
+        raise RuntimeError("Async database not initialized. Call init_async_db_connection first.")
+    return async_session_factory()
+
+async def dispose_async_engine():
+    """Close all pooled connections of the async engine."""
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,43 @@
+"""
+Async query helpers for the lookups used by the web app.
+Each helper takes an AsyncSession from get_async_session().
+"""
+from sqlalchemy import select
+from .models import User, LlmApiKey, Challenge
+
+
+async def get_user(db, user_id):
+    """Get a user by ID, or None."""
+    return await db.get(User, user_id)
+
+
+async def get_user_by_username(db, username):
+    """Get a user by username, or None."""
+    result = await db.execute(select(User).filter_by(username=username))
+    return result.scalars().first()
+
+
+async def get_api_keys(db, user_id):
+    """Get all API keys for a user, oldest first."""
+    result = await db.execute(select(LlmApiKey).filter_by(user_id=user_id).order_by(LlmApiKey.id))
+    return list(result.scalars().all())
+
+
+async def get_api_key(db, user_id, llm_provider):
+    """Get a user's API key for a provider (an LlmProvider), or None."""
+    result = await db.execute(
+        select(LlmApiKey).filter_by(user_id=user_id, llm_provider=llm_provider).order_by(LlmApiKey.id)
+    )
+    return result.scalars().first()
+
+
+async def get_challenge(db, challenge_id):
+    """Get a stored challenge dictionary by ID, or None."""
+    entry = await db.get(Challenge, challenge_id)
+    return entry.to_dict() if entry else None
+
+
+async def save_challenge(db, challenge, language=None):
+    """Insert or update a challenge and commit."""
+    await db.merge(Challenge.from_dict(challenge, language))
+    await db.commit()
@@ -0,0 +1,105 @@
+"""
+Challenge storage module.
+Persists generated challenges in the database behind a bounded in-memory LRU cache,
+so lookups are served from memory and shared between worker processes.
+"""
+import logging
+import threading
+from cachetools import LRUCache
+from sqlalchemy.orm import Session
+from . import database
+from .models import Challenge
+from . import async_queries
+from .async_database import get_async_session
+
+logger = logging.getLogger(__name__)
+
+
+class ChallengeStore:
+    """Read-through LRU cache in front of the challenges table."""
+    
+    def __init__(self, max_cache_size=1024):
+        """
+        Initialize the challenge store.
+        
+        Args:
+            max_cache_size: Maximum number of challenges kept in memory
+        """
+        self._cache = LRUCache(maxsize=max_cache_size)
+        self._lock = threading.Lock()
+    
+    def _session(self):
+        return Session(bind=database.get_engine())
+    
+    def get(self, challenge_id):
+        """
+        Get a challenge by ID, loading it from the database on a cache miss.
+        
+        Returns:
+            The challenge dictionary, or None if it does not exist
+        """
+        with self._lock:
+            challenge = self._cache.get(challenge_id)
+        if challenge is not None:
+            return challenge
+        
+        with self._session() as db:
+            entry = db.get(Challenge, challenge_id)
+            if entry is None:
+                return None
+            challenge = entry.to_dict()
+        
+        with self._lock:
+            self._cache[challenge_id] = challenge
+        return challenge
+    
+    def save(self, challenge, language=None):
+        """
+        Store a challenge in the cache and persist it to the database.
+        
+        If the database write fails the challenge stays available from this
+        process's cache, so the current user can still continue with it. The
+        write uses its own session, so it never commits or rolls back the
+        caller's request session and leaves nothing open on pool threads.
+        """
+        with self._lock:
+            self._cache[challenge['id']] = challenge
+        
+        try:
+            with self._session() as db:
+                db.merge(Challenge.from_dict(challenge, language))
+                db.commit()
+        except Exception as e:
+            logger.error("Error saving challenge %s: %s", challenge['id'], e)
+    
+    async def aget(self, challenge_id):
+        """Async version of get, for use with init_async_db_connection."""
+        with self._lock:
+            challenge = self._cache.get(challenge_id)
+        if challenge is not None:
+            return challenge
+        
+        async with get_async_session() as db:
+            challenge = await async_queries.get_challenge(db, challenge_id)
+        if challenge is None:
+            return None
+        
+        with self._lock:
+            self._cache[challenge_id] = challenge
+        return challenge
+    
+    async def asave(self, challenge, language=None):
+        """Async version of save, for use with init_async_db_connection."""
+        with self._lock:
+            self._cache[challenge['id']] = challenge
+        
+        try:
+            async with get_async_session() as db:
+                await async_queries.save_challenge(db, challenge, language=language)
+        except Exception as e:
+            logger.error("Error saving challenge %s: %s", challenge['id'], e)
+    
+    def stats(self):
+        """Return the number of cached challenges and the cache bound."""
+        with self._lock:
+            return {"cached": len(self._cache), "max_cache_size": self._cache.maxsize}
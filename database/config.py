@@ -8,7 +8,9 @@ class DatabaseConfig:
     """Database configuration class for interview helper application."""
     
     def __init__(self, db_name=None, db_type='sqlite', db_host=None, db_user=None, 
-                 db_password=None, db_port=None, db_path=None):
+                 db_password=None, db_port=None, db_path=None, pool_size=5, max_overflow=10,
+                 pool_timeout=30, pool_recycle=1800, pool_pre_ping=True, statement_timeout_ms=None,
+                 pgbouncer=False):
         """
         Initialize database configuration.
         
@@ -20,6 +22,15 @@ class DatabaseConfig:
             db_password: Database password
             db_port: Database port
             db_path: Custom path for SQLite database files
+            pool_size: Connections kept open in the pool per process
+            max_overflow: Extra connections allowed beyond pool_size under load
+            pool_timeout: Seconds to wait for a free connection before failing
+            pool_recycle: Seconds after which a connection is replaced (avoids server-side idle timeouts)
+            pool_pre_ping: Check connections for liveness before handing them out
+            statement_timeout_ms: Server-side statement timeout in milliseconds (PostgreSQL, MySQL)
+            pgbouncer: Running behind PgBouncer in transaction mode: disable client-side
+                pooling (NullPool) and session-level settings. psycopg2 never uses
+                server-side prepared statements, so nothing else needs turning off
         """
         self.db_name = db_name or 'interview_helper'
         self.db_type = db_type
@@ -27,28 +38,45 @@ class DatabaseConfig:
         self.db_user = db_user
         self.db_password = db_password
         self.db_port = db_port
+        self.pool_size = int(pool_size)
+        self.max_overflow = int(max_overflow)
+        self.pool_timeout = float(pool_timeout)
+        self.pool_recycle = int(pool_recycle)
+        self.pool_pre_ping = pool_pre_ping
+        self.statement_timeout_ms = int(statement_timeout_ms) if statement_timeout_ms else None
+        self.pgbouncer = pgbouncer
         
-        print(f"Database type: {self.db_type}")
-        print(f"Database name: {self.db_name}")
-        print(f"Database host: {self.db_host}")
-        print(f"Database user: {self.db_user}")
-        print(f"Database port: {self.db_port}")
-
-        # Set default database directory
-        if db_path:
-            self.db_path = db_path
-        else:
-            # Default to 'instance' folder in project root
-            self.db_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                'instance'
-            )
-            
-            # Create the directory if it doesn't exist
-            if not os.path.exists(self.db_path):
-                os.makedirs(self.db_path)
+        # Default to the 'instance' folder in the project root; created when the SQLite engine is
+        self.db_path = db_path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'instance'
+        )
+    
+    @classmethod
+    def from_env(cls):
+        """Build the configuration from the DB_* environment variables."""
+        return cls(
+            db_name=os.environ.get('DB_NAME', 'interview_helper'),
+            db_type=os.environ.get('DB_TYPE', 'postgresql'),
+            db_host=os.environ.get('DB_HOST', 'localhost'),
+            db_user=os.environ.get('DB_USER', 'user'),
+            db_password=os.environ.get('DB_PASSWORD', 'password'),
+            db_port=os.environ.get('DB_PORT', 5432),
+            db_path=os.environ.get('DB_PATH'),
+            pool_size=os.environ.get('DB_POOL_SIZE', 5),
+            max_overflow=os.environ.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=os.environ.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=os.environ.get('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+            statement_timeout_ms=os.environ.get('DB_STATEMENT_TIMEOUT_MS'),
+            pgbouncer=os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true',
+        )
+    
+    def ensure_db_path(self):
+        """Create the SQLite database directory if it doesn't exist."""
+        if self.db_type == 'sqlite':
+            os.makedirs(self.db_path, exist_ok=True)
     
-        print(f"Database path: {self.db_path}")
     @property
     def database_uri(self):
         """Get database URI based on configuration."""
@@ -57,11 +85,78 @@ class DatabaseConfig:
         elif self.db_type == 'mysql':
             return f'mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port or 3306}/{self.db_name}'
         elif self.db_type == 'postgresql':
-            uri=f'postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port or 5432}/{self.db_name}'
-            print(uri)
-            return uri
+            return f'postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port or 5432}/{self.db_name}'
         else:
             raise ValueError(f"Unsupported database type: {self.db_type}")
 
+    @property
+    def async_database_uri(self):
+        """Get the database URI for the async engine (aiosqlite, aiomysql or asyncpg driver)."""
+        uri = self.database_uri
+        if self.db_type == 'sqlite':
+            return uri.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+        elif self.db_type == 'mysql':
+            return uri.replace('mysql+pymysql://', 'mysql+aiomysql://', 1)
+        elif self.db_type == 'postgresql':
+            return uri.replace('postgresql://', 'postgresql+asyncpg://', 1)
+        raise ValueError(f"Unsupported database type: {self.db_type}")
+    
+    def async_engine_options(self):
+        """
+        Get keyword arguments for create_async_engine based on the pool settings.
+        
+        asyncpg takes server settings and prepared statement options instead of a
+        libpq options string, so the PostgreSQL connect arguments differ from the
+        sync engine's.
+        """
+        options = self.engine_options()
+        if self.db_type != 'postgresql':
+            return options
+        
+        connect_args = {}
+        if self.statement_timeout_ms and not self.pgbouncer:
+            connect_args['server_settings'] = {'statement_timeout': str(self.statement_timeout_ms)}
+        if self.pgbouncer:
+            # asyncpg prepares every statement; PgBouncer in transaction mode cannot route them
+            connect_args['statement_cache_size'] = 0
+            connect_args['prepared_statement_cache_size'] = 0
+        
+        options.pop('connect_args', None)
+        if connect_args:
+            options['connect_args'] = connect_args
+        return options
+    
+    def engine_options(self):
+        """
+        Get keyword arguments for create_engine based on the pool settings.
+        
+        The pool class itself is chosen by init_db_connection.
+        """
+        if self.db_type == 'sqlite':
+            # SQLite connections are local files; the default pool is fine
+            return {}
+        
+        options = {'pool_pre_ping': self.pool_pre_ping}
+        connect_args = {}
+        
+        if not self.pgbouncer:
+            options.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+            )
+        
+        if self.statement_timeout_ms:
+            if self.db_type == 'postgresql' and not self.pgbouncer:
+                connect_args['options'] = f'-c statement_timeout={self.statement_timeout_ms}'
+            elif self.db_type == 'mysql':
+                connect_args['init_command'] = f'SET SESSION MAX_EXECUTION_TIME={self.statement_timeout_ms}'
+            # Behind PgBouncer the timeout is set per transaction instead (see init_db_connection)
+        
+        if connect_args:
+            options['connect_args'] = connect_args
+        return options
+
 # Default configuration
 # default_config = DatabaseConfig()
\ No newline at end of file
@@ -1,13 +1,49 @@
 """
 Database connection and session management module.
+The engine is created on first use rather than when the connection is configured,
+so importing and starting the app does no database I/O.
 """
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 engine = None
 db_session = None
+_config = None
+_engine_lock = threading.Lock()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            with self._wait_lock:
+                self.checkout_timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._wait_lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return connection
 
 def get_db_session():
     """
@@ -21,49 +57,124 @@ def get_db_session():
         raise RuntimeError("Database session not initialized. Call init_db_connection first.")
     return db_session
 
+class LazyBindSession(Session):
+    """Session that binds to the engine when it first runs a statement, creating it if needed."""
+    
+    def get_bind(self, mapper=None, **kwargs):
+        return get_engine()
+
 def init_db_connection(config=None):
     """
-    Initialize the database connection with the given configuration.
+    Configure the database connection with the given configuration.
     If no configuration is provided, use the default.
     
+    Only the scoped session is set up here; the engine is created on first use
+    (see get_engine), so this never blocks on the database.
+    
     Args:
         config: A DatabaseConfig instance
     
     Returns:
-        The engine created with the provided configuration
+        The scoped session
     """
-    global engine, db_session
+    global engine, db_session, _config
     
     if config is None:
-        from .config import default_config
-        config = default_config
+        from .config import DatabaseConfig
+        config = DatabaseConfig()
     
-    try:
-        print("Initializing database connection...")
-        print(f"Using DB URI: {config.database_uri}")  # Debug info (ensure you don't leak sensitive data in production)
-
-        engine = create_engine(config.database_uri)
-
-        # Test connection explicitly
-        connection = engine.connect()
-        print("Database connection established successfully.")
-        connection.close()
-
+    with _engine_lock:
+        if engine is not None:
+            engine.dispose()
+        engine = None
+        _config = config
         db_session = scoped_session(
-            sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            sessionmaker(class_=LazyBindSession, autocommit=False, autoflush=False)
         )
         Base.query = db_session.query_property()
-    except Exception as e:
-        print(f"Error initializing the database connection: {e}")
-        # Optionally, re-raise or handle the error appropriately.
     
-    return engine
+    return db_session
 
-def init_db_schema():
-    """Initialize the database schema."""
-    if engine is None:
-        raise RuntimeError("Database connection not initialized. Call init_db_connection first.")
+def get_engine():
+    """
+    Get the database engine, creating it on first use.
+    
+    Returns:
+        The engine for the configuration passed to init_db_connection
+    """
+    global engine
+    if engine is not None:
+        return engine
+    
+    with _engine_lock:
+        if engine is not None:
+            return engine
+        if _config is None:
+            raise RuntimeError("Database connection not initialized. Call init_db_connection first.")
+        
+        config = _config
+        options = config.engine_options()
+        if config.pgbouncer:
+            # PgBouncer does the pooling; holding connections here would pin server connections
+            options['poolclass'] = NullPool
+        elif config.db_type != 'sqlite':
+            options['poolclass'] = InstrumentedQueuePool
+        
+        config.ensure_db_path()
+        try:
+            new_engine = create_engine(config.database_uri, **options)
+        except Exception as e:
+            logger.error("Error initializing the database connection: %s", e)
+            raise
+        logger.info("Database engine created for %s", new_engine.url.render_as_string(hide_password=True))
+        
+        if config.pgbouncer and config.statement_timeout_ms and config.db_type == 'postgresql':
+            # Session-level settings leak between clients in transaction pooling mode,
+            # so apply the timeout to each transaction instead
+            timeout_ms = config.statement_timeout_ms
+            
+            @event.listens_for(new_engine, "begin")
+            def set_statement_timeout(conn):
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+        
+        engine = new_engine
+        return engine
 
+def get_pool_stats():
+    """
+    Get live statistics for the connection pool.
+    
+    Returns:
+        A dictionary with the pool type, size, checked-out and overflow connections,
+        and checkout wait times where the pool records them
+    """
+    pool = get_engine().pool
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._wait_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'checkout_timeouts': pool.checkout_timeouts,
+                'avg_wait_ms': round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                'max_wait_ms': round(pool.max_wait * 1000, 3),
+            })
+    return stats
+
+def init_db_schema():
+    """
+    Create any missing tables directly from the models.
+    
+    For scripts and throwaway databases only; the app's schema is managed with the
+    Alembic migrations in migrations/ (`alembic upgrade head`).
+    """
     # Import all models here to ensure they are registered properly on the metadata
-    from . import models   # Check if the database is initialized
-    Base.metadata.create_all(bind=engine)
+    from . import models
+    Base.metadata.create_all(bind=get_engine())
@@ -2,11 +2,11 @@
 Database models for the interview helper application.
 """
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Enum, JSON, Index
 import enum
 from sqlalchemy.orm import relationship
-from werkzeug.security import generate_password_hash, check_password_hash
 from .database import Base
+from .passwords import get_password_hasher
 
 
 class LlmModel(enum.Enum):
@@ -77,11 +77,15 @@ class User(Base):
     
     def set_password(self, password):
         """Hash password and store it."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Verify the password against the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Whether the stored hash was made with outdated hashing parameters."""
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user object to dictionary (without password)."""
@@ -98,6 +102,10 @@ class User(Base):
 class LlmApiKey(Base):
     """Model for storing LLM API keys."""
     __tablename__ = 'llm_api_keys'
+    __table_args__ = (
+        # Key lookups always filter by user, and usually by provider too
+        Index('ix_llm_api_keys_user_provider', 'user_id', 'llm_provider'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -124,4 +132,86 @@ class LlmApiKey(Base):
         }
     
     def __repr__(self):
-        return f'<LlmApiKey {self.llm_provider.value} for user {self.user_id}>'
\ No newline at end of file
+        return f'<LlmApiKey {self.llm_provider.value} for user {self.user_id}>'
+
+
+class Challenge(Base):
+    """Model for storing generated coding challenges."""
+    __tablename__ = 'challenges'
+    
+    id = Column(String(64), primary_key=True)
+    title = Column(String(256), nullable=False)
+    difficulty = Column(String(16))
+    language = Column(String(32))
+    data = Column(JSON, nullable=False)  # Full challenge payload, including hints
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    
+    @classmethod
+    def from_dict(cls, challenge, language=None):
+        """Create a row from a challenge dictionary, as returned by the API."""
+        return cls(
+            id=challenge['id'],
+            title=challenge.get('title', '')[:256],
+            difficulty=challenge.get('difficulty'),
+            language=language,
+            data=challenge,
+        )
+    
+    def to_dict(self):
+        """Convert challenge object to the challenge dictionary used by the API."""
+        return dict(self.data)
+    
+    def __repr__(self):
+        return f'<Challenge {self.id}: {self.title}>'
+
+
+class LlmResponseCache(Base):
+    """Model for cached LLM hint and feedback responses (optional SQL cache backend)."""
+    __tablename__ = 'llm_response_cache'
+    
+    key = Column(String(64), primary_key=True)  # SHA-256 of the normalized request
+    endpoint = Column(String(32), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<LlmResponseCache {self.endpoint} {self.key[:12]}>'
+
+
+class ChallengeFingerprint(Base):
+    """MinHash fingerprint of a challenge served to a user, for near-duplicate detection."""
+    __tablename__ = 'challenge_fingerprints'
+    __table_args__ = (
+        # A user's history is loaded newest first
+        Index('ix_challenge_fingerprints_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    challenge_id = Column(String(64), nullable=False)
+    title = Column(String(256), nullable=False)  # Normalized title
+    signature = Column(JSON, nullable=False)  # MinHash signature as a list of integers
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChallengeFingerprint {self.challenge_id} for user {self.user_id}>'
+
+
+class LlmJob(Base):
+    """Model for the status and result of an asynchronous LLM job, shared by all worker processes."""
+    __tablename__ = 'llm_jobs'
+    
+    id = Column(String(32), primary_key=True)
+    type = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    # Epoch seconds, for millisecond wait and run times
+    enqueued_at = Column(Float, nullable=False)
+    started_at = Column(Float)
+    finished_at = Column(Float)
+    expires_at = Column(Float, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<LlmJob {self.type} {self.id}: {self.status}>'
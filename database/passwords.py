@@ -0,0 +1,156 @@
+"""
+Password hashing module.
+Hashes and verifies passwords on a small dedicated thread pool with a fixed
+concurrency budget, so a burst of logins cannot take every CPU and request thread
+away from the rest of the app. The hash method is configurable, and stored hashes
+made with other parameters can be upgraded on the next successful login.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# werkzeug's scrypt defaults (n, r, p)
+DEFAULT_SCRYPT_PARAMS = (2 ** 15, 8, 1)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing concurrency budget is used up."""
+
+
+def normalize_method(method):
+    """
+    Expand a hash method to the full prefix werkzeug stores with the hash.
+
+    'pbkdf2' becomes 'pbkdf2:sha256:<default iterations>' and 'scrypt' becomes
+    'scrypt:32768:8:1'; 'argon2' is returned unchanged.
+    """
+    parts = method.lower().split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{int(iterations)}"
+    if parts[0] == 'scrypt':
+        params = [int(value) for value in parts[1:]] + list(DEFAULT_SCRYPT_PARAMS[len(parts) - 1:])
+        return "scrypt:" + ":".join(str(value) for value in params)
+    if parts[0] == 'argon2':
+        return 'argon2'
+    raise ValueError(f"Unsupported password hash method: {method}")
+
+
+class PasswordHasher:
+    """Configurable password hasher running on a bounded executor."""
+
+    def __init__(self, method='scrypt', max_workers=2, max_concurrent=8, wait_timeout=1.0):
+        """
+        Initialize the password hasher.
+
+        Args:
+            method: werkzeug method string ('scrypt', 'scrypt:n:r:p', 'pbkdf2',
+                'pbkdf2:sha256:iterations') or 'argon2' (needs argon2-cffi)
+            max_workers: Threads doing hashing work, i.e. CPUs hashing may use at once
+            max_concurrent: Hash operations running or waiting for a thread; more are rejected
+            wait_timeout: Seconds a request waits for room in the budget before it is rejected
+        """
+        self.method = normalize_method(method)
+        self.max_workers = max_workers
+        self.max_concurrent = max_concurrent
+        self.wait_timeout = wait_timeout
+        self._argon2 = None
+        if self.method == 'argon2':
+            self._argon2_hasher()  # Fail at startup, not on the first login, if argon2-cffi is missing
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._budget = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        return self._run(self._hash, password)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash made with any supported method."""
+        return self._run(self._verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other parameters than the configured ones."""
+        if password_hash.startswith('$argon2'):
+            return self.method != 'argon2' or self._argon2_hasher().check_needs_rehash(password_hash)
+        return password_hash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        """Return the hashing configuration and the number of rejected operations."""
+        with self._lock:
+            rejected = self.rejected
+        return {
+            'method': self.method.split(':', 1)[0],
+            'max_workers': self.max_workers,
+            'max_concurrent': self.max_concurrent,
+            'rejected': rejected,
+        }
+
+    def _run(self, fn, *args):
+        """Run hashing work on the executor within the concurrency budget."""
+        if not self._budget.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Too many concurrent password operations. Please retry shortly.")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._budget.release()
+
+    def _hash(self, password):
+        if self.method == 'argon2':
+            return self._argon2_hasher().hash(password)
+        return generate_password_hash(password, method=self.method)
+
+    def _verify(self, password_hash, password):
+        if password_hash.startswith('$argon2'):
+            from argon2.exceptions import VerificationError, InvalidHashError
+            try:
+                return self._argon2_hasher().verify(password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        return check_password_hash(password_hash, password)
+
+    def _argon2_hasher(self):
+        """Create the argon2 hasher on first use; argon2-cffi is an optional dependency."""
+        if self._argon2 is None:
+            try:
+                from argon2 import PasswordHasher as Argon2PasswordHasher
+            except ImportError:
+                raise RuntimeError("The argon2-cffi package is required for argon2 password hashes. "
+                                   "Install it with `pip install argon2-cffi`.")
+            self._argon2 = Argon2PasswordHasher()
+        return self._argon2
+
+
+# Hasher used by the User model; replaced by configure_password_hasher
+_password_hasher = None
+_password_hasher_lock = threading.Lock()
+
+
+def configure_password_hasher(**options):
+    """
+    Configure the hasher used by the User model.
+
+    Args:
+        options: Keyword arguments for PasswordHasher
+
+    Returns:
+        The new PasswordHasher
+    """
+    global _password_hasher
+    with _password_hasher_lock:
+        _password_hasher = PasswordHasher(**options)
+        return _password_hasher
+
+
+def get_password_hasher():
+    """Get the configured hasher, creating one with default settings if needed."""
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is None:
+            _password_hasher = PasswordHasher()
+        return _password_hasher
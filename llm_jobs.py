@@ -0,0 +1,341 @@
+"""
+Asynchronous LLM job queue.
+Endpoints enqueue slow LLM work and return a job ID right away; a bounded pool of
+worker threads runs the jobs and clients poll for the result. Job status and
+results are kept in a backend: the database by default, so a poll answered by
+another worker process finds the job, or process memory for a single process.
+"""
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+from database import database
+from database.models import LlmJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobStoreUnavailable(Exception):
+    """Raised when the job backend cannot be read or written."""
+
+
+class Job:
+    """A unit of LLM work tracked by the job queue."""
+
+    def __init__(self, job_type, fn, args=(), kwargs=None):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._done = threading.Event()
+
+    @property
+    def wait_ms(self):
+        """Time spent in the queue before a worker picked the job up."""
+        if self.started_at is None:
+            return (time.time() - self.enqueued_at) * 1000
+        return (self.started_at - self.enqueued_at) * 1000
+
+    @property
+    def run_ms(self):
+        """Time spent running, or None if the job has not started."""
+        if self.started_at is None:
+            return None
+        return ((self.finished_at or time.time()) - self.started_at) * 1000
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or the timeout expires. Returns True if finished."""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """Convert the job to a dictionary for the API."""
+        return job_dict(self.id, self.type, self.status, self.result, self.error,
+                        self.enqueued_at, self.started_at, self.finished_at)
+
+
+def job_dict(job_id, job_type, status, result, error, enqueued_at, started_at, finished_at):
+    """Build the API representation of a job from its fields."""
+    now = time.time()
+    wait_ms = ((started_at or now) - enqueued_at) * 1000
+    run_ms = ((finished_at or now) - started_at) * 1000 if started_at is not None else None
+    return {
+        'jobId': job_id,
+        'type': job_type,
+        'status': status,
+        'result': result,
+        'error': error,
+        'waitMs': round(wait_ms, 1),
+        'runMs': round(run_ms, 1) if run_ms is not None else None,
+    }
+
+
+class MemoryJobBackend:
+    """Keeps jobs in process memory; only the process that ran a job can answer a poll for it."""
+
+    def __init__(self, max_jobs=10000, ttl=600):
+        self._jobs = TTLCache(maxsize=max_jobs, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            # The stored Job object is updated in place, so later saves need not touch the cache
+            if job.id not in self._jobs:
+                self._jobs[job.id] = job
+
+    def load(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job is not None else None
+
+
+class SqlJobBackend:
+    """
+    Keeps jobs in the database, shared by all worker processes.
+
+    Uses its own short-lived sessions so job updates never commit or roll back a
+    request's session.
+    """
+
+    # Expired rows are pruned once every this many new jobs
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, max_jobs=None, ttl=600):
+        self.ttl = ttl
+        self._jobs = 0
+        self._lock = threading.Lock()
+
+    def _session(self):
+        return Session(bind=database.get_engine())
+
+    def save(self, job):
+        with self._session() as db:
+            db.merge(LlmJob(
+                id=job.id, type=job.type, status=job.status, result=job.result, error=job.error,
+                enqueued_at=job.enqueued_at, started_at=job.started_at, finished_at=job.finished_at,
+                expires_at=job.enqueued_at + self.ttl,
+            ))
+            db.commit()
+
+        if job.status == 'queued':
+            with self._lock:
+                self._jobs += 1
+                prune = self._jobs % self.PRUNE_INTERVAL == 0
+            if prune:
+                self._prune()
+
+    def load(self, job_id):
+        with self._session() as db:
+            row = db.get(LlmJob, job_id)
+            if row is None or row.expires_at < time.time():
+                return None
+            return job_dict(row.id, row.type, row.status, row.result, row.error,
+                            row.enqueued_at, row.started_at, row.finished_at)
+
+    def _prune(self):
+        """Delete expired jobs."""
+        with self._session() as db:
+            db.query(LlmJob).filter(LlmJob.expires_at < time.time()).delete(synchronize_session=False)
+            db.commit()
+
+
+class LlmJobQueue:
+    """Bounded queue of LLM jobs served by a fixed pool of worker threads."""
+
+    # How often, and for at most how long, a poll that waits on a job run by another process
+    # checks the backend; the request thread sleeps in between, so the wait is kept short
+    POLL_INTERVAL = 0.25
+    MAX_REMOTE_WAIT = 5
+
+    def __init__(self, num_workers=4, max_queue_size=100, result_ttl=600, max_jobs=10000, backend=None):
+        """
+        Initialize the job queue.
+
+        Args:
+            num_workers: Number of worker threads running jobs
+            max_queue_size: Maximum number of jobs waiting for a worker
+            result_ttl: Seconds a job (and its result) can be polled after it was submitted
+            max_jobs: Maximum number of jobs tracked for polling by this process
+            backend: Where job status and results are kept for polling (SqlJobBackend by default)
+        """
+        self.num_workers = num_workers
+        self.backend = backend or SqlJobBackend(ttl=result_ttl)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        # Jobs submitted in this process, so a poll that reaches it can wait on them without polling
+        self._jobs = TTLCache(maxsize=max_jobs, ttl=result_ttl)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._stats = defaultdict(lambda: {
+            'queued': 0,
+            'running': 0,
+            'completed': 0,
+            'failed': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_run_ms': 0.0,
+            'max_run_ms': 0.0,
+        })
+
+    def submit(self, job_type, fn, *args, **kwargs):
+        """
+        Enqueue a job.
+
+        Args:
+            job_type: Name used to group jobs in the stats (e.g. 'challenge', 'hint')
+            fn: Callable that does the work; its return value becomes the job result
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: If the queue is at capacity
+            JobStoreUnavailable: If the job could not be saved for polling; it is not run
+        """
+        job = Job(job_type, fn, args, kwargs)
+        full = JobQueueFull(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+        if self._queue.full():
+            raise full
+        # Saved before a worker can pick it up, so its later updates are not overwritten
+        try:
+            self.backend.save(job)
+        except Exception as e:
+            logger.error("Error saving job %s: %s", job.id, e)
+            raise JobStoreUnavailable("Jobs cannot be stored right now") from e
+        with self._lock:
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+                self._jobs[job.id] = job
+                self._stats[job_type]['queued'] += 1
+                return job
+            except queue.Full:
+                pass
+        # Filled up in the meantime
+        job.status, job.error = 'failed', str(full)
+        self._save(job)
+        raise full
+
+    def get(self, job_id, wait=None):
+        """
+        Get a job's status and result from any worker process.
+
+        Args:
+            wait: Seconds to wait for the job to finish before returning it; at most
+                MAX_REMOTE_WAIT for a job run by another process
+
+        Returns:
+            The job as a dict for the API, or None if it is unknown or has expired
+
+        Raises:
+            JobStoreUnavailable: If the backend could not be read
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            if wait:
+                job.wait(wait)
+            return job.to_dict()
+
+        deadline = time.monotonic() + min(wait or 0, self.MAX_REMOTE_WAIT)
+        while True:
+            try:
+                data = self.backend.load(job_id)
+            except Exception as e:
+                logger.error("Error loading job %s: %s", job_id, e)
+                raise JobStoreUnavailable("Jobs cannot be read right now") from e
+            remaining = deadline - time.monotonic()
+            if data is None or data['status'] in ('completed', 'failed') or remaining <= 0:
+                return data
+            time.sleep(min(self.POLL_INTERVAL, remaining))
+
+    def stats(self):
+        """Return queue depth, wait time and run time per job type."""
+        with self._lock:
+            by_type = {}
+            for job_type, stats in self._stats.items():
+                started = stats['running'] + stats['completed'] + stats['failed']
+                finished = stats['completed'] + stats['failed']
+                by_type[job_type] = {
+                    'queued': stats['queued'],
+                    'running': stats['running'],
+                    'completed': stats['completed'],
+                    'failed': stats['failed'],
+                    'avg_wait_ms': round(stats['total_wait_ms'] / started, 1) if started else 0.0,
+                    'max_wait_ms': round(stats['max_wait_ms'], 1),
+                    'avg_run_ms': round(stats['total_run_ms'] / finished, 1) if finished else 0.0,
+                    'max_run_ms': round(stats['max_run_ms'], 1),
+                }
+            return {
+                'workers': self.num_workers,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_size': self._queue.maxsize,
+                'jobs': by_type,
+            }
+
+    def _start_workers(self):
+        """Start the worker threads on first use. Caller holds the lock."""
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"llm-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        """Run queued jobs until the process exits."""
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        """Run a single job and record its timings."""
+        job.started_at = time.time()
+        job.status = 'running'
+        self._save(job)
+        with self._lock:
+            stats = self._stats[job.type]
+            stats['queued'] -= 1
+            stats['running'] += 1
+            stats['total_wait_ms'] += job.wait_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], job.wait_ms)
+
+        try:
+            job.result = job._fn(*job._args, **job._kwargs)
+            job.status = 'completed'
+        except Exception as e:
+            logger.error("Error running %s job %s: %s", job.type, job.id, e, exc_info=True)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            with self._lock:
+                stats['running'] -= 1
+                stats[job.status] += 1
+                stats['total_run_ms'] += job.run_ms
+                stats['max_run_ms'] = max(stats['max_run_ms'], job.run_ms)
+            job._done.set()
+
+    def _save(self, job):
+        """Store a job's progress; backend errors are logged, and the job keeps running."""
+        try:
+            self.backend.save(job)
+        except Exception as e:
+            logger.error("Error saving %s job %s: %s", job.type, job.id, e)
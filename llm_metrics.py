@@ -0,0 +1,240 @@
+"""
+Instrumentation for LLM calls.
+Records per-method and per-model latency histograms, approximate prompt and
+response token counts, call outcomes, retries, calls the router rejected or
+abandoned, and challenge parse failures. The
+metrics are exposed in the Prometheus text format and can also be appended to a
+JSONL file, one record per event, for offline analysis.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds; model calls take from tens of
+# milliseconds (cached or fake) to about a minute (long feedback)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets, as Prometheus expects."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in, or None without samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return float('inf')
+
+
+class JsonlSink:
+    """Appends metric records to a JSONL file from a background thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._records = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="llm-metrics-log", daemon=True)
+        self._writer.start()
+
+    def write(self, record):
+        self._records.put(record)
+
+    def flush(self):
+        """Wait until every queued record has been written."""
+        self._records.join()
+
+    def _writer_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                record = self._records.get()
+                try:
+                    f.write(json.dumps(record) + "\n")
+                    # Flush once the queue is drained, not once per record
+                    if self._records.empty():
+                        f.flush()
+                except Exception as e:
+                    logger.error("Error writing LLM metrics record: %s", e)
+                finally:
+                    self._records.task_done()
+
+
+class LlmMetrics:
+    """Thread-safe LLM call metrics with Prometheus and JSONL output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}  # (method, provider, model, outcome) -> Histogram
+        self._prompt_tokens = {}  # (method, provider, model) -> approximate tokens
+        self._response_tokens = {}  # (method, provider, model) -> approximate tokens
+        self._retries = {}  # (method, provider, model) -> retries after a failed attempt
+        self._router_events = {}  # (event, method, provider, model) -> calls rejected or abandoned
+        self._parses = {}  # (method, outcome) -> challenges parsed or missing
+        self.sink = None
+
+    def set_sink(self, sink):
+        """Also write every event to a sink such as a JsonlSink; None stops writing."""
+        self.sink = sink
+
+    def observe_call(self, method, provider, model, seconds, prompt_tokens, response_tokens=0, error=None):
+        """
+        Record one model call attempt.
+
+        Args:
+            method: LLM service method the call was made for, e.g. 'get_hint'
+            provider: Provider of the adapter that made the call
+            model: Model name of the adapter that made the call
+            seconds: Time the call took, not counting rate limit waits
+            prompt_tokens: Approximate prompt tokens
+            response_tokens: Approximate response tokens, 0 if the call failed
+            error: The exception if the call failed
+        """
+        outcome = "error" if error is not None else "ok"
+        provider, model = str(provider), str(model)
+        with self._lock:
+            histogram = self._latency.get((method, provider, model, outcome))
+            if histogram is None:
+                histogram = self._latency[(method, provider, model, outcome)] = Histogram()
+            histogram.observe(seconds)
+            key = (method, provider, model)
+            self._prompt_tokens[key] = self._prompt_tokens.get(key, 0) + prompt_tokens
+            self._response_tokens[key] = self._response_tokens.get(key, 0) + response_tokens
+        self._emit({
+            "event": "call", "method": method, "provider": provider, "model": model, "outcome": outcome,
+            "seconds": round(seconds, 6), "prompt_tokens": prompt_tokens, "response_tokens": response_tokens,
+            **({"error": type(error).__name__} if error is not None else {}),
+        })
+
+    def record_retry(self, method, provider, model):
+        """Record a retry of a call whose primary adapter is provider/model."""
+        key = (method, str(provider), str(model))
+        with self._lock:
+            self._retries[key] = self._retries.get(key, 0) + 1
+        self._emit({"event": "retry", "method": method, "provider": key[1], "model": key[2]})
+
+    def record_router_event(self, event, method, provider, model):
+        """
+        Record a call the router rejected or abandoned.
+
+        Args:
+            event: 'rejected' if no call thread was free, 'abandoned' if the call was
+                left running in the background after its deadline or a hedge won
+            method: LLM service method the call was made for
+            provider: Provider of the adapter the call was for
+            model: Model name of the adapter the call was for
+        """
+        key = (event, method, str(provider), str(model))
+        with self._lock:
+            self._router_events[key] = self._router_events.get(key, 0) + 1
+        self._emit({"event": event, "method": method, "provider": key[2], "model": key[3]})
+
+    def record_parse(self, method, parsed, failed=0):
+        """Record how many challenges were parsed from a response and how many were missing or invalid."""
+        with self._lock:
+            for outcome, count in (("ok", parsed), ("failed", failed)):
+                if count:
+                    self._parses[(method, outcome)] = self._parses.get((method, outcome), 0) + count
+        self._emit({"event": "parse", "method": method, "parsed": parsed, "failed": failed})
+
+    def snapshot(self):
+        """Return the metrics as JSON-friendly dicts, with estimated p50/p95/p99 latencies."""
+        with self._lock:
+            calls = []
+            for (method, provider, model, outcome), histogram in sorted(self._latency.items()):
+                calls.append({
+                    "method": method, "provider": provider, "model": model, "outcome": outcome,
+                    "count": histogram.count,
+                    "mean_seconds": histogram.sum / histogram.count,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p95_seconds": histogram.quantile(0.95),
+                    "p99_seconds": histogram.quantile(0.99),
+                })
+            parsed = sum(count for (_, outcome), count in self._parses.items() if outcome == "ok")
+            failed = sum(count for (_, outcome), count in self._parses.items() if outcome == "failed")
+            return {
+                "calls": calls,
+                "prompt_tokens": sum(self._prompt_tokens.values()),
+                "response_tokens": sum(self._response_tokens.values()),
+                "retries": sum(self._retries.values()),
+                "rejected_calls": sum(v for (event, *_), v in self._router_events.items() if event == "rejected"),
+                "abandoned_calls": sum(v for (event, *_), v in self._router_events.items() if event == "abandoned"),
+                "parse_failure_ratio": failed / (parsed + failed) if parsed + failed else 0.0,
+            }
+
+    def render_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP llm_call_duration_seconds Latency of LLM call attempts, excluding rate limit waits.",
+                "# TYPE llm_call_duration_seconds histogram",
+            ]
+            for (method, provider, model, outcome), histogram in sorted(self._latency.items()):
+                labels = _labels(method=method, provider=provider, model=model, outcome=outcome)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'llm_call_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'llm_call_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'llm_call_duration_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'llm_call_duration_seconds_count{{{labels}}} {histogram.count}')
+
+            for name, help_text, values in (
+                ("llm_prompt_tokens_total", "Approximate prompt tokens sent.", self._prompt_tokens),
+                ("llm_response_tokens_total", "Approximate response tokens received.", self._response_tokens),
+                ("llm_retries_total", "Retries after a failed LLM call attempt, by primary model.", self._retries),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, provider, model), value in sorted(values.items()):
+                    lines.append(f'{name}{{{_labels(method=method, provider=provider, model=model)}}} {value}')
+
+            lines += [
+                "# HELP llm_router_calls_total Calls the router rejected because every call thread was busy,"
+                " or abandoned to finish in the background.",
+                "# TYPE llm_router_calls_total counter",
+            ]
+            for (event, method, provider, model), value in sorted(self._router_events.items()):
+                labels = _labels(event=event, method=method, provider=provider, model=model)
+                lines.append(f'llm_router_calls_total{{{labels}}} {value}')
+
+            lines += [
+                "# HELP llm_challenge_parse_total Challenges parsed from responses (ok) or missing or invalid (failed).",
+                "# TYPE llm_challenge_parse_total counter",
+            ]
+            for (method, outcome), value in sorted(self._parses.items()):
+                lines.append(f'llm_challenge_parse_total{{{_labels(method=method, outcome=outcome)}}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def _emit(self, record):
+        sink = self.sink
+        if sink is not None:
+            sink.write({"ts": time.time(), **record})
+
+
+def _labels(**labels):
+    """Format Prometheus labels, escaping the values."""
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Shared by all routers and services in the process
+metrics = LlmMetrics()
@@ -0,0 +1,47 @@
+"""
+LLM provider adapters.
+Each adapter wraps one provider's SDK behind the same generate / stream / batch
+interface, so LLMService can route a call by the provider stored with the API key.
+"""
+import os
+from .base import LlmAdapter, LlmProviderError
+from .fake_adapter import FakeAdapter
+
+
+def fake_backend_enabled():
+    """Whether LLM_BACKEND=fake routes every call to the local fake adapter."""
+    return os.environ.get('LLM_BACKEND', '').lower() == 'fake'
+
+
+def get_adapter_class(provider):
+    """
+    Get the adapter class for a provider name (e.g. 'GEMINI', 'OPENAI', 'ANTHROPIC', 'FAKE').
+
+    Provider SDKs are imported only when their adapter is actually used.
+    """
+    provider = (provider or 'GEMINI').upper()
+    if provider == 'GEMINI':
+        from .gemini_adapter import GeminiAdapter
+        return GeminiAdapter
+    if provider == 'OPENAI':
+        from .openai_adapter import OpenAIAdapter
+        return OpenAIAdapter
+    if provider == 'ANTHROPIC':
+        from .anthropic_adapter import AnthropicAdapter
+        return AnthropicAdapter
+    if provider == 'FAKE':
+        return FakeAdapter
+    raise LlmProviderError(f"Unsupported LLM provider: {provider}")
+
+
+def create_adapter(provider, model_name, api_key):
+    """Create the adapter for a provider, model and API key, honoring LLM_BACKEND=fake."""
+    if fake_backend_enabled():
+        return FakeAdapter(model_name, api_key)
+    return get_adapter_class(provider)(model_name, api_key)
+
+
+__all__ = [
+    'LlmAdapter', 'LlmProviderError', 'FakeAdapter',
+    'create_adapter', 'get_adapter_class', 'fake_backend_enabled'
+]
@@ -0,0 +1,66 @@
+"""
+Anthropic adapter.
+"""
+from .base import LlmAdapter, LlmProviderError
+
+# The model names stored in LlmModel are short names; map them to API model IDs
+MODEL_IDS = {
+    "claude-3-opus": "claude-3-opus-20240229",
+    "claude-3-sonnet": "claude-3-sonnet-20240229",
+    "claude-3-haiku": "claude-3-haiku-20240307",
+    "claude-2.1": "claude-2.1",
+}
+
+
+class AnthropicAdapter(LlmAdapter):
+    """Adapter for Anthropic Claude models via the Messages API."""
+    provider = 'ANTHROPIC'
+
+    # Upper bound on response length; the Messages API requires one
+    max_tokens = 4096
+
+    def __init__(self, model_name, api_key):
+        super().__init__(model_name, api_key)
+        try:
+            import anthropic
+        except ImportError:
+            raise LlmProviderError("The anthropic package is required for Anthropic models. Install it with `pip install anthropic`.")
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=api_key)
+        self.model_id = MODEL_IDS.get(model_name, model_name)
+
+    def _messages(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    def generate(self, prompt):
+        response = self.client.messages.create(
+            model=self.model_id,
+            max_tokens=self.max_tokens,
+            messages=self._messages(prompt),
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    def stream(self, prompt):
+        with self.client.messages.stream(
+            model=self.model_id,
+            max_tokens=self.max_tokens,
+            messages=self._messages(prompt),
+        ) as stream:
+            yield from stream.text_stream
+
+    async def agenerate(self, prompt):
+        response = await self.async_client.messages.create(
+            model=self.model_id,
+            max_tokens=self.max_tokens,
+            messages=self._messages(prompt),
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    async def astream(self, prompt):
+        async with self.async_client.messages.stream(
+            model=self.model_id,
+            max_tokens=self.max_tokens,
+            messages=self._messages(prompt),
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
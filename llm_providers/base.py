@@ -0,0 +1,79 @@
+"""
+Base class for LLM provider adapters.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LlmProviderError(Exception):
+    """Raised when a provider adapter cannot be created or called."""
+
+
+class LlmAdapter:
+    """
+    Common interface for calling a model from any provider.
+
+    Subclasses implement generate and stream; batch runs generate concurrently
+    unless the provider has something better.
+    """
+    provider = None
+
+    # Maximum number of concurrent requests made by the default batch implementation
+    batch_concurrency = 4
+
+    def __init__(self, model_name, api_key):
+        self.model_name = model_name
+        self.api_key = api_key
+
+    def generate(self, prompt):
+        """Generate a complete response for a prompt and return its text."""
+        raise NotImplementedError
+
+    def stream(self, prompt):
+        """Generate a response for a prompt, yielding text chunks as they arrive."""
+        raise NotImplementedError
+
+    def generate_json(self, prompt, schema):
+        """
+        Generate a JSON response matching a JSON schema.
+
+        Providers with a JSON mode or response schema override this; by default the
+        prompt alone asks for JSON.
+        """
+        return self.generate(prompt)
+
+    def batch(self, prompts):
+        """Generate responses for several prompts, returned in the same order."""
+        if len(prompts) <= 1:
+            return [self.generate(prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(prompts))) as executor:
+            return list(executor.map(self.generate, prompts))
+
+    async def agenerate(self, prompt):
+        """
+        Async version of generate.
+
+        Runs generate in a worker thread unless the adapter has a native async client.
+        """
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def agenerate_json(self, prompt, schema):
+        """Async version of generate_json."""
+        return await self.agenerate(prompt)
+
+    async def astream(self, prompt):
+        """Async version of stream. Falls back to the sync stream, one chunk per worker-thread hop."""
+        iterator = iter(self.stream(prompt))
+        sentinel = object()
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, sentinel)
+            if chunk is sentinel:
+                return
+            yield chunk
+
+    def start_chat(self, history=None):
+        """Start a multi-turn chat session; only some providers support this."""
+        raise LlmProviderError(f"Chat sessions are not supported for {self.provider}")
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.model_name}>'
@@ -0,0 +1,110 @@
+"""
+Deterministic local fake adapter for offline development and load testing.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from .base import LlmAdapter
+
+# Marker used to recognize challenge generation prompts
+CHALLENGE_PROMPT_MARKER = "coding interview challenge"
+# Batch prompts ask for a number of challenges as a JSON array
+CHALLENGE_BATCH_PATTERN = re.compile(r'Generate (\d+) unique')
+
+
+class FakeAdapter(LlmAdapter):
+    """
+    Fake model that returns canned responses derived from a hash of the prompt.
+
+    The same prompt always produces the same text, except for challenge prompts,
+    which also mix in a draw from the adapter's random generator so repeated
+    requests get distinct challenges (the same sequence for a given seed). Latency is simulated with a
+    fixed base delay plus random jitter, both configurable per instance or via the
+    FAKE_LLM_LATENCY_MS and FAKE_LLM_JITTER_MS environment variables.
+    """
+    provider = 'FAKE'
+
+    # Number of chunks a streamed response is split into
+    stream_chunks = 8
+
+    def __init__(self, model_name=None, api_key=None, latency_ms=None, jitter_ms=None, seed=None):
+        super().__init__(model_name or 'fake-model', api_key)
+        self.latency_ms = float(latency_ms if latency_ms is not None else os.environ.get('FAKE_LLM_LATENCY_MS', 0))
+        self.jitter_ms = float(jitter_ms if jitter_ms is not None else os.environ.get('FAKE_LLM_JITTER_MS', 0))
+        if seed is None and os.environ.get('FAKE_LLM_SEED'):
+            seed = int(os.environ['FAKE_LLM_SEED'])
+        self._random = random.Random(seed)
+
+    def _delay_seconds(self, fraction=1.0):
+        """Pick the simulated latency (or a fraction of it) in seconds."""
+        return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) * fraction / 1000
+
+    def _delay(self, fraction=1.0):
+        """Sleep for the simulated latency (or a fraction of it)."""
+        delay = self._delay_seconds(fraction)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _respond(self, prompt):
+        """Build the response text for a prompt."""
+        if CHALLENGE_PROMPT_MARKER in prompt:
+            prompt = f"{prompt}\n{self._random.getrandbits(64)}"
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        if CHALLENGE_PROMPT_MARKER in prompt:
+            batch = CHALLENGE_BATCH_PATTERN.search(prompt)
+            if batch:
+                return json.dumps([self._challenge(f"{digest}-{i + 1}") for i in range(int(batch.group(1)))])
+            return json.dumps(self._challenge(digest))
+        return (
+            f"## Fake response {digest}\n\n"
+            "This response was generated by the local fake LLM backend.\n\n"
+            "- Consider the edge cases in the examples.\n"
+            "- Check the time and space complexity of your approach.\n"
+        )
+
+    @staticmethod
+    def _challenge(digest):
+        """Build a fake challenge object."""
+        # Pseudo-words derived from the digest, so fake challenges are not near-duplicates of each other
+        words = " ".join(hashlib.sha256(f"{digest}:{i}".encode('utf-8')).hexdigest()[:6] for i in range(12))
+        return {
+            "id": digest,
+            "title": f"Fake Challenge {digest}",
+            "description": f"Return the sum of the two integers `a` and `b`. (fake challenge {digest}: {words})",
+            "function_name": "add",
+            "examples": [
+                {"input": "a = 1, b = 2", "output": "3", "explanation": "1 + 2 = 3"},
+                {"input": "a = -4, b = 4", "output": "0"},
+            ],
+            "difficulty": "easy",
+            "hints": [
+                "Think about which operator combines two numbers.",
+                "The `+` operator adds two integers.",
+            ],
+        }
+
+    def generate(self, prompt):
+        self._delay()
+        return self._respond(prompt)
+
+    def stream(self, prompt):
+        text = self._respond(prompt)
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            self._delay(1.0 / self.stream_chunks)
+            yield text[start:start + size]
+
+    async def agenerate(self, prompt):
+        await asyncio.sleep(self._delay_seconds())
+        return self._respond(prompt)
+
+    async def astream(self, prompt):
+        text = self._respond(prompt)
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            await asyncio.sleep(self._delay_seconds(1.0 / self.stream_chunks))
+            yield text[start:start + size]
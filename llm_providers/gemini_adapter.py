@@ -0,0 +1,142 @@
+"""
+Google Gemini adapter.
+"""
+import asyncio
+import threading
+from typing import NamedTuple
+from .base import LlmAdapter, LlmProviderError
+
+
+class ChatReply(NamedTuple):
+    """Reply to a chat message; has the .text attribute LLMService.chat_message reads."""
+    text: str
+
+
+class GeminiAdapter(LlmAdapter):
+    """
+    Adapter for Google Gemini models via the google.ai.generativelanguage clients.
+
+    Each adapter has clients created with its own API key, instead of calling
+    genai.configure, which would change the key for every other adapter in the process.
+    """
+    provider = 'GEMINI'
+
+    def __init__(self, model_name, api_key):
+        super().__init__(model_name, api_key)
+        import google.ai.generativelanguage as glm
+
+        self._glm = glm
+        self._model = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        # A gRPC async client belongs to the event loop it was created in, so each loop gets its own
+        self._async_clients = {}  # event loop -> GenerativeServiceAsyncClient
+        self._async_clients_lock = threading.Lock()
+
+    def _async_client(self):
+        """Get the async client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # The clients refer to their loops, so drop those of loops that have been closed
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                client = self._async_clients[loop] = self._glm.GenerativeServiceAsyncClient(
+                    client_options={"api_key": self.api_key}
+                )
+            return client
+
+    def _request(self, contents, schema=None):
+        if isinstance(contents, str):
+            contents = [self._glm.Content(role="user", parts=[self._glm.Part(text=contents)])]
+        generation_config = None
+        if schema is not None:
+            generation_config = self._glm.GenerationConfig(
+                response_mime_type="application/json", response_schema=self._schema(schema)
+            )
+        return self._glm.GenerateContentRequest(
+            model=self._model, contents=contents, generation_config=generation_config
+        )
+
+    def _schema(self, schema):
+        """Convert a JSON schema to the API's Schema message (types, properties, items and required only)."""
+        fields = {"type_": self._glm.Type[schema["type"].upper()]}
+        if "properties" in schema:
+            fields["properties"] = {name: self._schema(value) for name, value in schema["properties"].items()}
+        if "items" in schema:
+            fields["items"] = self._schema(schema["items"])
+        if "required" in schema:
+            fields["required"] = list(schema["required"])
+        return self._glm.Schema(**fields)
+
+    def generate(self, prompt):
+        return _text(self._client.generate_content(request=self._request(prompt)), required=True)
+
+    def generate_json(self, prompt, schema):
+        return _text(self._client.generate_content(request=self._request(prompt, schema)), required=True)
+
+    def stream(self, prompt):
+        for chunk in self._client.stream_generate_content(request=self._request(prompt)):
+            text = _text(chunk)
+            if text:
+                yield text
+
+    async def agenerate(self, prompt):
+        response = await self._async_client().generate_content(request=self._request(prompt))
+        return _text(response, required=True)
+
+    async def agenerate_json(self, prompt, schema):
+        response = await self._async_client().generate_content(request=self._request(prompt, schema))
+        return _text(response, required=True)
+
+    async def astream(self, prompt):
+        response = await self._async_client().stream_generate_content(request=self._request(prompt))
+        async for chunk in response:
+            text = _text(chunk)
+            if text:
+                yield text
+
+    def start_chat(self, history=None):
+        return GeminiChat(self, history)
+
+
+class GeminiChat:
+    """Multi-turn chat that sends the whole conversation with each message."""
+
+    def __init__(self, adapter, history=None):
+        """
+        Start a chat.
+
+        Args:
+            adapter: GeminiAdapter whose client and model are used
+            history: Earlier turns as {"role": "user" | "model", "parts": [text, ...]} dicts
+        """
+        self.adapter = adapter
+        glm = adapter._glm
+        self.history = [
+            glm.Content(role=turn["role"], parts=[glm.Part(text=part) for part in turn["parts"]])
+            for turn in history or ()
+        ]
+
+    def send_message(self, message):
+        glm = self.adapter._glm
+        content = glm.Content(role="user", parts=[glm.Part(text=message)])
+        response = self.adapter._client.generate_content(request=self.adapter._request([*self.history, content]))
+        text = _text(response, required=True)
+        # Only completed turns join the history, so a failed message can be sent again
+        self.history += [content, glm.Content(role="model", parts=[glm.Part(text=text)])]
+        return ChatReply(text)
+
+
+def _text(response, required=False):
+    """
+    Get the text of a response's first candidate.
+
+    Stream chunks without content parts (e.g. the final usage metadata) have no text;
+    a complete response without a candidate, e.g. a blocked prompt, raises if required.
+    """
+    if not response.candidates:
+        if required:
+            raise LlmProviderError(f"Gemini returned no response: {response.prompt_feedback}")
+        return ""
+    return "".join(part.text for part in response.candidates[0].content.parts)
@@ -0,0 +1,76 @@
+"""
+OpenAI adapter.
+"""
+from .base import LlmAdapter, LlmProviderError
+
+
+class OpenAIAdapter(LlmAdapter):
+    """Adapter for OpenAI chat completion models."""
+    provider = 'OPENAI'
+
+    def __init__(self, model_name, api_key):
+        super().__init__(model_name, api_key)
+        try:
+            from openai import OpenAI, AsyncOpenAI
+        except ImportError:
+            raise LlmProviderError("The openai package is required for OpenAI models. Install it with `pip install openai`.")
+        self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
+
+    def _messages(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    def generate(self, prompt):
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+        )
+        return response.choices[0].message.content or ""
+
+    def generate_json(self, prompt, schema):
+        # JSON mode only produces objects; array responses rely on the prompt
+        if schema.get("type") != "object":
+            return self.generate(prompt)
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+            response_format={"type": "json_object"},
+        )
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt):
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def agenerate(self, prompt):
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+        )
+        return response.choices[0].message.content or ""
+
+    async def agenerate_json(self, prompt, schema):
+        if schema.get("type") != "object":
+            return await self.agenerate(prompt)
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+            response_format={"type": "json_object"},
+        )
+        return response.choices[0].message.content or ""
+
+    async def astream(self, prompt):
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt),
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
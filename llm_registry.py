@@ -0,0 +1,103 @@
+"""
+Registry of warm LLM clients.
+Each (provider, model, API key) combination gets its own LLMService instance, so
+concurrent requests for different users never reconfigure shared state.
+"""
+import hashlib
+import threading
+from cachetools import TTLCache
+from llm_service import LLMService
+
+
+def hash_api_key(api_key):
+    """Hash an API key so the raw secret is never used as a dictionary key."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class LlmClientRegistry:
+    """Thread-safe LRU/TTL cache of initialized LLMService instances."""
+
+    def __init__(self, max_size=128, ttl=3600, response_cache=None, routing_options=None):
+        """
+        Initialize the registry.
+
+        Args:
+            max_size: Maximum number of clients kept; the least recently used is evicted first
+            ttl: Seconds after which a client is discarded and rebuilt on next use
+            response_cache: Optional ResponseCache shared by all clients
+            routing_options: Keyword arguments for each client's LlmRouter
+        """
+        self.response_cache = response_cache
+        self.routing_options = routing_options or {}
+        self._clients = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider, model_name, api_key, fallbacks=()):
+        """Build the registry key for a provider, model and API key, plus any fallbacks."""
+        key = (provider.upper(), model_name, hash_api_key(api_key))
+        for fallback_provider, fallback_model, fallback_key in fallbacks:
+            key += (fallback_provider.upper(), fallback_model, hash_api_key(fallback_key))
+        return key
+
+    def get(self, provider, model_name, api_key, fallbacks=()):
+        """
+        Get a warm client for the given provider, model and API key, creating it if needed.
+
+        Args:
+            fallbacks: (provider, model_name, api_key) tuples used for failover and hedging
+
+        Returns:
+            An initialized LLMService instance
+        """
+        key = self.make_key(provider, model_name, api_key, fallbacks)
+        with self._lock:
+            service = self._clients.get(key)
+            if service is not None:
+                self.hits += 1
+                return service
+            self.misses += 1
+
+        # Build the client outside the lock so slow setup does not block other lookups
+        service = LLMService(
+            model_name=model_name,
+            api_key=api_key,
+            response_cache=self.response_cache,
+            provider=provider,
+            fallbacks=fallbacks,
+            routing_options=self.routing_options,
+        )
+        service.client_key = key
+
+        with self._lock:
+            # Another thread may have built the same client in the meantime; keep the first one
+            existing = self._clients.get(key)
+            if existing is not None:
+                return existing
+            self._clients[key] = service
+        return service
+
+    def invalidate(self, provider, model_name, api_key, fallbacks=()):
+        """Drop the client for a provider, model and API key, if present."""
+        with self._lock:
+            self._clients.pop(self.make_key(provider, model_name, api_key, fallbacks), None)
+
+    def clear(self):
+        """Drop all clients."""
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self):
+        """Return the registry size and hit/miss counts."""
+        with self._lock:
+            # Expire stale entries so the reported size is accurate
+            self._clients.expire()
+            return {
+                "size": len(self._clients),
+                "max_size": self._clients.maxsize,
+                "ttl": self._clients.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
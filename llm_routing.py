@@ -0,0 +1,618 @@
+"""
+Routing layer for LLM calls.
+Adds per-call deadlines, retries with jittered exponential backoff, failover to
+fallback models/keys, hedged requests once a call runs past the observed
+latency percentile of its model, and per-provider rate limits. Every attempt is
+recorded in llm_metrics.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from llm_metrics import metrics
+from request_timing import span
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an LLM call does not finish before its deadline."""
+
+
+class RouterSaturated(Exception):
+    """Raised when every thread for calls with a deadline or hedge is busy."""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one model."""
+
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        """Return the p-th percentile latency in seconds, or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+def estimate_tokens(text):
+    """Rough token count for rate limiting (about four characters per token)."""
+    return len(text) // 4 + 1 if text else 0
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one provider.
+
+    Both budgets refill continuously and allow a burst of up to one minute's worth.
+    A call reserves one request and its prompt tokens up front and waits until the
+    budget covers them; response tokens are charged afterwards, so a large response
+    delays the calls that follow it.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.total_wait = 0.0
+
+    def reserve(self, tokens, max_wait=None):
+        """
+        Reserve one request and the given tokens.
+
+        Returns:
+            Seconds to wait before making the call, or None (nothing reserved) if
+            that would take longer than max_wait
+        """
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.requests_per_minute:
+                wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                # A single call larger than the whole budget only waits for a full budget
+                tokens = min(tokens, self.tokens_per_minute)
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._requests -= 1
+            self._tokens -= tokens
+            if wait > 0:
+                self.waits += 1
+                self.total_wait += wait
+            return max(0.0, wait)
+
+    def charge(self, tokens):
+        """Charge tokens used by a response."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "waits": self.waits,
+                "total_wait_seconds": round(self.total_wait, 3),
+            }
+
+    def _refill(self):
+        """Add the budget accrued since the last update. Caller holds the lock."""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+
+# Rate limiters shared by all routers, keyed by provider
+_rate_limiters = {}
+
+
+def parse_rate_limits(spec):
+    """
+    Parse a rate limit spec like "GEMINI:15:1000000,OPENAI:500:" into
+    {provider: (requests_per_minute, tokens_per_minute)}; empty values mean no limit.
+    """
+    limits = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        provider, _, rest = item.strip().partition(':')
+        requests, _, tokens = rest.partition(':')
+        limits[provider.upper()] = (int(requests) if requests else None, int(tokens) if tokens else None)
+    return limits
+
+
+def configure_rate_limits(limits):
+    """Set the per-provider rate limits, as returned by parse_rate_limits."""
+    _rate_limiters.clear()
+    for provider, (requests_per_minute, tokens_per_minute) in limits.items():
+        if requests_per_minute or tokens_per_minute:
+            _rate_limiters[provider.upper()] = RateLimiter(requests_per_minute, tokens_per_minute)
+
+
+def get_rate_limiter(adapter):
+    """Get the rate limiter for an adapter's provider, or None if it is not limited."""
+    return _rate_limiters.get((adapter.provider or '').upper())
+
+
+def rate_limit_stats():
+    """Return the configured limits and time spent waiting per provider."""
+    return {provider: limiter.stats() for provider, limiter in _rate_limiters.items()}
+
+
+# Latency trackers shared by all routers, keyed by (provider, model)
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+class CallExecutor:
+    """
+    Thread pool for calls with a deadline or a hedge.
+
+    Abandoned requests (past their deadline, or a losing hedge) finish here in the
+    background and keep their thread until they do. A call that finds every thread
+    busy is rejected rather than queued behind them.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, fn, *args):
+        """
+        Start fn on a free thread.
+
+        Raises:
+            RouterSaturated: If every thread is busy
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RouterSaturated(f"All {self.max_workers} LLM call threads are busy")
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+# Shared by all routers; its size caps the calls with a deadline or hedge in flight per process
+_executor = CallExecutor(int(os.environ.get('LLM_ROUTER_THREADS', 64)))
+
+
+def configure_executor(max_workers):
+    """Replace the shared call thread pool with one of the given size."""
+    global _executor
+    previous, _executor = _executor, CallExecutor(max_workers)
+    previous.shutdown()
+
+
+def get_latency_tracker(adapter):
+    """Get the shared latency tracker for an adapter's provider and model."""
+    key = (adapter.provider, adapter.model_name)
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = LatencyTracker()
+        return tracker
+
+
+class _CallRecord:
+    """Times one model call attempt and records it in llm_metrics when it finishes."""
+
+    def __init__(self, method, adapter, prompt):
+        self.method = method
+        self.adapter = adapter
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.response_chars = 0
+        self.start = time.monotonic()
+
+    def received(self, chunk):
+        self.response_chars += len(chunk)
+
+    def finish(self, error=None, text=None):
+        """Record the attempt and return its duration in seconds."""
+        seconds = time.monotonic() - self.start
+        if text is not None:
+            self.response_chars += len(text)
+        metrics.observe_call(
+            self.method, self.adapter.provider, self.adapter.model_name, seconds,
+            self.prompt_tokens, self.response_chars // 4 if self.response_chars else 0, error,
+        )
+        return seconds
+
+
+class LlmRouter:
+    """Routes generate/stream calls across a primary adapter and its fallbacks."""
+
+    def __init__(self, primary, fallbacks=(), max_retries=2, base_backoff=0.25, max_backoff=4.0,
+                 hedge_percentile=95, deadline=None):
+        """
+        Initialize the router.
+
+        Args:
+            primary: Adapter tried first
+            fallbacks: Adapters for other models or keys, used for failover and hedging
+            max_retries: Retries after the first failed attempt
+            base_backoff: Base delay in seconds before the first retry; doubles per retry
+            max_backoff: Upper bound on the backoff delay in seconds
+            hedge_percentile: Latency percentile after which a hedged request is sent
+                to the next adapter; 0 disables hedging
+            deadline: Default per-call deadline in seconds, or None for no deadline
+        """
+        self.adapters = [primary, *fallbacks]
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge_percentile = hedge_percentile
+        self.deadline = deadline
+
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0,
+                       "rejected": 0, "abandoned": 0}
+
+    def generate(self, prompt, deadline=None, json_schema=None, method="generate"):
+        """
+        Generate a response, retrying, failing over and hedging as configured.
+
+        Args:
+            prompt: Prompt text
+            deadline: Seconds the whole call may take, overriding the router default
+            json_schema: Request JSON matching this schema from providers that support it
+            method: Name the call is recorded under in llm_metrics
+
+        Raises:
+            DeadlineExceeded: If no attempt succeeded before the deadline
+            RouterSaturated: If every call thread was busy
+            Exception: The last error if every attempt failed
+        """
+        deadline_at = self._deadline_at(deadline)
+        self._count("calls")
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count_retry(method)
+                self._backoff(attempt, deadline_at)
+            # Move on to the next adapter after each failure so a failing provider is not retried in a loop
+            index = attempt % len(self.adapters)
+            if attempt and index:
+                self._count("failovers")
+            try:
+                with span("llm"):
+                    return self._hedged_call(index, prompt, deadline_at, json_schema, method)
+            except DeadlineExceeded:
+                self._count("deadline_exceeded")
+                raise
+            except RouterSaturated:
+                # Another attempt would find the threads just as busy
+                raise
+            except Exception as e:
+                logger.warning("LLM call to %s failed (attempt %d): %s", self.adapters[index], attempt + 1, e)
+                last_error = e
+        raise last_error
+
+    def stream(self, prompt, deadline=None, method="stream"):
+        """
+        Stream a response. Attempts are retried and failed over only until the
+        first chunk arrives; after that an error is passed to the caller.
+
+        The deadline covers the whole stream. A blocking read cannot be interrupted,
+        so it is checked as each chunk arrives rather than while waiting for one.
+        """
+        deadline_at = self._deadline_at(deadline)
+        self._count("calls")
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count_retry(method)
+                self._backoff(attempt, deadline_at)
+            index = attempt % len(self.adapters)
+            if attempt and index:
+                self._count("failovers")
+            adapter = self.adapters[index]
+            started = False
+            try:
+                time.sleep(self._rate_limit_wait(adapter, prompt, deadline_at))
+                call = _CallRecord(method, adapter, prompt)
+                try:
+                    for chunk in adapter.stream(prompt):
+                        self._remaining(deadline_at)
+                        started = True
+                        call.received(chunk)
+                        self._charge(adapter, len(chunk) / 4)
+                        yield chunk
+                except Exception as e:
+                    call.finish(e)
+                    raise
+                call.finish()
+                return
+            except DeadlineExceeded:
+                self._count("deadline_exceeded")
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                logger.warning("LLM stream from %s failed (attempt %d): %s", adapter, attempt + 1, e)
+                last_error = e
+        raise last_error
+
+    async def agenerate(self, prompt, deadline=None, json_schema=None, method="generate"):
+        """Async version of generate, for use from an event loop."""
+        deadline_at = self._deadline_at(deadline)
+        self._count("calls")
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count_retry(method)
+                await asyncio.sleep(self._backoff_delay(attempt, deadline_at))
+            index = attempt % len(self.adapters)
+            if attempt and index:
+                self._count("failovers")
+            try:
+                with span("llm"):
+                    return await self._ahedged_call(index, prompt, deadline_at, json_schema, method)
+            except DeadlineExceeded:
+                self._count("deadline_exceeded")
+                raise
+            except Exception as e:
+                logger.warning("LLM call to %s failed (attempt %d): %s", self.adapters[index], attempt + 1, e)
+                last_error = e
+        raise last_error
+
+    async def astream(self, prompt, deadline=None, method="stream"):
+        """
+        Async version of stream, with the same failover-before-first-chunk rule.
+        Here the deadline also stops a wait for the next chunk.
+        """
+        deadline_at = self._deadline_at(deadline)
+        self._count("calls")
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count_retry(method)
+                await asyncio.sleep(self._backoff_delay(attempt, deadline_at))
+            index = attempt % len(self.adapters)
+            if attempt and index:
+                self._count("failovers")
+            adapter = self.adapters[index]
+            started = False
+            try:
+                await asyncio.sleep(self._rate_limit_wait(adapter, prompt, deadline_at))
+                call = _CallRecord(method, adapter, prompt)
+                chunks = adapter.astream(prompt).__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self._remaining(deadline_at))
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            raise DeadlineExceeded("LLM call deadline exceeded") from None
+                        started = True
+                        call.received(chunk)
+                        self._charge(adapter, len(chunk) / 4)
+                        yield chunk
+                except Exception as e:
+                    call.finish(e)
+                    raise
+                call.finish()
+                return
+            except DeadlineExceeded:
+                self._count("deadline_exceeded")
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                logger.warning("LLM stream from %s failed (attempt %d): %s", adapter, attempt + 1, e)
+                last_error = e
+        raise last_error
+
+    def stats(self):
+        """Return call, retry, failover, hedge, deadline, rejected and abandoned call counts."""
+        with self._lock:
+            return dict(self.counts)
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _count_retry(self, method):
+        """Count a retry here and in llm_metrics, under the primary adapter."""
+        self._count("retries")
+        metrics.record_retry(method, self.adapters[0].provider, self.adapters[0].model_name)
+
+    def _deadline_at(self, deadline):
+        deadline = deadline if deadline is not None else self.deadline
+        return time.monotonic() + deadline if deadline else None
+
+    def _remaining(self, deadline_at):
+        if deadline_at is None:
+            return None
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        return remaining
+
+    def _backoff_delay(self, attempt, deadline_at):
+        """Pick a full-jitter exponential backoff delay that does not overrun the deadline."""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+        remaining = self._remaining(deadline_at)
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        return delay
+
+    def _backoff(self, attempt, deadline_at):
+        """Sleep for a full-jitter exponential backoff, without overrunning the deadline."""
+        time.sleep(self._backoff_delay(attempt, deadline_at))
+
+    def _rate_limit_wait(self, adapter, prompt, deadline_at):
+        """Reserve rate limit budget for a call and return how long to wait before making it."""
+        limiter = get_rate_limiter(adapter)
+        if limiter is None:
+            return 0
+        wait = limiter.reserve(estimate_tokens(prompt), max_wait=self._remaining(deadline_at))
+        if wait is None:
+            raise DeadlineExceeded("LLM rate limit would delay the call past its deadline")
+        return wait
+
+    def _charge(self, adapter, tokens):
+        """Charge response tokens to the adapter's rate limit, if any."""
+        limiter = get_rate_limiter(adapter)
+        if limiter is not None:
+            limiter.charge(tokens)
+
+    def _timed_generate(self, adapter, prompt, deadline_at=None, json_schema=None, method="generate"):
+        """Call an adapter, after any rate limit wait, and record its latency and tokens."""
+        time.sleep(self._rate_limit_wait(adapter, prompt, deadline_at))
+        call = _CallRecord(method, adapter, prompt)
+        try:
+            text = adapter.generate_json(prompt, json_schema) if json_schema else adapter.generate(prompt)
+        except Exception as e:
+            call.finish(e)
+            raise
+        get_latency_tracker(adapter).record(call.finish(text=text))
+        self._charge(adapter, estimate_tokens(text))
+        return text
+
+    def _hedged_call(self, index, prompt, deadline_at, json_schema=None, method="generate"):
+        """
+        Call the adapter at index; if it runs past its latency percentile, also call
+        the next adapter and return whichever answers first.
+        """
+        adapter = self.adapters[index]
+        hedge_after = None
+        if self.hedge_percentile and len(self.adapters) > 1:
+            hedge_after = get_latency_tracker(adapter).percentile(self.hedge_percentile)
+
+        # Without hedging or a deadline there is no need to leave the calling thread
+        if hedge_after is None and deadline_at is None:
+            return self._timed_generate(adapter, prompt, json_schema=json_schema, method=method)
+
+        futures = {self._submit(adapter, prompt, deadline_at, json_schema, method): adapter}
+        try:
+            if hedge_after is not None:
+                remaining = self._remaining(deadline_at)
+                done, _ = wait(futures, timeout=hedge_after if remaining is None else min(hedge_after, remaining))
+                if not done:
+                    hedge = self.adapters[(index + 1) % len(self.adapters)]
+                    try:
+                        futures[self._submit(hedge, prompt, deadline_at, json_schema, method)] = hedge
+                        self._count("hedges")
+                    except RouterSaturated:
+                        pass  # Keep waiting for the first request
+
+            last_error = None
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=self._remaining(deadline_at), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded("LLM call deadline exceeded")
+                for future in done:
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if futures[future] is not adapter:
+                        self._count("hedge_wins")
+                    return text
+            raise last_error
+        finally:
+            # Threads cannot be cancelled; calls still running keep their thread until they finish
+            for future, called in futures.items():
+                if not future.done():
+                    self._count("abandoned")
+                    metrics.record_router_event("abandoned", method, called.provider, called.model_name)
+
+    def _submit(self, adapter, prompt, deadline_at, json_schema, method):
+        """Start a call on the shared executor, recording it if every thread is busy."""
+        try:
+            return _executor.submit(self._timed_generate, adapter, prompt, deadline_at, json_schema, method)
+        except RouterSaturated:
+            self._count("rejected")
+            metrics.record_router_event("rejected", method, adapter.provider, adapter.model_name)
+            raise
+
+    async def _atimed_generate(self, adapter, prompt, deadline_at=None, json_schema=None, method="generate"):
+        """Async version of _timed_generate."""
+        await asyncio.sleep(self._rate_limit_wait(adapter, prompt, deadline_at))
+        call = _CallRecord(method, adapter, prompt)
+        try:
+            if json_schema:
+                text = await adapter.agenerate_json(prompt, json_schema)
+            else:
+                text = await adapter.agenerate(prompt)
+        except Exception as e:
+            call.finish(e)
+            raise
+        get_latency_tracker(adapter).record(call.finish(text=text))
+        self._charge(adapter, estimate_tokens(text))
+        return text
+
+    async def _ahedged_call(self, index, prompt, deadline_at, json_schema=None, method="generate"):
+        """Async version of _hedged_call; the losing request is cancelled instead of left running."""
+        adapter = self.adapters[index]
+        hedge_after = None
+        if self.hedge_percentile and len(self.adapters) > 1:
+            hedge_after = get_latency_tracker(adapter).percentile(self.hedge_percentile)
+
+        tasks = {asyncio.ensure_future(self._atimed_generate(adapter, prompt, deadline_at, json_schema, method)): adapter}
+        try:
+            if hedge_after is not None:
+                remaining = self._remaining(deadline_at)
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after if remaining is None else min(hedge_after, remaining))
+                if not done:
+                    hedge = self.adapters[(index + 1) % len(self.adapters)]
+                    self._count("hedges")
+                    tasks[asyncio.ensure_future(self._atimed_generate(hedge, prompt, deadline_at, json_schema, method))] = hedge
+
+            last_error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=self._remaining(deadline_at),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded("LLM call deadline exceeded")
+                for task in done:
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if tasks[task] is not adapter:
+                        self._count("hedge_wins")
+                    return text
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
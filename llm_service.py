@@ -1,32 +1,83 @@
+import asyncio
+import logging
 import os
-import json
-import google.generativeai as genai
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import uuid
+from llm_providers import create_adapter, fake_backend_enabled
+from llm_routing import LlmRouter
+from llm_metrics import metrics
+from request_timing import span
+from response_cache import make_cache_key
+from prompt_builder import prompt_builder, get_prompt_budget
+from challenge_parser import parse_challenge, parse_challenges, ChallengeParseError, CHALLENGE_SCHEMA, CHALLENGE_ARRAY_SCHEMA
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Default number of challenges generated at the same time by one fan-out call
+FANOUT_CONCURRENCY = int(os.environ.get('LLM_FANOUT_CONCURRENCY', 4))
+
+# Ask providers with a JSON mode / response schema for structured challenge output
+JSON_MODE = os.environ.get('LLM_JSON_MODE', 'false').lower() == 'true'
+
 class LLMService:
-    def __init__(self):
+    def __init__(self, model_name: str | None = None, api_key: str | None = None, response_cache=None,
+                 provider: str | None = None, fallbacks=(), routing_options: dict | None = None):
+        self.provider: str = (provider or "GEMINI").upper()
+        self.fallbacks: list[tuple] = list(fallbacks)  # (provider, model_name, api_key) used for failover and hedging
+        self.routing_options: dict = routing_options or {}  # Keyword arguments for LlmRouter
+        self._router = None
         self.model_name: str | None = None
         self.api_key: str | None = None
-        self._model = None
+        self.client_key: tuple | None = None  # Set by LlmClientRegistry for cached instances, and for the default service
+        self.response_cache = response_cache  # Optional ResponseCache for hints and feedback
+        self._adapter = None
         self.chat = None
-        self.previous_challenges: list[str] = []  # Track previous challenge titles/descriptions
+        self.prompts = prompt_builder  # Shared prompt templates and per-challenge fragment cache
+        self._lock = threading.Lock()  # Guards lazy setup; instances are shared across threads
         
+        if model_name and api_key:
+            self.initialize_model(model_name=model_name, api_key=api_key)
+        
+    @property
+    def adapter(self):
+        """Lazily initialize and return the provider adapter used for model calls"""
+        if not self._adapter and (self.api_key or fake_backend_enabled()):
+            self._adapter = create_adapter(self.provider, self.model_name, self.api_key)
+        return self._adapter
+    
+    @property
+    def router(self):
+        """Lazily build and return the router that adds deadlines, retries, failover and hedging"""
+        if not self._router and self.adapter:
+            # Concurrent batch and top-up calls share this instance; build the router only once
+            with self._lock:
+                if not self._router:
+                    fallback_adapters = []
+                    for provider, model_name, api_key in self.fallbacks:
+                        try:
+                            fallback_adapters.append(create_adapter(provider, model_name, api_key))
+                        except Exception as e:
+                            logger.warning("Skipping fallback model %s/%s: %s", provider, model_name, e)
+                    self._router = LlmRouter(self.adapter, fallback_adapters, **self.routing_options)
+        return self._router
+    
     @property
-    def model(self):
-        """Lazily initialize and return the model"""
-        if not self._model and self.api_key:
-            self._model = genai.GenerativeModel(model_name=self.model_name)
-        return self._model
-    
-    def initialize_model(self, model_name: str, api_key: str | None=None):
-        """Initialize the model with the provided API key and model name"""
+    def is_ready(self):
+        """Whether a provider adapter is available for model calls"""
+        try:
+            return self.adapter is not None
+        except Exception:
+            return False
+    
+    def initialize_model(self, model_name: str, api_key: str | None=None, provider: str | None=None):
+        """Initialize the model with the provided API key, model name and (optionally) provider"""
         if api_key:
             self.api_key = api_key
-            genai.configure(api_key=self.api_key)
         else:
             return "API key not configured."
         
@@ -35,20 +86,24 @@ class LLMService:
         else:
             return "Model name not provided."
         
+        if provider:
+            self.provider = provider.upper()
+        
         try:
-            self._model = genai.GenerativeModel(model_name=self.model_name)
+            self._adapter = create_adapter(self.provider, self.model_name, self.api_key)
+            self._router = None
             return "Model initialized successfully."
         except Exception as e:
-            print(f"Error initializing model: {e}")
+            logger.error("Error initializing model: %s", e)
             return f"Error initializing model. Please check your API key and model name. Error details: {str(e)}"
             
     def start_new_chat(self, history=None):
         """Start a new chat session with the model"""
         try:
-            self.chat = self.model.start_chat(history=history)
+            self.chat = self.adapter.start_chat(history=history)
             return "New chat session started successfully."
         except Exception as e:
-            print(f"Error starting chat session: {e}")
+            logger.error("Error starting chat session: %s", e)
             return f"Error starting chat session. Error details: {str(e)}"
     
     def chat_message(self, message):
@@ -60,186 +115,295 @@ class LLMService:
             response = self.chat.send_message(message)
             return response.text
         except Exception as e:
-            print(f"Error in chat conversation: {e}")
+            logger.error("Error in chat conversation: %s", e)
             return f"Error in chat conversation. Please try again later. Error details: {str(e)}"
     
-    def get_solution_feedback(self, challenge, code, language="javascript"):
-        """Generate feedback for a submitted solution"""
+    def get_solution_feedback(self, challenge, code, language="javascript", deadline=None, test_results=""):
+        """Generate feedback for a submitted solution, optionally within a deadline in seconds and given the results of running its examples"""
         try:
-            prompt = self._create_feedback_prompt(challenge, code, language)
-            response = self.model.generate_content(contents=prompt)
-            return response.text
+            cache_key = self._response_cache_key("feedback", challenge, code, language, test_results)
+            cached = self._get_cached("feedback", cache_key)
+            if cached is not None:
+                return cached
+            
+            prompt = self._create_feedback_prompt(challenge, code, language, test_results)
+            feedback = self.router.generate(prompt, deadline=deadline, method="get_solution_feedback")
+            self._set_cached("feedback", cache_key, feedback)
+            return feedback
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
+            logger.error("Error calling %s API: %s", self.provider, e)
             return f"Error generating feedback. Please try again later. Error details: {str(e)}"
     
-    def get_hint(self, challenge, current_code=None, hint_index=0):
-        """Generate a hint for the challenge, considering the current code if provided"""
+    def get_hint(self, challenge, current_code=None, hint_index=0, deadline=None, language=None):
+        """Generate a hint for the challenge, considering the current code (in the given language) if provided"""
         try:
+            cache_key = self._response_cache_key("hint", challenge, current_code, language)
+            cached = self._get_cached("hint", cache_key)
+            if cached is not None:
+                return cached
+            
             prompt = self._create_hint_prompt(challenge, current_code)
-            response = self.model.generate_content(contents=prompt)
-            return response.text
+            hint = self.router.generate(prompt, deadline=deadline, method="get_hint")
+            self._set_cached("hint", cache_key, hint)
+            return hint
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
+            logger.error("Error calling %s API: %s", self.provider, e)
             return f"Error generating hint. Please try again later. Error details: {str(e)}"
     
-    def generate_challenge(self, difficulty=None, additional_context=None, language="javascript"):
-        """Generate a single coding challenge using LLM"""
+    def stream_solution_feedback(self, challenge, code, language="javascript", test_results=""):
+        """Generate feedback for a submitted solution, yielding text chunks as they arrive"""
+        try:
+            cache_key = self._response_cache_key("feedback", challenge, code, language, test_results)
+            prompt = self._create_feedback_prompt(challenge, code, language, test_results)
+            yield from self._stream_cached("feedback", cache_key, prompt)
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            yield f"Error generating feedback. Please try again later. Error details: {str(e)}"
+    
+    def stream_hint(self, challenge, current_code=None, hint_index=0, language=None):
+        """Generate a hint for the challenge, yielding text chunks as they arrive"""
+        try:
+            cache_key = self._response_cache_key("hint", challenge, current_code, language)
+            prompt = self._create_hint_prompt(challenge, current_code)
+            yield from self._stream_cached("hint", cache_key, prompt)
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            yield f"Error generating hint. Please try again later. Error details: {str(e)}"
+    
+    def _response_cache_key(self, endpoint, challenge, code, language=None, test_results=None):
+        """Build the response cache key, or None if caching is disabled"""
+        if self.response_cache is None:
+            return None
+        return make_cache_key(endpoint, self.model_name, challenge['id'], code, language, test_results)
+    
+    def _get_cached(self, endpoint, cache_key):
+        """Look up a cached response"""
+        if cache_key is None:
+            return None
+        return self.response_cache.get(endpoint, cache_key)
+    
+    def _set_cached(self, endpoint, cache_key, text):
+        """Store a successful response in the cache"""
+        if cache_key is not None and text:
+            self.response_cache.set(endpoint, cache_key, text)
+    
+    def _stream_cached(self, endpoint, cache_key, prompt):
+        """Stream a response, serving it whole from the cache on a hit and caching it on a miss"""
+        cached = self._get_cached(endpoint, cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        for chunk in self.router.stream(prompt, method=f"stream_{endpoint}"):
+            chunks.append(chunk)
+            yield chunk
+        # Only reached when the stream completed, so partial responses are never cached
+        self._set_cached(endpoint, cache_key, "".join(chunks))
+    
+    def generate_challenge(self, difficulty=None, additional_context=None, language="javascript", deadline=None):
+        """Generate a single coding challenge using LLM, optionally within a deadline in seconds"""
+        try:
+            prompt = self._create_challenge_prompt(difficulty, additional_context, language)
+            raw_response = self.router.generate(
+                prompt, deadline=deadline, json_schema=CHALLENGE_SCHEMA if JSON_MODE else None, method="generate_challenge"
+            )
+            return self._parse_challenge_response(raw_response, difficulty, "generate_challenge")
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            return None
+    
+    async def agenerate_challenge(self, difficulty=None, additional_context=None, language="javascript", deadline=None):
+        """Async version of generate_challenge, awaiting the model call on the event loop"""
         try:
             prompt = self._create_challenge_prompt(difficulty, additional_context, language)
-            response = self.model.generate_content(contents=prompt)
+            raw_response = await self.router.agenerate(
+                prompt, deadline=deadline, json_schema=CHALLENGE_SCHEMA if JSON_MODE else None, method="agenerate_challenge"
+            )
+            return self._parse_challenge_response(raw_response, difficulty, "agenerate_challenge")
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            return None
+    
+    async def aget_solution_feedback(self, challenge, code, language="javascript", deadline=None, test_results=""):
+        """Async version of get_solution_feedback"""
+        try:
+            cache_key = self._response_cache_key("feedback", challenge, code, language, test_results)
+            cached = await asyncio.to_thread(self._get_cached, "feedback", cache_key)
+            if cached is not None:
+                return cached
             
-            # Parse the JSON response
-            try:
-                # Extract JSON from the response text
-                response_text = response.text
-                # Remove any markdown code block indicators if present
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0].strip()
-                
-                challenge_data = json.loads(response_text)
-                
-                # Ensure the challenge has a unique ID
-                if "id" not in challenge_data:
-                    challenge_data["id"] = str(uuid.uuid4())
-                
-                # Add to previous challenges list for future reference
-                self.previous_challenges.append({
-                    "title": challenge_data["title"],
-                    "description_snippet": challenge_data["description"][:100]  # Store just a snippet
-                })
-                
-                # Keep the list at a reasonable size
-                if len(self.previous_challenges) > 20:
-                    self.previous_challenges = self.previous_challenges[-20:]
-                
-                return challenge_data
-            except json.JSONDecodeError as e:
-                print(f"Error parsing challenge JSON: {e}")
-                print(f"Raw response: {response.text}")
-                return None
+            prompt = self._create_feedback_prompt(challenge, code, language, test_results)
+            feedback = await self.router.agenerate(prompt, deadline=deadline, method="aget_solution_feedback")
+            await asyncio.to_thread(self._set_cached, "feedback", cache_key, feedback)
+            return feedback
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
+            logger.error("Error calling %s API: %s", self.provider, e)
+            return f"Error generating feedback. Please try again later. Error details: {str(e)}"
+    
+    async def aget_hint(self, challenge, current_code=None, hint_index=0, deadline=None, language=None):
+        """Async version of get_hint"""
+        try:
+            cache_key = self._response_cache_key("hint", challenge, current_code, language)
+            cached = await asyncio.to_thread(self._get_cached, "hint", cache_key)
+            if cached is not None:
+                return cached
+            
+            prompt = self._create_hint_prompt(challenge, current_code)
+            hint = await self.router.agenerate(prompt, deadline=deadline, method="aget_hint")
+            await asyncio.to_thread(self._set_cached, "hint", cache_key, hint)
+            return hint
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            return f"Error generating hint. Please try again later. Error details: {str(e)}"
+    
+    def _parse_challenge_response(self, raw_response, difficulty=None, method="generate_challenge"):
+        """Parse a challenge from the raw model response and give it an ID"""
+        try:
+            with span("parse"):
+                challenge = self._accept_challenge(parse_challenge(raw_response, difficulty))
+            metrics.record_parse(method, 1)
+            return challenge
+        except ChallengeParseError as e:
+            metrics.record_parse(method, 0, 1)
+            logger.warning("Error parsing challenge JSON: %s", e)
+            logger.debug("Raw response: %.2000s", raw_response)
             return None
             
-    def generate_multiple_challenges(self, count=5, difficulties=None, additional_context=None, language="javascript"):
-        """Generate multiple coding challenges using LLM"""
-        challenges = []
+    # Most challenges requested from the model in one batch prompt; larger counts are split
+    max_batch_size = 5
+    
+    def generate_multiple_challenges(self, count=5, difficulties=None, additional_context=None, language="javascript",
+                                     batch=True):
+        """
+        Generate multiple coding challenges using LLM
         
-        if difficulties is None:
-            difficulties = ["easy", "medium", "hard"]
+        With batch=True the challenges are requested as one JSON array per batch prompt
+        instead of one call each; see generate_challenges_batch. Otherwise they are
+        generated concurrently; see iter_multiple_challenges.
+        """
+        assigned_difficulties = self._assign_difficulties(count, difficulties)
+        if batch:
+            return self.generate_challenges_batch(assigned_difficulties, additional_context, language)
+        return list(self.iter_challenges(assigned_difficulties, additional_context, language))
+    
+    def iter_multiple_challenges(self, count=5, difficulties=None, additional_context=None, language="javascript",
+                                 max_concurrency=None):
+        """
+        Generate multiple coding challenges concurrently, yielding each one as soon as it is ready
         
-        # Distribute difficulties across the requested count
-        assigned_difficulties = []
-        for i in range(count):
-            assigned_difficulties.append(difficulties[i % len(difficulties)])
+        Challenges come back in completion order, so callers can use the first ones
+        before the slowest call finishes.
+        """
+        yield from self.iter_challenges(
+            self._assign_difficulties(count, difficulties), additional_context, language, max_concurrency
+        )
+    
+    def iter_challenges(self, difficulties, additional_context=None, language="javascript", max_concurrency=None):
+        """
+        Generate one challenge per entry in difficulties, at most max_concurrency at a time
         
-        # Generate challenges with assigned difficulties
-        for difficulty in assigned_difficulties:
-            challenge = self.generate_challenge(difficulty, additional_context, language)
-            if challenge:
-                challenges.append(challenge)
+        Yields challenges in completion order and skips failed generations. Calls also
+        wait for the provider's rate limits (see llm_routing.configure_rate_limits).
+        """
+        if not difficulties:
+            return
+        max_concurrency = max_concurrency or FANOUT_CONCURRENCY
         
-        return challenges
+        executor = ThreadPoolExecutor(max_workers=min(max_concurrency, len(difficulties)),
+                                      thread_name_prefix="challenge-fanout")
+        try:
+            futures = [
+                executor.submit(self.generate_challenge, difficulty, additional_context, language)
+                for difficulty in difficulties
+            ]
+            for future in as_completed(futures):
+                challenge = future.result()
+                if challenge:
+                    yield challenge
+        finally:
+            # If the caller stops early, drop the generations that have not started yet
+            executor.shutdown(wait=False, cancel_futures=True)
     
-    def _create_feedback_prompt(self, challenge, code, language):
-        """Create a prompt for generating solution feedback"""
-        return f"""
-        You are an expert coding interviewer reviewing a candidate's solution. 
+    @staticmethod
+    def _assign_difficulties(count, difficulties=None):
+        """Distribute difficulties across the requested count"""
+        if difficulties is None:
+            difficulties = ["easy", "medium", "hard"]
+        return [difficulties[i % len(difficulties)] for i in range(count)]
+    
+    def generate_challenges_batch(self, difficulties, additional_context=None, language="javascript"):
+        """
+        Generate one challenge per entry in difficulties, asking for a JSON array per prompt
         
-        Challenge: {challenge['title']}
-        Description: {challenge['description']}
+        Batches of up to max_batch_size run concurrently. Complete challenges are kept
+        from a malformed or truncated array, and any that are still missing are
+        generated one by one, concurrently.
+        """
+        batches = [difficulties[i:i + self.max_batch_size] for i in range(0, len(difficulties), self.max_batch_size)]
+        if not batches:
+            return []
         
-        Examples:
-        {json.dumps(challenge.get('examples', []))}
+        with ThreadPoolExecutor(max_workers=min(len(batches), FANOUT_CONCURRENCY)) as executor:
+            results = list(executor.map(
+                lambda batch: self._generate_batch(batch, additional_context, language), batches
+            ))
         
-        The candidate submitted this {language} solution:
-        ```{language}
-        {code}
-        ```
+        challenges = []
+        missing = []
+        for batch, batch_challenges in zip(batches, results):
+            challenges.extend(batch_challenges)
+            # The model may return fewer challenges than asked for; top up the difficulties at the end
+            missing.extend(batch[len(batch_challenges):])
         
-        Provide structured constructive feedback about the solution. Include:
-        1. Whether the solution correctly solves the problem
-        2. Time and space complexity analysis
-        3. Code quality assessment
-        4. Possible optimizations or alternative approaches
-        5. Edge cases that might not be handled
+        challenges.extend(self.iter_challenges(missing, additional_context, language))
+        return challenges
+    
+    def _generate_batch(self, difficulties, additional_context=None, language="javascript"):
+        """Request several challenges in one prompt and return the valid ones"""
+        try:
+            prompt = self._create_challenges_batch_prompt(difficulties, additional_context, language)
+            raw_response = self.router.generate(
+                prompt, json_schema=CHALLENGE_ARRAY_SCHEMA if JSON_MODE else None, method="generate_challenges_batch"
+            )
+        except Exception as e:
+            logger.error("Error calling %s API: %s", self.provider, e)
+            return []
         
-        Format your response in clear sections with Markdown formatting. After the feedback, please include
-        your solution to the problem in the same language for reference.
-        """
+        with span("parse"):
+            challenges = [
+                self._accept_challenge(challenge_data)
+                for challenge_data in parse_challenges(raw_response, difficulties)[:len(difficulties)]
+            ]
+        metrics.record_parse("generate_challenges_batch", len(challenges), len(difficulties) - len(challenges))
+        if len(challenges) < len(difficulties):
+            logger.info("Batch returned %d of %d challenges", len(challenges), len(difficulties))
+        return challenges
+    
+    def _accept_challenge(self, challenge_data):
+        """Give a parsed challenge its ID"""
+        # Always assign a unique ID; models tend to echo the placeholder from the prompt,
+        # and challenge IDs are primary keys in the shared challenge store.
+        # Repeats are filtered per user when challenges are served (see challenge_dedup)
+        challenge_data["id"] = str(uuid.uuid4())
+        return challenge_data
+    
+    def _create_feedback_prompt(self, challenge, code, language, test_results=""):
+        """Create a prompt for generating solution feedback"""
+        with span("prompt"):
+            return self.prompts.feedback_prompt(challenge, code, language, get_prompt_budget(self.model_name), test_results)
     
     def _create_hint_prompt(self, challenge, current_code=None):
         """Create a prompt for generating hints"""
-        code_context = ""
-        if current_code:
-            code_context = f"""
-            The user has written the following code so far:
-            ```
-            {current_code}
-            ```
-            """
-        
-        return f"""
-        You are a helpful coding interview assistant.
-        
-        Challenge: {challenge['title']}
-        Description: {challenge['description']}
-        
-        Examples:
-        {json.dumps(challenge.get('examples', []))}
-        {code_context}
-        
-        Provide a useful hint that will help the user solve the problem without giving away the complete solution.
-        The hint should be concise and point them in the right direction.
-        """
+        with span("prompt"):
+            return self.prompts.hint_prompt(challenge, current_code, get_prompt_budget(self.model_name))
     
     def _create_challenge_prompt(self, difficulty=None, additional_context=None, language="javascript"):
         """Create a prompt for generating a coding challenge"""
-        difficulty_str = f"The difficulty level should be {difficulty}." if difficulty else "Choose a random difficulty level (easy, medium, or hard)."
-        
-        # Add additional context if provided
-        context_str = ""
-        if additional_context:
-            context_str = f"The challenge should relate to the following context or topic: {additional_context}."
-        
-        # Add previous challenges to avoid repetition
-        previous_challenges_str = ""
-        if self.previous_challenges:
-            previous_challenges_str = "Avoid generating challenges similar to these:\n"
-            for i, challenge in enumerate(self.previous_challenges):
-                previous_challenges_str += f"{i+1}. {challenge['title']}: {challenge['description_snippet']}...\n"
-        
-        return f"""
-        Generate a unique, interesting coding interview challenge in {language}. {difficulty_str} {context_str}
-        
-        {previous_challenges_str}
-        
-        The response should be a valid JSON object with the following structure:
-        {{
-          "id": "unique_identifier",
-          "title": "Challenge Title",
-          "description": "Detailed description of the problem",
-          "examples": [
-            {{"input": "Example input", "output": "Example output", "explanation": "Optional explanation"}}
-          ],
-          "difficulty": "easy|medium|hard",
-          "hints": [
-            "First hint that guides without giving away the solution",
-            "Second hint that provides more direction"
-          ]
-        }}
-        
-        Make sure the challenge:
-        1. Is clearly defined with unambiguous requirements
-        2. Has at least two examples with input and expected output
-        3. Has appropriate difficulty level
-        4. Includes 2-3 helpful hints that don't give away the solution
-        5. Is formatted as valid JSON
-        6. Is novel and different from previous challenges listed above
-        7. Specifically addresses the provided context or topic if specified
-        
-        Return ONLY the JSON without any other text.
-        """
\ No newline at end of file
+        with span("prompt"):
+            return self.prompts.challenge_prompt(difficulty, additional_context, language)
+    
+    def _create_challenges_batch_prompt(self, difficulties, additional_context=None, language="javascript"):
+        """Create a prompt for generating several coding challenges as one JSON array"""
+        with span("prompt"):
+            return self.prompts.challenge_batch_prompt(difficulties, additional_context, language)
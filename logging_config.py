@@ -0,0 +1,167 @@
+"""
+Logging setup.
+Modules log through their own `logging.getLogger(__name__)` loggers. Records are
+put on an in-memory queue by the calling thread and formatted and written by a
+single background listener thread, as JSON lines or plain text, so logging never
+waits on stdout/stderr in a request thread. API keys, passwords and other secrets
+are redacted from messages and extra fields before they are written.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Records waiting for the listener; when full, new records are dropped rather than blocking
+MAX_QUEUED_RECORDS = 10000
+
+REDACTED = "[REDACTED]"
+
+# Secrets recognized in free text; each pattern's first group, if any, is kept as a prefix
+SECRET_PATTERNS = [
+    re.compile(r'\bsk-(?:ant-)?[A-Za-z0-9_\-]{8,}'),  # OpenAI and Anthropic API keys
+    re.compile(r'\bAIza[0-9A-Za-z_\-]{20,}'),  # Google API keys
+    re.compile(r'(?i)(\bbearer\s+)[A-Za-z0-9._~+/\-]+=*'),
+    # key=value and "key": value pairs whose key is a secret name, such as api_key, apiKey,
+    # client_secret or access_token; prose such as "Added new API key: ..." is left alone
+    re.compile(r'(?i)(\b[\w-]*?(?:api[_-]?key|password|passwd|secret|token)["\']?\s*[:=]\s*["\']?)[^\s"\',;&}]+'),
+    re.compile(r'(://[^:/@\s]+:)[^@\s]+(?=@)'),  # Passwords in URLs
+]
+
+# Extra fields whose values are always redacted
+SECRET_FIELD = re.compile(r'(?i)pass(word|wd)?$|secret|token|api[_-]?key|authorization|cookie')
+
+# Attributes every LogRecord has; anything else on a record was passed in `extra`
+_RECORD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def redact(value):
+    """Redact secrets from a string, or from the strings and secret-named fields of a dict or list."""
+    if isinstance(value, str):
+        for pattern in SECRET_PATTERNS:
+            value = pattern.sub(lambda match: (match.group(1) if match.groups() else '') + REDACTED, value)
+        return value
+    if isinstance(value, dict):
+        return {key: REDACTED if isinstance(key, str) and SECRET_FIELD.search(key) else redact(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including the fields passed in `extra`."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                    .isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = REDACTED if SECRET_FIELD.search(key) else redact(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text formatter that redacts secrets, for reading logs in a terminal."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the logging thread.
+
+    The message is merged with its arguments and any traceback rendered to text on
+    the calling thread, so the record no longer refers to objects that may change;
+    formatting, redaction and writing happen on the listener thread. Records
+    arriving while the queue is full are dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    """Parse per-logger levels, e.g. "llm_routing=DEBUG,sqlalchemy.engine=INFO"."""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, log_format=None, module_levels=None, stream=None):
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Safe to call more than once; later calls only update the levels.
+
+    Args:
+        level: Root log level, default LOG_LEVEL or INFO
+        log_format: 'json' or 'text', default LOG_FORMAT or json
+        module_levels: Levels per logger name, default parsed from LOG_LEVELS
+        stream: Stream written to, default stderr
+
+    Returns:
+        The QueueListener writing the records
+    """
+    global _listener
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    module_levels = module_levels if module_levels is not None else parse_levels(os.environ.get('LOG_LEVELS'))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    if _listener is None:
+        log_format = (log_format or os.environ.get('LOG_FORMAT', 'json')).lower()
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(TextFormatter() if log_format == 'text' else JsonFormatter())
+
+        log_queue = queue.Queue(maxsize=MAX_QUEUED_RECORDS)
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(NonBlockingQueueHandler(log_queue))
+
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        # Write out what is still queued when the process exits
+        atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,57 @@
+"""
+Alembic environment.
+Connects with the app's DatabaseConfig built from the DB_* environment variables,
+and compares against the models' metadata for autogenerate.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+
+from database.config import DatabaseConfig
+from database.database import Base
+from database import models  # noqa: F401 (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+load_dotenv()
+db_config = DatabaseConfig.from_env()
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit the migration SQL instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=db_config.database_uri,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=db_config.db_type == 'sqlite',
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run the migrations against the configured database."""
+    db_config.ensure_db_path()
+    # A single short-lived connection; the app's pool settings do not apply here
+    connectable = create_engine(db_config.database_uri, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite cannot ALTER most things in place; batch mode recreates the table
+            render_as_batch=db_config.db_type == 'sqlite',
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,94 @@
+"""Initial schema
+
+Creates the tables that init_db_schema used to create at startup. Databases
+created that way already have them; mark those as migrated with
+`alembic stamp 0001` instead of running this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=64), nullable=False),
+        sa.Column('password_hash', sa.String(length=256), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table(
+        'llm_api_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('llm_provider', sa.Enum('OPENAI', 'ANTHROPIC', 'GEMINI', name='llmprovider'), nullable=False),
+        sa.Column('api_key', sa.String(length=256), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_llm_api_keys_user_provider', 'llm_api_keys', ['user_id', 'llm_provider'])
+
+    op.create_table(
+        'challenges',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(length=256), nullable=False),
+        sa.Column('difficulty', sa.String(length=16), nullable=True),
+        sa.Column('language', sa.String(length=32), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_challenges_created_at', 'challenges', ['created_at'])
+
+    op.create_table(
+        'llm_response_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('endpoint', sa.String(length=32), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_llm_response_cache_created_at', 'llm_response_cache', ['created_at'])
+    op.create_index('ix_llm_response_cache_expires_at', 'llm_response_cache', ['expires_at'])
+
+    op.create_table(
+        'challenge_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('challenge_id', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(length=256), nullable=False),
+        sa.Column('signature', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_challenge_fingerprints_user_created', 'challenge_fingerprints', ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_challenge_fingerprints_user_created', table_name='challenge_fingerprints')
+    op.drop_table('challenge_fingerprints')
+    op.drop_index('ix_llm_response_cache_expires_at', table_name='llm_response_cache')
+    op.drop_index('ix_llm_response_cache_created_at', table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
+    op.drop_index('ix_challenges_created_at', table_name='challenges')
+    op.drop_table('challenges')
+    op.drop_index('ix_llm_api_keys_user_provider', table_name='llm_api_keys')
+    op.drop_table('llm_api_keys')
+    # PostgreSQL keeps the enum type after its table is dropped
+    sa.Enum(name='llmprovider').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_table('users')
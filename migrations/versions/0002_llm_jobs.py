@@ -0,0 +1,38 @@
+"""Shared LLM job table
+
+Stores the status and result of /api/jobs jobs so any worker process can answer
+a poll for them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'llm_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('type', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('enqueued_at', sa.Float(), nullable=False),
+        sa.Column('started_at', sa.Float(), nullable=True),
+        sa.Column('finished_at', sa.Float(), nullable=True),
+        sa.Column('expires_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_llm_jobs_expires_at', 'llm_jobs', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_llm_jobs_expires_at', table_name='llm_jobs')
+    op.drop_table('llm_jobs')
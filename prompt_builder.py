@@ -0,0 +1,327 @@
+"""
+Prompt builder for LLM requests.
+Templates are dedented and compiled once at import, the challenge part of hint and
+feedback prompts is serialized once per challenge, and every prompt is fitted to a
+per-model token budget by truncating the user's code instead of sending it whole.
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+from string import Template
+from textwrap import dedent
+from cachetools import LRUCache
+
+# Prompt token budget for models without their own entry
+DEFAULT_PROMPT_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 6000))
+
+# Tokens always left for the user's code, even if the rest of the prompt is large
+MIN_CODE_TOKENS = 256
+
+
+def _parse_budgets(spec):
+    """Parse "model:tokens,model:tokens" into a dict."""
+    budgets = {}
+    for item in (spec or '').split(','):
+        model, _, tokens = item.strip().rpartition(':')
+        if model and tokens:
+            budgets[model] = int(tokens)
+    return budgets
+
+
+# Per-model prompt budgets, e.g. PROMPT_TOKEN_BUDGETS="gemini-2.0-flash:12000,gpt-4o-mini:4000"
+MODEL_PROMPT_BUDGETS = _parse_budgets(os.environ.get('PROMPT_TOKEN_BUDGETS'))
+
+
+def get_prompt_budget(model_name):
+    """Get the prompt token budget for a model."""
+    return MODEL_PROMPT_BUDGETS.get(model_name, DEFAULT_PROMPT_BUDGET)
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text):
+    """
+    Count the tokens in a text.
+
+    Uses tiktoken's cl100k_base encoding when tiktoken is installed; other models
+    tokenize differently, but it is close enough for budgeting. Without tiktoken,
+    assumes about four characters per token.
+    """
+    global _encoding, _encoding_loaded
+    if not text:
+        return 0
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _clip(text, max_tokens, from_end=False):
+    """Return the longest start (or end) of a text that fits in max_tokens."""
+    low, high = 0, min(len(text), max(max_tokens, 0) * 8)
+    while low < high:
+        size = (low + high + 1) // 2
+        if count_tokens(text[-size:] if from_end else text[:size]) <= max_tokens:
+            low = size
+        else:
+            high = size - 1
+    if not low:
+        return ''
+    return text[-low:] if from_end else text[:low]
+
+
+def truncate_code(code, max_tokens):
+    """
+    Shorten code to about max_tokens, keeping its beginning and end.
+
+    Whole lines are kept from the top (two thirds of the budget) and the bottom
+    (one third), with a marker in place of the omitted lines. When the first or
+    last line alone is over its budget it is cut by characters instead, so a
+    submission that is one long line still keeps its start and end.
+    """
+    if count_tokens(code) <= max_tokens:
+        return code
+    lines = code.splitlines()
+    head_budget = max_tokens * 2 // 3
+    tail_budget = max_tokens - head_budget
+
+    head, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > head_budget:
+            break
+        head.append(line)
+        used += cost
+    rest = lines[len(head):]
+    # Only when not even one whole line fits is a line cut by characters
+    head_part = _clip(rest[0], head_budget - used - 1) if rest and not head else ''
+    if head_part:
+        rest[0] = rest[0][len(head_part):]
+
+    tail, used = [], 0
+    for line in reversed(rest):
+        cost = count_tokens(line) + 1
+        if used + cost > tail_budget:
+            break
+        tail.append(line)
+        used += cost
+    tail.reverse()
+    rest = rest[:len(rest) - len(tail)]
+    tail_part = _clip(rest[-1], tail_budget - used - 1, from_end=True) if rest and not tail else ''
+    if tail_part:
+        rest[-1] = rest[-1][:-len(tail_part)]
+
+    if not head_part and not tail_part:
+        return '\n'.join(head + [f"... [{len(rest)} lines omitted to fit the prompt] ..."] + tail)
+    # Cut lines continue on either side of the marker
+    omitted = len('\n'.join(rest))
+    marker = f" ... [{omitted} characters omitted to fit the prompt] ... "
+    return '\n'.join(head + [head_part]) + marker + '\n'.join([tail_part] + tail)
+
+
+def _template(text):
+    """Compile a prompt template, dropping the source indentation."""
+    return Template(dedent(text).strip() + "\n")
+
+
+FEEDBACK_TEMPLATE = _template("""
+    You are an expert coding interviewer reviewing a candidate's solution.
+
+    $challenge
+
+    The candidate submitted this $language solution:
+    ```$language
+    $code
+    ```
+    $test_results
+    Provide structured constructive feedback about the solution. Include:
+    1. Whether the solution correctly solves the problem
+    2. Time and space complexity analysis
+    3. Code quality assessment
+    4. Possible optimizations or alternative approaches
+    5. Edge cases that might not be handled
+
+    Format your response in clear sections with Markdown formatting. After the feedback, please include
+    your solution to the problem in the same language for reference.
+""")
+
+HINT_TEMPLATE = _template("""
+    You are a helpful coding interview assistant.
+
+    $challenge
+    $code_context
+    Provide a useful hint that will help the user solve the problem without giving away the complete solution.
+    The hint should be concise and point them in the right direction.
+""")
+
+HINT_CODE_TEMPLATE = _template("""
+    The user has written the following code so far:
+    ```
+    $code
+    ```
+""")
+
+CHALLENGE_FORMAT = dedent("""
+    {
+      "id": "unique_identifier",
+      "title": "Challenge Title",
+      "description": "Detailed description of the problem",
+      "function_name": "nameOfTheFunctionToImplement",
+      "examples": [
+        {"input": "arg1 = value, arg2 = value", "output": "Expected return value", "explanation": "Optional explanation"}
+      ],
+      "difficulty": "easy|medium|hard",
+      "hints": [
+        "First hint that guides without giving away the solution",
+        "Second hint that provides more direction"
+      ]
+    }
+""").strip()
+
+CHALLENGE_TEMPLATE = _template("""
+    Generate a unique, interesting coding interview challenge in $language. $difficulty $context
+
+    The response should be a valid JSON object with the following structure:
+    $format
+
+    Make sure the challenge:
+    1. Is clearly defined with unambiguous requirements
+    2. Has at least two examples with input and expected output, written as the function's arguments and return value
+    3. Has appropriate difficulty level
+    4. Includes 2-3 helpful hints that don't give away the solution
+    5. Is formatted as valid JSON
+    6. Specifically addresses the provided context or topic if specified
+
+    Return ONLY the JSON without any other text.
+""")
+
+CHALLENGE_BATCH_TEMPLATE = _template("""
+    Generate $count unique, interesting coding interview challenges in $language, all different from each other.
+    Their difficulty levels, in order, should be: $difficulties. $context
+
+    The response should be a valid JSON array of $count objects, each with the following structure:
+    $format
+
+    Make sure each challenge:
+    1. Is clearly defined with unambiguous requirements
+    2. Has at least two examples with input and expected output, written as the function's arguments and return value
+    3. Has the difficulty level given for its position
+    4. Includes 2-3 helpful hints that don't give away the solution
+    5. Is novel and different from the others
+    6. Specifically addresses the provided context or topic if specified
+
+    Return ONLY the JSON array without any other text.
+""")
+
+
+class PromptBuilder:
+    """Builds prompts from the compiled templates within a token budget."""
+
+    def __init__(self, max_cached_challenges=1024):
+        """
+        Initialize the prompt builder.
+
+        Args:
+            max_cached_challenges: Challenges whose serialized prompt fragment is kept
+        """
+        self._fragments = LRUCache(maxsize=max_cached_challenges)
+        self._lock = threading.Lock()
+
+    def challenge_fragment(self, challenge):
+        """
+        Return the challenge title, description and examples as prompt text, with its token count.
+
+        Serialized once per challenge ID; challenges are immutable once generated.
+        """
+        key = challenge.get('id')
+        with self._lock:
+            fragment = self._fragments.get(key) if key else None
+        if fragment is not None:
+            return fragment
+
+        text = (
+            f"Challenge: {challenge['title']}\n"
+            f"Description: {challenge['description']}\n\n"
+            f"Examples:\n{json.dumps(challenge.get('examples', []))}"
+        )
+        fragment = (text, count_tokens(text))
+        if key:
+            with self._lock:
+                self._fragments[key] = fragment
+        return fragment
+
+    def feedback_prompt(self, challenge, code, language, budget, test_results=""):
+        """
+        Build the solution feedback prompt, truncating the code to fit the budget.
+
+        Args:
+            test_results: Summary of running the examples against the code, if they were run
+        """
+        challenge_text, challenge_tokens = self.challenge_fragment(challenge)
+        test_results = f"\n{test_results}" if test_results else ""
+        fixed_tokens = _template_tokens(FEEDBACK_TEMPLATE) + challenge_tokens + count_tokens(test_results)
+        code = truncate_code(code or '', max(MIN_CODE_TOKENS, budget - fixed_tokens))
+        return FEEDBACK_TEMPLATE.substitute(
+            challenge=challenge_text, language=language, code=code, test_results=test_results
+        )
+
+    def hint_prompt(self, challenge, current_code, budget):
+        """Build the hint prompt, truncating the code to fit the budget."""
+        challenge_text, challenge_tokens = self.challenge_fragment(challenge)
+        code_context = ""
+        if current_code:
+            fixed_tokens = _template_tokens(HINT_TEMPLATE) + _template_tokens(HINT_CODE_TEMPLATE) + challenge_tokens
+            code = truncate_code(current_code, max(MIN_CODE_TOKENS, budget - fixed_tokens))
+            code_context = "\n" + HINT_CODE_TEMPLATE.substitute(code=code)
+        return HINT_TEMPLATE.substitute(challenge=challenge_text, code_context=code_context)
+
+    def challenge_prompt(self, difficulty, additional_context, language):
+        """Build the single challenge prompt."""
+        difficulty_str = (f"The difficulty level should be {difficulty}." if difficulty
+                          else "Choose a random difficulty level (easy, medium, or hard).")
+        context_str = ""
+        if additional_context:
+            context_str = f"The challenge should relate to the following context or topic: {additional_context}."
+        return CHALLENGE_TEMPLATE.substitute(
+            language=language, difficulty=difficulty_str, context=context_str, format=CHALLENGE_FORMAT
+        )
+
+    def challenge_batch_prompt(self, difficulties, additional_context, language):
+        """Build the batch challenge prompt."""
+        difficulty_list = ", ".join(d or "any difficulty (easy, medium, or hard)" for d in difficulties)
+        context_str = ""
+        if additional_context:
+            context_str = f"Each challenge should relate to the following context or topic: {additional_context}."
+        return CHALLENGE_BATCH_TEMPLATE.substitute(
+            count=len(difficulties), language=language, difficulties=difficulty_list,
+            context=context_str, format=CHALLENGE_FORMAT
+        )
+
+    def stats(self):
+        """Return the number of cached challenge fragments."""
+        with self._lock:
+            return {"cached_fragments": len(self._fragments), "max_cached_fragments": self._fragments.maxsize}
+
+
+# Shared by all LLM services, so each challenge is serialized once per process
+prompt_builder = PromptBuilder()
+
+
+@lru_cache(maxsize=None)
+def _constant_tokens(text):
+    """Token count of fixed prompt text, computed once per text."""
+    return count_tokens(text)
+
+
+def _template_tokens(template):
+    """Token count of a template's fixed text."""
+    return _constant_tokens(template.template)
@@ -0,0 +1,250 @@
+"""
+Per-request timing and profiling.
+Code wraps the phases of a request (database queries, prompt building, model
+calls, parsing) in named spans. Their total time per request is sent back in a
+Server-Timing header and logged as a structured record. Optionally a sample of
+requests, or requests carrying a token header, are run under cProfile and the
+profiles written to disk for offline flame graphs.
+"""
+import contextlib
+import contextvars
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Header that turns on profiling for one request when it carries the configured token
+PROFILE_HEADER = 'X-Profile'
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+# cProfile hooks into the interpreter; profile one request at a time
+_profile_lock = threading.Lock()
+
+
+class RequestTiming:
+    """Time spent per span name during one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}  # name -> [milliseconds, count]
+        self._lock = threading.Lock()  # Spans can be recorded from worker threads of an async request
+
+    def add(self, name, ms):
+        with self._lock:
+            totals = self.spans.setdefault(name, [0.0, 0])
+            totals[0] += ms
+            totals[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self):
+        """Format the spans and the time elapsed so far as a Server-Timing header value."""
+        with self._lock:
+            entries = [f"{name};dur={ms:.1f}" for name, (ms, _) in self.spans.items()]
+        entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self):
+        """Return the spans as {name: {"ms": ..., "count": ...}}."""
+        with self._lock:
+            return {name: {"ms": round(ms, 3), "count": count} for name, (ms, count) in self.spans.items()}
+
+
+def current_timing():
+    """Return the timing of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name):
+    """
+    Time a block of code as part of the current request.
+
+    Spans with the same name add up, e.g. every database query of a request counts
+    towards 'db'. Outside a timed request this does nothing.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, (time.perf_counter() - start) * 1000)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('request_timing_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    starts = conn.info.get('request_timing_start')
+    if timing is not None and starts:
+        timing.add('db', (time.perf_counter() - starts.pop()) * 1000)
+
+
+def instrument_sqlalchemy():
+    """Count the time of every SQL statement, on any engine, towards the 'db' span."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def log_request(method, path, status, timing):
+    """Log the timing of a finished request as a structured record."""
+    total_ms = timing.elapsed_ms()
+    logger.info(
+        "%s %s %s %.1f ms", method, path, status, total_ms,
+        extra={"http": {"method": method, "path": path, "status": status},
+               "duration_ms": round(total_ms, 3), "spans": timing.to_dict()},
+    )
+
+
+class Profiler:
+    """Runs sampled requests under cProfile and writes the profiles to a directory."""
+
+    def __init__(self, directory, sample_rate=0.01, token=None):
+        """
+        Initialize the profiler.
+
+        Args:
+            directory: Directory the .prof files (pstats format) are written to
+            sample_rate: Fraction of requests profiled
+            token: Requests with an X-Profile header carrying this token are always
+                profiled; without a token the header is ignored
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.written = 0
+
+    def start(self, header_value=None):
+        """
+        Start profiling the current request if it is sampled or asked for.
+
+        Returns:
+            The running cProfile.Profile, or None if this request is not profiled
+        """
+        requested = bool(self.token and header_value) and hmac.compare_digest(header_value, self.token)
+        if not requested and random.random() >= self.sample_rate:
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except Exception:
+            _profile_lock.release()
+            raise
+        return profile
+
+    def stop(self, profile, method, path, elapsed_ms):
+        """Stop a profile started by start() and write it to the profile directory."""
+        try:
+            profile.disable()
+        finally:
+            _profile_lock.release()
+        name = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{name}-{elapsed_ms:.0f}ms-{os.getpid()}.prof"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, filename))
+            self.written += 1
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", filename, e)
+
+
+def init_request_timing(app, server_timing=True, profiler=None):
+    """
+    Time every request of a Flask app.
+
+    Args:
+        server_timing: Send the spans in a Server-Timing response header
+        profiler: Optional Profiler for sampled requests
+    """
+    from flask import g, request
+
+    instrument_sqlalchemy()
+
+    @app.before_request
+    def start_timing():
+        g.request_timing_token = _current.set(RequestTiming())
+        if profiler is not None:
+            g.request_profile = profiler.start(request.headers.get(PROFILE_HEADER))
+
+    @app.after_request
+    def add_timing(response):
+        timing = _current.get()
+        g.request_status = response.status_code
+        if timing is not None:
+            if server_timing:
+                response.headers['Server-Timing'] = timing.header()
+            # Streamed responses are still running; they are logged once the stream ends
+            if not response.is_streamed:
+                log_request(request.method, request.path, response.status_code, timing)
+                g.request_timing_logged = True
+        return response
+
+    @app.teardown_request
+    def finish_timing(exception=None):
+        timing = _current.get()
+        token = g.pop('request_timing_token', None)
+        profile = g.pop('request_profile', None)
+        if timing is not None and not g.pop('request_timing_logged', False):
+            log_request(request.method, request.path, 500 if exception else g.get('request_status', 500), timing)
+        if profile is not None:
+            profiler.stop(profile, request.method, request.path, timing.elapsed_ms() if timing else 0.0)
+        if token is not None:
+            _current.reset(token)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware timing requests served by async handlers.
+
+    Adds the Server-Timing header and logs the request unless a mounted Flask app
+    already did, so requests passed through to Flask are not reported twice.
+    """
+
+    def __init__(self, app, server_timing=True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        response = {"status": None, "timed_elsewhere": False}
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                response["status"] = message['status']
+                response["timed_elsewhere"] = any(name.lower() == b'server-timing' for name, _ in headers)
+                if self.server_timing and not response["timed_elsewhere"]:
+                    headers.append((b'server-timing', timing.header().encode('latin-1')))
+                    message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if not response["timed_elsewhere"]:
+                log_request(scope.get('method'), scope.get('path'), response["status"] or 500, timing)
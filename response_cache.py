@@ -0,0 +1,296 @@
+"""
+LLM response cache for hints and feedback.
+Responses are keyed on the endpoint, model, challenge, language and the submitted
+code with comments and formatting normalized away (string literals are left as
+they are), so repeat requests skip the LLM entirely.
+"""
+import datetime
+import hashlib
+import io
+import logging
+import re
+import threading
+import tokenize
+from collections import defaultdict
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+from database import database
+from database.models import LlmResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Languages whose comments are stripped; for any other language the code is only
+# normalized outside string literals
+_SLASH_COMMENT_LANGUAGES = {'javascript', 'typescript', 'java', 'cpp', 'c', 'csharp', 'go', 'kotlin', 'swift', 'rust'}
+
+
+def _normalize_python(code):
+    """Rebuild Python code from its tokens, without comments and with uniform spacing and indentation."""
+    lines, tokens, depth = [], [], 0
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type == tokenize.INDENT:
+            depth += 1
+        elif token.type == tokenize.DEDENT:
+            depth -= 1
+        elif token.type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+            if tokens:
+                lines.append('    ' * depth + ' '.join(tokens))
+            tokens = []
+        elif token.type not in (tokenize.COMMENT, tokenize.NL):
+            tokens.append(token.string)
+    return '\n'.join(lines)
+
+
+def _scan(code, line_comment=None, block_comments=False, triple_quotes=False, keep_indent=True):
+    """
+    Normalize code outside its string literals.
+
+    String literals are copied unchanged. Outside them, the given comment syntax
+    counts as whitespace, blank lines are dropped and a run of whitespace within a
+    line becomes one space, or nothing where it separates a word from punctuation
+    (so `a - -b` and `a--b` stay different). Line breaks are kept, since they can
+    matter (JavaScript's automatic semicolons), and so is indentation if asked. A
+    backslash outside a string keeps the next character, so a regular expression
+    such as `/\\//` is not read as a comment.
+    """
+    # Split into string literals, whitespace (including comments) and other characters
+    parts, i, n = [], 0, len(code)
+    while i < n:
+        char = code[i]
+        if char in '\'"`':
+            quote = code[i:i + 3] if triple_quotes and code[i:i + 3] in ('"""', "'''") else char
+            j = i + len(quote)
+            while j < n and not code.startswith(quote, j):
+                j += 2 if code[j] == '\\' else 1
+            j = min(j + len(quote), n)
+            parts.append(('string', code[i:j]))
+        elif line_comment and code.startswith(line_comment, i):
+            j = code.find('\n', i)
+            j = n if j < 0 else j
+            parts.append(('space', ' '))
+        elif block_comments and code.startswith('/*', i):
+            j = code.find('*/', i + 2)
+            j = n if j < 0 else j + 2
+            parts.append(('space', '\n' if '\n' in code[i:j] else ' '))
+        elif char.isspace():
+            j = i
+            while j < n and code[j].isspace():
+                j += 1
+            parts.append(('space', code[i:j]))
+        else:
+            j = i + 2 if char == '\\' else i + 1
+            parts.append(('code', code[i:j]))
+        i = j
+
+    lines, line, indent, pending_space = [], [], '', False
+    for index, (kind, text) in enumerate(parts):
+        if kind == 'space':
+            # Whitespace runs and comments next to each other act as one run
+            run = text
+            if index and parts[index - 1][0] == 'space':
+                continue
+            for following, more in parts[index + 1:]:
+                if following != 'space':
+                    break
+                run += more
+            if '\n' in run or not line:
+                # A line break, or the indentation of the first line
+                if line:
+                    lines.append(indent + ''.join(line))
+                line = []
+                indent = run[run.rfind('\n') + 1:].expandtabs(4) if keep_indent else ''
+                pending_space = False
+            else:
+                pending_space = bool(line)
+            continue
+        if pending_space:
+            before, after = line[-1][-1], text[0]
+            if (before.isalnum() or before == '_') == (after.isalnum() or after == '_'):
+                line.append(' ')
+            pending_space = False
+        line.append(text)
+    if line:
+        lines.append(indent + ''.join(line))
+    return '\n'.join(lines)
+
+
+def normalize_code(code, language=None):
+    """
+    Normalize code for use in a cache key.
+
+    Submissions that differ only in formatting map to the same key, and for a
+    known language so do ones that differ only in comments. String literals are
+    never changed, so code that behaves differently never shares a key: Python is
+    compared token by token, and other languages with a string-aware scanner.
+    Without a language, nothing is treated as a comment and indentation is kept.
+    """
+    if not code:
+        return ''
+    language = (language or '').lower() or None
+    if language == 'python':
+        try:
+            return _normalize_python(code)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            # Incomplete code, as hints often see
+            return _scan(code, line_comment='#', triple_quotes=True)
+    if language in _SLASH_COMMENT_LANGUAGES:
+        return _scan(code, line_comment='//', block_comments=True, keep_indent=False)
+    return _scan(code)
+
+
+# Example timings in test results differ between runs of the same code, so they are left out of keys
+_TIMINGS = re.compile(r'\d+(?:\.\d+)? ms\b')
+
+
+def make_cache_key(endpoint, model_name, challenge_id, code, language=None, test_results=None):
+    """
+    Build the cache key for a hint or feedback request.
+
+    Args:
+        test_results: The test results summary the prompt includes, if any; the
+            response depends on it as much as on the code
+    """
+    results = _TIMINGS.sub('ms', test_results) if test_results else ''
+    parts = [endpoint, model_name or '', challenge_id, language or '', normalize_code(code, language),
+             hashlib.sha256(results.encode('utf-8')).hexdigest() if results else '']
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process cache backend with LRU eviction and a TTL."""
+
+    def __init__(self, max_size=4096, ttl=86400):
+        self._cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, endpoint, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def size(self):
+        with self._lock:
+            self._cache.expire()
+            return len(self._cache)
+
+
+class SqlCacheBackend:
+    """
+    Database cache backend, shared by all worker processes.
+
+    Uses its own short-lived sessions so cache writes never commit or roll back
+    the request's session.
+    """
+
+    # Expired and excess rows are pruned once every this many writes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, max_size=100000, ttl=86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _session(self):
+        return Session(bind=database.get_engine())
+
+    def get(self, key):
+        with self._session() as db:
+            entry = db.get(LlmResponseCache, key)
+            if entry is None or entry.expires_at < datetime.datetime.utcnow():
+                return None
+            return entry.response
+
+    def set(self, key, endpoint, value):
+        now = datetime.datetime.utcnow()
+        with self._session() as db:
+            db.merge(LlmResponseCache(
+                key=key,
+                endpoint=endpoint,
+                response=value,
+                created_at=now,
+                expires_at=now + datetime.timedelta(seconds=self.ttl),
+            ))
+            db.commit()
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self._prune()
+
+    def size(self):
+        with self._session() as db:
+            return db.query(LlmResponseCache).count()
+
+    def _prune(self):
+        """Delete expired entries and trim the table to the size bound, oldest first."""
+        with self._session() as db:
+            db.query(LlmResponseCache).filter(
+                LlmResponseCache.expires_at < datetime.datetime.utcnow()
+            ).delete(synchronize_session=False)
+            cutoff = db.query(LlmResponseCache.created_at).order_by(
+                LlmResponseCache.created_at.desc()
+            ).offset(self.max_size).limit(1).scalar()
+            if cutoff is not None:
+                db.query(LlmResponseCache).filter(
+                    LlmResponseCache.created_at <= cutoff
+                ).delete(synchronize_session=False)
+            db.commit()
+
+
+class ResponseCache:
+    """Response cache with per-endpoint hit/miss accounting over a pluggable backend."""
+
+    def __init__(self, backend=None):
+        """
+        Initialize the response cache.
+
+        Args:
+            backend: Cache backend (MemoryCacheBackend by default)
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, key):
+        """Look up a cached response and record the hit or miss for the endpoint."""
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning("Error reading response cache: %s", e)
+            value = None
+        with self._lock:
+            self._stats[endpoint]['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, endpoint, key, value):
+        """Store a response; backend errors are logged and otherwise ignored."""
+        try:
+            self.backend.set(key, endpoint, value)
+        except Exception as e:
+            logger.warning("Error writing response cache: %s", e)
+
+    def stats(self):
+        """Return the hit ratio per endpoint and the backend size."""
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._stats.items():
+                total = stats['hits'] + stats['misses']
+                endpoints[endpoint] = {
+                    **stats,
+                    'hit_ratio': stats['hits'] / total if total else 0.0,
+                }
+        try:
+            size = self.backend.size()
+        except Exception as e:
+            logger.warning("Error reading response cache size: %s", e)
+            size = None
+        return {
+            'backend': type(self.backend).__name__,
+            'size': size,
+            'endpoints': endpoints,
+        }
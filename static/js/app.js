@@ -178,36 +178,25 @@ document.addEventListener('DOMContentLoaded', function() {
             const payload = {
                 challengeId: currentChallenge.id,
                 hintIndex: currentHintIndex,
-                code: codeEditor.getValue()  // Send the current code for context-aware hints
+                code: codeEditor.getValue(),  // Send the current code for context-aware hints
+                language: languageSelector.value
             };
             
             // Add model data if available
             if (modelData) {
                 payload.provider = modelData.provider;
-                payload.key_id = modelData.key_id;
+                payload.model = modelData.model;
             }
             
-            const response = await fetch(`${API_BASE_URL}/hint`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(payload)
+            // Stream the hint, re-rendering the markdown as each chunk arrives
+            const data = await streamEvents(`${API_BASE_URL}/hint/stream`, payload, hintText => {
+                const formattedHint = marked.parse(hintText);
+                resultsDisplay.innerHTML = `<div class="hint"><strong>Hint:</strong> ${formattedHint}</div>`;
             });
             
-            const data = await response.json();
-            
-            if (response.ok) {
-                // Format hint with markdown parser
-                const formattedHint = marked.parse(data.hint);
-                resultsDisplay.innerHTML = `<div class="hint"><strong>Hint:</strong> ${formattedHint}</div>`;
-                
-                // Increment the hint index if it's not the last hint
-                if (!data.isLastHint) {
-                    currentHintIndex++;
-                }
-            } else {
-                throw new Error(data.error || 'Failed to get hint');
+            // Increment the hint index if it's not the last hint
+            if (!data.isLastHint) {
+                currentHintIndex++;
             }
         } catch (error) {
             console.error('Error getting hint:', error);
@@ -245,33 +234,82 @@ document.addEventListener('DOMContentLoaded', function() {
             // Add model data if available
             if (modelData) {
                 payload.provider = modelData.provider;
-                payload.key_id = modelData.key_id;
+                payload.model = modelData.model;
             }
             
-            // Call the backend API to submit the solution
-            const response = await fetch(`${API_BASE_URL}/submit`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(payload)
-            });
-            
-            const data = await response.json();
-            
-            if (response.ok) {
-                // Format the feedback with markdown parser
-                const formattedFeedback = marked.parse(data.feedback);
+            // Stream the feedback, re-rendering the markdown as each chunk arrives
+            await streamEvents(`${API_BASE_URL}/submit/stream`, payload, feedbackText => {
+                const formattedFeedback = marked.parse(feedbackText);
                 resultsDisplay.innerHTML = `<div class="feedback">${formattedFeedback}</div>`;
-            } else {
-                throw new Error(data.error || 'Failed to submit solution');
-            }
+            });
         } catch (error) {
             console.error('Error submitting solution:', error);
             resultsDisplay.innerHTML = `<p class="error">Failed to submit solution: ${error.message}</p>`;
         }
     }
     
+    // POST a payload to a Server-Sent Events endpoint and read the streamed text.
+    // onText is called with the accumulated text after every chunk; resolves with
+    // the data of the final 'done' event.
+    async function streamEvents(url, payload, onText) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(payload)
+        });
+        
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'Request failed');
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line; keep any partial event in the buffer
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            
+            for (const rawEvent of events) {
+                let eventType = 'message';
+                let eventData = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        eventType = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        eventData += line.slice(6);
+                    }
+                });
+                
+                const data = eventData ? JSON.parse(eventData) : {};
+                if (eventType === 'done') {
+                    return data;
+                } else if (eventType === 'error') {
+                    throw new Error(data.error || 'Stream failed');
+                } else if (eventType === 'status') {
+                    // Progress message, replaced by the next text chunk
+                    onText(text + `*${data.text}*`);
+                } else {
+                    text += data.text;
+                    onText(text);
+                }
+            }
+        }
+        
+        throw new Error('Stream ended unexpectedly');
+    }
+    
     // Display challenge in the UI
     function displayChallenge(challenge) {
         challengeTitle.textContent = challenge.title;
@@ -283,6 +321,10 @@ document.addEventListener('DOMContentLoaded', function() {
         // Format challenge description with markdown
         const formattedDescription = marked.parse(challenge.description);
         
+        // The examples are run against a function with this name when a solution is submitted
+        const functionHTML = challenge.function_name ?
+            `<p class="function-name"><strong>Implement:</strong> <code>${challenge.function_name}</code></p>` : '';
+        
         let examplesHTML = '';
         if (challenge.examples && challenge.examples.length > 0) {
             const exampleItems = challenge.examples.map(ex => {
@@ -326,6 +368,7 @@ document.addEventListener('DOMContentLoaded', function() {
             </div>
             <div class="challenge-content">
                 ${formattedDescription}
+                ${functionHTML}
                 ${examplesHTML}
                 ${constraintsHTML}
             </div>
@@ -580,30 +623,28 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            const response = await fetch(`${API_BASE_URL}/api-keys`);
+            // One request for all usable models; the browser revalidates it with the ETag
+            const response = await fetch(`${API_BASE_URL}/model-catalog`);
             if (response.ok) {
                 const data = await response.json();
+                // Only the providers the user has a key for are listed
+                const usable = data.providers;
                 modelSelector.innerHTML = '<option value="">Choose a model</option>';
 
-                if (!data.apiKeys || data.apiKeys.length === 0) {
+                if (usable.length === 0) {
                     modelSelector.innerHTML = '<option value="">No API keys configured</option>';
                     modelSelector.disabled = true;
                     return;
                 }
 
-                for (const key of data.apiKeys) {
-                    const provider = key.llm_provider.toLowerCase();
-                    const modelsResponse = await fetch(`${API_BASE_URL}/llm-models/${provider}`);
-                    if (modelsResponse.ok) {
-                        const models = await modelsResponse.json();
-                        models.forEach(model => {
-                            const option = document.createElement('option');
-                            option.value = JSON.stringify({ provider: key.llm_provider, model: model.value });
-                            option.textContent = `${key.llm_provider} - ${model.label}`;
-                            modelSelector.appendChild(option);
-                        });
-                    }
-                }
+                usable.forEach(entry => {
+                    entry.models.forEach(model => {
+                        const option = document.createElement('option');
+                        option.value = JSON.stringify({ provider: entry.provider, model: model.value });
+                        option.textContent = `${entry.label} - ${model.label}`;
+                        modelSelector.appendChild(option);
+                    });
+                });
 
                 modelSelector.disabled = false;
             } else {
@@ -24,11 +24,13 @@ document.addEventListener('DOMContentLoaded', function() {
     // Current user and API keys
     let currentUser = null;
     let userApiKeys = [];
+    let modelCatalog = [];
 
     // Check if user is logged in on page load
     checkAuthStatus().then(() => {
         if (currentUser) {
             loadUserApiKeys();
+            loadModelCatalog();
         } else {
             showLoginRequired();
         }
@@ -251,28 +253,35 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Update model options based on selected provider
-    async function updateModelOptions() {
+    function updateModelOptions() {
         const provider = llmProviderSelect.value;
         llmModelSelect.innerHTML = '<option value="">-- Select Model --</option>';
         
-        if (provider) {
-            try {
-                const response = await fetch(`${API_BASE_URL}/llm-models/${provider}`);
-                if (response.ok) {
-                    const models = await response.json();
-                    models.forEach(model => {
-                        const option = document.createElement('option');
-                        option.value = model.value;
-                        option.textContent = model.label;
-                        llmModelSelect.appendChild(option);
-                    });
-                } else {
-                    showMessage('Failed to load model options', 'error');
-                }
-            } catch (error) {
-                console.error('Error loading model options:', error);
-                showMessage('Error loading model options', 'error');
+        const entry = modelCatalog.find(item => item.provider === provider);
+        if (entry) {
+            entry.models.forEach(model => {
+                const option = document.createElement('option');
+                option.value = model.value;
+                option.textContent = model.label;
+                llmModelSelect.appendChild(option);
+            });
+        }
+    }
+
+    // Load the models of every provider in one request; the browser revalidates it with the ETag
+    async function loadModelCatalog() {
+        try {
+            const response = await fetch(`${API_BASE_URL}/model-catalog?all=true`);
+            if (response.ok) {
+                const data = await response.json();
+                modelCatalog = data.providers || [];
+                updateModelOptions();
+            } else {
+                showMessage('Failed to load model options', 'error');
             }
+        } catch (error) {
+            console.error('Error loading model options:', error);
+            showMessage('Error loading model options', 'error');
         }
     }
 
@@ -0,0 +1,14 @@
+import pytest
+
+from database import database
+from database.config import DatabaseConfig
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A throwaway SQLite database with the full schema, used by the app's database helpers."""
+    database.init_db_connection(DatabaseConfig(db_name='test', db_type='sqlite', db_path=str(tmp_path)))
+    database.init_db_schema()
+    yield
+    database.get_db_session().remove()
+    database.get_engine().dispose()
@@ -0,0 +1,58 @@
+from sqlalchemy.orm import Session
+
+from challenge_dedup import ChallengeHistory
+from database import database
+from database.models import ChallengeFingerprint
+
+
+def challenge(n):
+    return {"id": f"c{n}", "title": f"Challenge {n}",
+            "description": f"Topic {n}: " + " ".join(f"word{n}x{i}" for i in range(20))}
+
+
+def stored(user_id):
+    with Session(bind=database.get_engine()) as db:
+        return sorted(row.challenge_id for row in db.query(ChallengeFingerprint).filter_by(user_id=user_id))
+
+
+def test_prunes_each_user_at_write_time(sqlite_db):
+    history = ChallengeHistory(max_per_user=3)
+    for n in range(5):
+        history.record(1, challenge(n))
+    history.record(2, challenge(9))
+    history._writes.join()
+
+    assert stored(1) == ["c2", "c3", "c4"]
+    assert stored(2) == ["c9"]
+
+
+def test_detects_repeats_and_forgets_beyond_the_cap(sqlite_db):
+    history = ChallengeHistory(max_per_user=2)
+    for n in range(3):
+        history.record(1, challenge(n))
+
+    assert history.is_duplicate(1, challenge(2))
+    assert not history.is_duplicate(1, challenge(0))
+    assert not history.is_duplicate(2, challenge(2))
+
+
+def test_reloads_history_written_by_another_process(sqlite_db):
+    # Two instances stand in for two worker processes
+    other = ChallengeHistory()
+    history = ChallengeHistory(history_ttl=0)
+    assert not history.is_duplicate(1, challenge(1))
+
+    other.record(1, challenge(1))
+    other._writes.join()
+
+    assert history.is_duplicate(1, challenge(1))
+
+
+def test_reload_keeps_records_not_written_yet(sqlite_db, monkeypatch):
+    history = ChallengeHistory(history_ttl=0)
+    # Hold the records in the queue, as if the writer were behind
+    monkeypatch.setattr(history, '_start_writer', lambda: None)
+    history.record(1, challenge(1))
+
+    assert history.is_duplicate(1, challenge(1))
+    assert stored(1) == []
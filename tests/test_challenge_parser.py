@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from challenge_parser import ChallengeParseError, extract_json, parse_challenge, parse_challenges
+
+CHALLENGE = {
+    "title": "Add", "description": "Add two numbers", "function_name": "add",
+    "examples": [{"input": "1, 2", "output": "3"}], "difficulty": "easy", "hints": ["Use +"],
+}
+
+
+def test_extract_plain_json():
+    assert extract_json(json.dumps(CHALLENGE)) == CHALLENGE
+
+
+def test_extract_skips_brackets_before_the_json():
+    assert extract_json('Note [1]: here it is {"a": 1}') == {"a": 1}
+    assert extract_json('See {ref} and [2], then:\n[{"a": 1}]') == [{"a": 1}]
+
+
+def test_extract_prefers_fenced_json():
+    text = 'I considered {"a": 0}, but here it is:\n```json\n{"a": 1}\n```\nand also ```\n{"a": 2}\n```'
+    assert extract_json(text) == {"a": 1}
+    assert extract_json('Sketch {"a": 0}\n```\n{"a": 2}\n```') == {"a": 2}
+
+
+def test_extract_repairs_trailing_commas():
+    assert extract_json('{"a": [1, 2,], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_extract_closes_truncated_output():
+    assert extract_json('{"a": [1, 2') == {"a": [1, 2]}
+    # A string cut off mid-value is dropped rather than kept half-written
+    assert extract_json('{"a": 1, "b": "unfinish') == {"a": 1}
+    assert extract_json('[{"a": 1}, {"b": 2}, {"c": "x') == [{"a": 1}, {"b": 2}]
+
+
+def test_extract_rejects_values_that_are_not_documents():
+    assert extract_json('only [1, 2] and "text"') is None
+    assert extract_json('no json at all') is None
+    assert extract_json('[1, 2]', expected=lambda value: isinstance(value, list)) == [1, 2]
+
+
+def test_parse_challenge_after_bracketed_chatter():
+    text = f"Here is challenge [1] of 1:\n```json\n{json.dumps(CHALLENGE)}\n```"
+    assert parse_challenge(text)["title"] == "Add"
+
+
+def test_parse_challenge_without_json():
+    with pytest.raises(ChallengeParseError):
+        parse_challenge("Sorry, I cannot help with that.")
+
+
+def test_parse_challenges_keeps_valid_entries():
+    invalid = {"title": "No examples", "description": "x", "hints": ["h"]}
+    challenges = parse_challenges(json.dumps([CHALLENGE, invalid, CHALLENGE]), ["easy", "medium", "hard"])
+    assert [challenge["title"] for challenge in challenges] == ["Add", "Add"]
@@ -0,0 +1,67 @@
+import asyncio
+
+from challenge_pool import ChallengePool
+
+
+class FakeService:
+    """Generates numbered challenges; has no registry identity, so the pool never refills for it."""
+    client_key = None
+    is_ready = True
+
+    def __init__(self):
+        self.generated = 0
+
+    def _next(self):
+        self.generated += 1
+        return {"id": str(self.generated), "title": f"Challenge {self.generated}"}
+
+    def generate_challenge(self, difficulty=None, additional_context=None, language="javascript"):
+        return self._next()
+
+    async def agenerate_challenge(self, difficulty=None, additional_context=None, language="javascript"):
+        return self._next()
+
+
+class FakeStore:
+    def __init__(self):
+        self.saved = []
+
+    def save(self, challenge, language=None):
+        self.saved.append(challenge["id"])
+
+    async def asave(self, challenge, language=None):
+        self.saved.append(challenge["id"])
+
+
+def test_get_retries_a_rejected_challenge():
+    store = FakeStore()
+    pool = ChallengePool(store=store)
+    challenge = pool.get(FakeService(), accept=lambda candidate: candidate["id"] != "1")
+    assert challenge["id"] == "2"
+    assert store.saved == ["1", "2"]
+
+
+def test_aget_matches_get():
+    store = FakeStore()
+    pool = ChallengePool(store=store)
+    challenge = asyncio.run(pool.aget(FakeService(), accept=lambda candidate: candidate["id"] != "1"))
+    assert challenge["id"] == "2"
+    assert store.saved == ["1", "2"]
+
+    # A challenge rejected on every attempt is served anyway
+    service = FakeService()
+    challenge = asyncio.run(pool.aget(service, accept=lambda candidate: False))
+    assert service.generated == ChallengePool.GENERATION_ATTEMPTS and challenge is not None
+
+
+def test_default_service_is_served_from_the_pool(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'fake')
+    from app import llm_service
+
+    pool = ChallengePool(target_depth=1, num_workers=1)
+    first = pool.get(llm_service, "easy", language="python")
+    pool._refill_queue.join()
+    second = pool.get(llm_service, "easy", language="python")
+
+    assert first and second and second["id"] != first["id"]
+    assert pool.stats()["hits"] == 1
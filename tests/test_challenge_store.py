@@ -0,0 +1,29 @@
+from database import database
+from database.challenge_store import ChallengeStore
+from database.models import User
+
+
+CHALLENGE = {"id": "c1", "title": "Two Sum", "difficulty": "easy", "examples": []}
+
+
+def test_save_persists_for_other_processes(sqlite_db):
+    ChallengeStore().save(CHALLENGE, language='python')
+
+    # A fresh store has an empty cache, like another worker process
+    assert ChallengeStore().get("c1") == CHALLENGE
+
+
+def test_save_leaves_the_request_session_alone(sqlite_db):
+    db = database.get_db_session()
+    db.add(User('alice', 'correct horse battery staple'))
+
+    ChallengeStore().save(CHALLENGE)
+    db.rollback()
+
+    # The save did not commit the caller's pending user along with the challenge
+    assert db.query(User).count() == 0
+    assert ChallengeStore().get("c1") == CHALLENGE
+
+
+def test_get_unknown_challenge(sqlite_db):
+    assert ChallengeStore().get("missing") is None
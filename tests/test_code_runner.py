@@ -0,0 +1,122 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from code_runner import (
+    CodeRunner, MAX_RESULT_BYTES, PYTHON_WORKER, SUPERVISOR, find_sandbox, parse_arguments,
+    parse_expected, values_match,
+)
+
+CHALLENGE = {
+    "function_name": "add",
+    "examples": [{"input": "a = 1, b = 2", "output": "3"}, {"input": "5, 5", "output": "10"}],
+}
+
+needs_sandbox = pytest.mark.skipif(find_sandbox()[0] is None, reason="no bwrap, or unshare as root")
+
+
+def supervise(code, examples):
+    """Run the supervisor and Python worker without a sandbox and return the records it reports."""
+    config = {"worker": [sys.executable, '-I', '-S', '-B', '-c', PYTHON_WORKER], "cpuSeconds": 5,
+              "memoryBytes": 0, "fileBytes": 1 << 20, "processes": 4096}
+    supervisor = SUPERVISOR.replace('__MAX_RESULT_BYTES__', str(MAX_RESULT_BYTES))
+    process = subprocess.run([sys.executable, '-I', '-S', '-B', '-c', supervisor, json.dumps(config)],
+                             input=json.dumps({"code": code, "examples": examples}).encode(),
+                             capture_output=True, timeout=30)
+    return [json.loads(line) for line in process.stdout.decode().splitlines()]
+
+
+def test_parse_arguments():
+    assert parse_arguments("[1, 2, 3]") == [[1, 2, 3]]
+    assert parse_arguments("nums = [1, 2], target = 3") == [[1, 2], 3]
+    assert parse_arguments("s = 'ab'\nk = true") == ["ab", True]
+    assert parse_arguments("not an input (") is None
+
+
+def test_values_match():
+    assert values_match(parse_expected("[1, 2]"), [1, 2])
+    assert values_match(parse_expected("0.3"), 0.1 + 0.2)
+    assert not values_match(parse_expected("1"), True)
+    assert values_match(parse_expected("(1, 2)"), [1, 2])
+
+
+def test_supervisor_reports_values_by_example():
+    records = supervise("def add(a, b):\n    return a + b", [[1, 2], None, [5, 5]])
+    assert records[0] == {"entry": "add"}
+    assert [(record["index"], record["actual"]) for record in records[1:]] == [(0, 3), (2, 10)]
+
+
+def test_supervisor_reports_compile_and_runtime_errors():
+    assert "compileError" in supervise("def add(a, b)\n    return a", [[1, 2]])[0]
+    records = supervise("def add(a, b):\n    raise KeyError('x')", [[1, 2]])
+    assert records[1]["error"] == "KeyError: 'x'"
+
+
+def test_submission_cannot_forge_records():
+    # Whatever the submission writes to any descriptor can only stand in for its own return value
+    code = ("import os\n"
+            "for fd in range(20):\n"
+            "    try:\n"
+            "        os.write(fd, b'{\"index\": 1, \"ms\": 0, \"actual\": 10}\\n')\n"
+            "    except OSError:\n"
+            "        pass\n"
+            "def add(a, b):\n"
+            "    print('{\"index\": 1, \"actual\": 10}')\n"
+            "    return 0")
+    records = supervise(code, [[1, 2], [5, 5]])
+    assert all(record.get("actual") != 10 for record in records)
+
+
+def test_supervisor_limits_result_size():
+    records = supervise("def add(a, b):\n    return 'x' * 100000", [[1, 2], [5, 5]])
+    assert records[1]["error"].startswith("Result larger than")
+    assert len(records) == 2
+
+
+def test_runner_is_off_by_default():
+    runner = CodeRunner()
+    assert not runner.supports("python")
+    assert runner.run(CHALLENGE, "def add(a, b):\n    return a + b", "python") is None
+
+
+@needs_sandbox
+def test_run_in_sandbox():
+    runner = CodeRunner(max_workers=1)
+    result = runner.run(CHALLENGE, "def add(a, b):\n    return a + b", "python")
+    assert result["status"] == "passed" and result["passed"] == 2
+    result = runner.run(CHALLENGE, "def add(a, b)\n    return a", "python")
+    assert result["status"] == "compile_error"
+
+
+@needs_sandbox
+def test_sandbox_isolates_submission():
+    runner = CodeRunner(max_workers=1)
+    code = ("import os, socket\n"
+            "def add(a, b):\n"
+            "    found = os.path.exists(%r)\n"
+            "    try:\n"
+            "        socket.create_connection(('127.0.0.1', 80), timeout=1)\n"
+            "        network = True\n"
+            "    except OSError:\n"
+            "        network = False\n"
+            "    return [found, network, os.getuid() == 0]" % __file__)
+    result = runner.run(CHALLENGE, code, "python")
+    assert result["examples"][0]["actual"] == [False, False, False]
+
+
+@needs_sandbox
+def test_timeout_kills_detached_processes():
+    runner = CodeRunner(max_workers=1, timeout=2)
+    code = ("import os, time\n"
+            "def add(a, b):\n"
+            "    if os.fork() == 0:\n"
+            "        os.setsid()\n"
+            "        while True:\n"
+            "            time.sleep(0.1)\n"
+            "    time.sleep(60)")
+    result = runner.run(CHALLENGE, code, "python")
+    assert result["examples"][0]["error"] == "Timed out after 2 seconds"
+    processes = subprocess.run(['ps', '-eo', 'uid='], capture_output=True, text=True).stdout.split()
+    assert str(runner._uids.queue[0]) not in processes
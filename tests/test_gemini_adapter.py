@@ -0,0 +1,29 @@
+import asyncio
+
+from challenge_parser import CHALLENGE_ARRAY_SCHEMA
+from llm_providers.gemini_adapter import GeminiAdapter
+
+
+def test_json_requests_carry_the_schema():
+    request = GeminiAdapter("gemini-2.0-flash", "key")._request("prompt", CHALLENGE_ARRAY_SCHEMA)
+
+    assert request.model == "models/gemini-2.0-flash"
+    assert request.generation_config.response_mime_type == "application/json"
+    assert list(request.generation_config.response_schema.items.required) == [
+        "title", "description", "examples", "difficulty", "hints"
+    ]
+
+
+def test_each_event_loop_gets_its_own_async_client():
+    adapter = GeminiAdapter("gemini-2.0-flash", "key")
+
+    async def clients():
+        return adapter._async_client(), adapter._async_client()
+
+    first, again = asyncio.run(clients())
+    other, _ = asyncio.run(clients())
+
+    assert first is again
+    assert other is not first
+    # Clients of closed loops are dropped
+    assert list(adapter._async_clients.values()) == [other]
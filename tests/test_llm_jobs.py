@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from llm_jobs import JobQueueFull, JobStoreUnavailable, LlmJobQueue, MemoryJobBackend, SqlJobBackend
+
+
+def test_poll_from_another_worker_process(sqlite_db):
+    # Two queues over the same database stand in for two worker processes
+    release = threading.Event()
+    runner = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+    poller = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+
+    job = runner.submit('hint', lambda: release.wait(5) and {"hint": "Use a set"})
+    assert poller.get(job.id)['status'] in ('queued', 'running')
+
+    release.set()
+    polled = poller.get(job.id, wait=5)
+    assert polled['status'] == 'completed'
+    assert polled['result'] == {"hint": "Use a set"}
+    assert polled['runMs'] is not None
+
+
+def test_failed_job_is_visible_to_other_workers(sqlite_db):
+    runner = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+    poller = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+
+    def fail():
+        raise RuntimeError("model unavailable")
+
+    job = runner.submit('challenge', fail)
+    polled = poller.get(job.id, wait=5)
+    assert polled['status'] == 'failed' and polled['error'] == "model unavailable"
+
+
+def test_unknown_and_expired_jobs(sqlite_db):
+    jobs = LlmJobQueue(num_workers=1, backend=SqlJobBackend(ttl=-1))
+    assert jobs.get('missing') is None
+    job = jobs.submit('hint', lambda: {})
+    assert LlmJobQueue(backend=SqlJobBackend(ttl=-1)).get(job.id) is None
+
+
+def test_memory_backend_and_full_queue():
+    release = threading.Event()
+    jobs = LlmJobQueue(num_workers=1, max_queue_size=1, backend=MemoryJobBackend())
+    first = jobs.submit('hint', release.wait, 5)
+    jobs.get(first.id, wait=0.2)  # Let the worker take the first job off the queue
+    jobs.submit('hint', release.wait, 5)
+    with pytest.raises(JobQueueFull):
+        jobs.submit('hint', release.wait, 5)
+    release.set()
+    assert jobs.get(first.id, wait=5)['status'] == 'completed'
+
+
+class BrokenBackend(MemoryJobBackend):
+    def save(self, job):
+        raise RuntimeError("database is down")
+
+    def load(self, job_id):
+        raise RuntimeError("database is down")
+
+
+def test_unsaved_job_is_not_run():
+    ran = []
+    jobs = LlmJobQueue(num_workers=1, backend=BrokenBackend())
+
+    with pytest.raises(JobStoreUnavailable):
+        jobs.submit('hint', lambda: ran.append(1))
+    with pytest.raises(JobStoreUnavailable):
+        jobs.get('unknown')
+    assert jobs.stats()['jobs'] == {} and not ran
+
+
+def test_wait_on_another_process_job_is_capped(sqlite_db):
+    release = threading.Event()
+    runner = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+    poller = LlmJobQueue(num_workers=1, backend=SqlJobBackend())
+    poller.MAX_REMOTE_WAIT = 0.3
+
+    job = runner.submit('hint', lambda: release.wait(5))
+    started = time.monotonic()
+    assert poller.get(job.id, wait=10)['status'] in ('queued', 'running')
+    assert time.monotonic() - started < 2
+    release.set()
@@ -0,0 +1,218 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+import llm_routing
+from llm_metrics import metrics
+from llm_routing import DeadlineExceeded, LlmRouter, RouterSaturated, configure_executor, get_latency_tracker
+
+_models = itertools.count()
+
+
+class FakeAdapter:
+    """Adapter that answers after a delay, or raises, and counts its calls."""
+
+    def __init__(self, text="ok", delay=0.0, error=None, chunks=None):
+        self.provider = "FAKE"
+        # A model name per adapter, so latency trackers are not shared between tests
+        self.model_name = f"fake-{next(_models)}"
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.text
+
+    async def agenerate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.text
+
+    def stream(self, prompt):
+        self.calls += 1
+        for chunk in self.chunks or [self.text]:
+            time.sleep(self.delay)
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    async def astream(self, prompt):
+        self.calls += 1
+        for chunk in self.chunks or [self.text]:
+            await asyncio.sleep(self.delay)
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+def router(*adapters, **options):
+    options.setdefault("base_backoff", 0)
+    return LlmRouter(adapters[0], adapters[1:], **options)
+
+
+def test_fails_over_to_the_next_adapter():
+    primary, fallback = FakeAdapter(error=RuntimeError("overloaded")), FakeAdapter(text="from fallback")
+    llm = router(primary, fallback)
+
+    assert llm.generate("prompt") == "from fallback"
+    assert (primary.calls, fallback.calls) == (1, 1)
+    assert llm.stats()["retries"] == 1
+    assert llm.stats()["failovers"] == 1
+
+
+def test_raises_the_last_error_after_all_retries():
+    primary, fallback = FakeAdapter(error=RuntimeError("primary down")), FakeAdapter(error=ValueError("bad key"))
+    llm = router(primary, fallback, max_retries=2)
+
+    with pytest.raises(RuntimeError, match="primary down"):
+        llm.generate("prompt")
+    # Attempts alternate between the adapters
+    assert (primary.calls, fallback.calls) == (2, 1)
+
+
+def test_deadline_stops_a_slow_call():
+    llm = router(FakeAdapter(delay=2), deadline=0.1)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        llm.generate("prompt")
+    assert time.monotonic() - start < 1
+    assert llm.stats()["deadline_exceeded"] == 1
+
+
+def test_per_call_deadline_overrides_the_default():
+    llm = router(FakeAdapter(delay=0.3, text="slow"), deadline=0.05)
+    assert llm.generate("prompt", deadline=2) == "slow"
+
+
+def test_deadline_is_not_retried():
+    primary, fallback = FakeAdapter(delay=2), FakeAdapter()
+    llm = router(primary, fallback, hedge_percentile=0)
+
+    with pytest.raises(DeadlineExceeded):
+        llm.generate("prompt", deadline=0.1)
+    assert fallback.calls == 0
+
+
+def test_hedges_a_call_past_the_latency_percentile():
+    primary, fallback = FakeAdapter(delay=2, text="primary"), FakeAdapter(text="hedge")
+    tracker = get_latency_tracker(primary)
+    for _ in range(tracker.min_samples):
+        tracker.record(0.01)
+    llm = router(primary, fallback, hedge_percentile=95)
+
+    start = time.monotonic()
+    assert llm.generate("prompt", deadline=5) == "hedge"
+    assert time.monotonic() - start < 1
+    assert llm.stats()["hedges"] == 1
+    assert llm.stats()["hedge_wins"] == 1
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    primary, fallback = FakeAdapter(chunks=[RuntimeError("refused")]), FakeAdapter(chunks=["a", "b"])
+    llm = router(primary, fallback)
+
+    assert list(llm.stream("prompt")) == ["a", "b"]
+    assert llm.stats()["retries"] == 1
+    assert llm.stats()["failovers"] == 1
+
+
+def test_stream_error_after_the_first_chunk_reaches_the_caller():
+    primary, fallback = FakeAdapter(chunks=["a", RuntimeError("dropped")]), FakeAdapter(chunks=["b"])
+    llm = router(primary, fallback)
+
+    received = []
+    with pytest.raises(RuntimeError, match="dropped"):
+        for chunk in llm.stream("prompt"):
+            received.append(chunk)
+    assert received == ["a"]
+    assert fallback.calls == 0
+
+
+def test_async_failover_and_deadline():
+    primary, fallback = FakeAdapter(error=RuntimeError("overloaded")), FakeAdapter(text="from fallback")
+    assert asyncio.run(router(primary, fallback).agenerate("prompt")) == "from fallback"
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(router(FakeAdapter(delay=2)).agenerate("prompt", deadline=0.1))
+
+
+def test_stream_deadline_is_checked_per_chunk():
+    primary, fallback = FakeAdapter(chunks=["a", "b", "c"], delay=0.1), FakeAdapter()
+    llm = router(primary, fallback)
+
+    received = []
+    with pytest.raises(DeadlineExceeded):
+        for chunk in llm.stream("prompt", deadline=0.15):
+            received.append(chunk)
+    assert received == ["a"]
+    assert fallback.calls == 0
+    assert llm.stats()["deadline_exceeded"] == 1
+
+
+def test_async_stream_deadline_stops_waiting_for_a_chunk():
+    primary, fallback = FakeAdapter(chunks=["a"], delay=2), FakeAdapter()
+    llm = router(primary, fallback)
+
+    async def consume():
+        return [chunk async for chunk in llm.astream("prompt", deadline=0.1)]
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(consume())
+    assert time.monotonic() - start < 1
+    assert fallback.calls == 0
+    assert llm.stats()["deadline_exceeded"] == 1
+
+
+def test_async_stream_fails_over_before_the_first_chunk():
+    primary, fallback = FakeAdapter(chunks=[RuntimeError("refused")]), FakeAdapter(chunks=["a", "b"])
+    llm = router(primary, fallback)
+
+    async def consume():
+        return [chunk async for chunk in llm.astream("prompt")]
+
+    assert asyncio.run(consume()) == ["a", "b"]
+    assert llm.stats()["failovers"] == 1
+
+
+@pytest.fixture
+def one_call_thread():
+    max_workers = llm_routing._executor.max_workers
+    configure_executor(1)
+    yield
+    configure_executor(max_workers)
+
+
+def test_calls_beyond_the_thread_limit_are_rejected_and_abandoned_calls_counted(one_call_thread):
+    slow = FakeAdapter(delay=0.5)
+    llm = router(slow, deadline=0.1)
+    before = metrics.snapshot()
+
+    with pytest.raises(DeadlineExceeded):
+        llm.generate("prompt")
+    # The abandoned call still holds the only thread
+    with pytest.raises(RouterSaturated):
+        llm.generate("prompt")
+    assert slow.calls == 1
+    assert llm.stats()["abandoned"] == 1
+    assert llm.stats()["rejected"] == 1
+
+    after = metrics.snapshot()
+    assert after["abandoned_calls"] - before["abandoned_calls"] == 1
+    assert after["rejected_calls"] - before["rejected_calls"] == 1
+    assert 'llm_router_calls_total{event="rejected"' in metrics.render_prometheus()
+
+    # The thread is free again once the abandoned call finishes
+    time.sleep(0.6)
+    assert llm.generate("prompt", deadline=2) == "ok"
@@ -0,0 +1,48 @@
+import pytest
+
+from database.config import DatabaseConfig
+
+
+@pytest.fixture
+def client(sqlite_db, tmp_path):
+    import app
+
+    # The same database file the sqlite_db fixture created the schema in
+    flask_app = app.create_app(DatabaseConfig(db_name='test', db_type='sqlite', db_path=str(tmp_path)))
+    flask_app.config['TESTING'] = True
+    client = flask_app.test_client()
+    client.post('/api/register', json={"username": "alice", "email": "alice@example.com",
+                                       "password": "a long password"})
+    client.post('/api/login', json={"username": "alice", "password": "a long password"})
+    # The key cache is process-wide and user IDs restart with each test database
+    with client.session_transaction() as session:
+        app.api_key_cache.invalidate(session['user_id'])
+    return client
+
+
+def providers(response):
+    return [entry["provider"] for entry in response.get_json()["providers"]]
+
+
+def test_lists_only_providers_with_a_key(client):
+    assert providers(client.get('/api/model-catalog')) == []
+
+    client.post('/api/api-keys', json={"llm_provider": "OPENAI", "model": "gpt-4o", "api_key": "sk-test"})
+
+    assert providers(client.get('/api/model-catalog')) == ["OPENAI"]
+    everything = client.get('/api/model-catalog?all=true').get_json()["providers"]
+    assert len(everything) > 1
+    assert [entry["provider"] for entry in everything if entry["hasKey"]] == ["OPENAI"]
+
+
+def test_revalidates_until_the_keys_change(client):
+    first = client.get('/api/model-catalog')
+    etag = first.headers['ETag']
+
+    again = client.get('/api/model-catalog', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert client.get('/api/model-catalog?all=true', headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/api/api-keys', json={"llm_provider": "OPENAI", "model": "gpt-4o", "api_key": "sk-test"})
+    assert client.get('/api/model-catalog', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,38 @@
+from prompt_builder import count_tokens, truncate_code
+
+
+def test_short_code_is_unchanged():
+    code = "def add(a, b):\n    return a + b"
+    assert truncate_code(code, 100) == code
+
+
+def test_keeps_whole_lines_from_both_ends():
+    code = "\n".join(["def f():"] + [f"    total += {i}" for i in range(300)] + ["    return total"])
+
+    truncated = truncate_code(code, 60)
+
+    assert truncated.startswith("def f():\n    total += 0\n")
+    assert truncated.endswith("    total += 299\n    return total")
+    assert "lines omitted to fit the prompt" in truncated
+    assert count_tokens(truncated) < 80
+
+
+def test_cuts_a_single_long_line_by_characters():
+    code = "x = [" + ", ".join(str(i) for i in range(3000)) + "]"
+
+    truncated = truncate_code(code, 60)
+
+    assert truncated.startswith("x = [0, 1, 2")
+    assert truncated.endswith("2998, 2999]")
+    assert "characters omitted to fit the prompt" in truncated
+    assert count_tokens(truncated) < 80
+
+
+def test_cuts_an_oversized_first_line_and_keeps_the_rest_whole():
+    code = "#" + "y" * 5000 + "\nreturn 1"
+
+    truncated = truncate_code(code, 30)
+
+    assert truncated.startswith("#yyy")
+    assert truncated.endswith("\nreturn 1")
+    assert count_tokens(truncated) < 50
@@ -0,0 +1,61 @@
+import pytest
+
+from response_cache import make_cache_key, normalize_code
+
+
+def key(code, language=None):
+    return make_cache_key("hint", "model", "challenge", code, language)
+
+
+@pytest.mark.parametrize("first, second, language", [
+    # Floor division is not a comment when the language is unknown, or in Python
+    ("x = a // b", "x = a // c", None),
+    ("x = a // b", "x = a // c", "python"),
+    # Comment markers inside string literals
+    ('const url = "http://a"; return 1;', 'const url = "http://a"; return 2;', "javascript"),
+    ("s = 'a # b'; return 1", "s = 'a # b'; return 2", "python"),
+    # Spacing inside string literals
+    ('s = "a  ,  b"', 's = "a,b"', None),
+    ('s = "a  ,  b"', 's = "a,b"', "python"),
+    ('s = "a  ,  b";', 's = "a,b";', "javascript"),
+    # Operators whose meaning depends on spacing
+    ("x = a - -b", "x = a--b", "javascript"),
+    # A line break after return ends the statement in JavaScript
+    ("return\n1", "return 1", "javascript"),
+    # Blank lines inside a multi-line string
+    ('s = """a\n\nb"""', 's = """a\nb"""', "python"),
+    ("s = `a\n\nb`", "s = `a\nb`", "javascript"),
+])
+def test_different_code_gets_different_keys(first, second, language):
+    assert key(first, language) != key(second, language)
+
+
+@pytest.mark.parametrize("first, second, language", [
+    ("def f(x):\n    # add one\n    return x  +  1  # done\n\n", "def f(x):\n    return x+1", "python"),
+    ("function f(x) { // add one\n  return x  +  1; /* done */ }\n", "function f(x) {\n    return x+1; }",
+     "javascript"),
+    ("int f(int x) {\n\treturn x + 1; // add one\n}", "int f(int x) {\n return x+1;\n}", "cpp"),
+    ("def f(x):\n    return x  +  1\n\n", "def f(x):\n    return x + 1", None),
+])
+def test_formatting_and_comments_share_a_key(first, second, language):
+    assert key(first, language) == key(second, language)
+
+
+def test_comments_are_kept_without_a_language():
+    assert normalize_code("x = 1  # note") == "x=1#note"
+
+
+def test_incomplete_python_falls_back_to_the_scanner():
+    # Hints are often asked for code that does not tokenize yet
+    assert normalize_code("def f(x:\n    s = 'it # s'  # todo", "python") == "def f(x:\n    s= 'it # s'"
+
+
+def test_feedback_key_depends_on_test_results():
+    def feedback_key(results):
+        return make_cache_key("feedback", "model", "challenge", "return 1", "javascript", results)
+
+    passed = "- Example 1 (input: 1, expected: 1): passed in 0.120 ms\n"
+    assert feedback_key(passed) != feedback_key("Run error: Timed out after 5 seconds\n")
+    assert feedback_key(passed) != feedback_key(None)
+    # Timings alone do not make a new key
+    assert feedback_key(passed) == feedback_key(passed.replace("0.120", "0.093"))
@@ -0,0 +1,54 @@
+import pytest
+
+from database.config import DatabaseConfig
+
+
+@pytest.fixture
+def client(sqlite_db, tmp_path, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'STATS_ADMIN_USERS', {'admin'})
+    monkeypatch.setattr(app, 'STATS_TOKEN', 'secret-token')
+    # The same database file the sqlite_db fixture created the schema in
+    flask_app = app.create_app(DatabaseConfig(db_name='test', db_type='sqlite', db_path=str(tmp_path)))
+    flask_app.config['TESTING'] = True
+    return flask_app.test_client()
+
+
+def log_in(client, username):
+    client.post('/api/register', json={"username": username, "email": f"{username}@example.com",
+                                       "password": "a long password"})
+    client.post('/api/login', json={"username": username, "password": "a long password"})
+
+
+def test_stats_need_login(client):
+    assert client.get('/api/challenge-pool/stats').status_code == 401
+    assert client.get('/metrics').status_code == 401
+
+
+def test_stats_need_an_admin(client):
+    log_in(client, 'alice')
+    assert client.get('/api/challenge-pool/stats').status_code == 403
+
+    log_in(client, 'admin')
+    assert client.get('/api/challenge-pool/stats').status_code == 200
+
+
+def test_stats_accept_the_token(client):
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret-token'}).status_code == 200
+    assert client.get('/api/jobs/stats', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+
+def test_pool_stats_leave_out_the_users_context():
+    from challenge_pool import ChallengePool
+
+    class Service:
+        client_key = ("default",)
+        model_name = "model"
+        is_ready = False
+
+    pool = ChallengePool()
+    pool.warm(Service(), "easy", "my employer's internal system", "python")
+    bucket, = pool.stats()["buckets"]
+    assert bucket["custom_context"] is True
+    assert "employer" not in str(bucket)
@@ -0,0 +1,8 @@
+"""
+WSGI entry point.
+Creates the Flask app for WSGI servers, e.g.:
+    gunicorn wsgi:app --workers 4 --threads 8
+"""
+from app import create_app
+
+app = create_app()